@@ -1,12 +1,37 @@
 """
 MWJ Tools - 实用的Python工具库
 """
+import importlib
+from typing import TYPE_CHECKING
 
-from .datetime_utils import DateTimeUtils
-from .table_utils import TableUtils
+if TYPE_CHECKING:
+    from .business_calendar import BusinessCalendar
+    from .datetime_utils import DateTimeUtils
+    from .table_utils import TableUtils
 
 __version__ = "0.1.0"
 __author__ = "梦无矶"
 __email__ = "Lvan826199@163.com"
 
-__all__ = ['DateTimeUtils', 'TableUtils']
+__all__ = ['DateTimeUtils', 'TableUtils', 'BusinessCalendar']
+
+# 公开名称 -> 所在子模块；首次访问时才导入，避免只用DateTimeUtils时也加载pandas
+_LAZY_ATTRS = {
+    'DateTimeUtils': '.datetime_utils',
+    'TableUtils': '.table_utils',
+    'BusinessCalendar': '.business_calendar',
+}
+
+
+def __getattr__(name: str):
+    if name in _LAZY_ATTRS:
+        module = importlib.import_module(_LAZY_ATTRS[name], __name__)
+        value = getattr(module, name)
+        # 缓存到模块命名空间，之后的访问不再经过__getattr__
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,275 @@
+# -*- coding: utf-8 -*-
+"""
+@Time : 2026/10/17 11:05
+@Email : Lvan826199@163.com
+@公众号 : 梦无矶测开实录
+@File : business_calendar.py
+"""
+__author__ = "梦无矶小仔"
+
+"""
+工作日日历模块
+基于按天预计算的位图与前缀和，提供O(1)的工作日判断与批量工作日推算
+"""
+import csv
+import json
+from datetime import datetime, date
+from pathlib import Path
+from typing import Union, Iterable
+
+import numpy as np
+
+from .datetime_utils import ArrayLike, _parse_datetime, _to_datetime64, _map_valid, _restore_nat
+
+DateLike = Union[datetime, date, str]
+
+# 文件中表示"调休上班"的类型取值，其余取值均视为节假日
+_WORKDAY_KINDS = {'workday', 'work', '调休', '班'}
+
+
+class BusinessCalendar:
+    """
+    工作日日历
+
+    创建时按天预计算[start_year, end_year]范围内每一天是否为工作日（位图），
+    以及工作日数量的前缀和：
+    - is_business_day 为一次查表
+    - add_business_days / business_days_between 通过前缀和计算，不逐天循环
+
+    Example:
+        calendar = BusinessCalendar(holidays=['2025-01-01'], workdays=['2025-01-26'])
+        calendar.is_business_day('2025-01-01')             # False
+        calendar.add_business_days(['2024-12-31'], 1)      # [2025-01-02]
+    """
+
+    def __init__(
+            self,
+            holidays: Iterable[DateLike] = (),
+            workdays: Iterable[DateLike] = (),
+            weekmask: str = '1111100',
+            start_year: int = 1970,
+            end_year: int = 2099
+    ):
+        """
+        Args:
+            holidays: 节假日（非工作日）
+            workdays: 额外的工作日，如周末调休上班
+            weekmask: 周一到周日是否为工作日，'1'为工作日，默认周一至周五
+            start_year: 日历覆盖的起始年份
+            end_year: 日历覆盖的结束年份（包含）
+        """
+        if len(weekmask) != 7 or set(weekmask) - {'0', '1'}:
+            raise ValueError(f"weekmask必须是7位0/1字符串: {weekmask}")
+        if start_year > end_year:
+            raise ValueError(f"起始年份不能晚于结束年份: {start_year} > {end_year}")
+
+        self.weekmask = weekmask
+        self.start_year = start_year
+        self.end_year = end_year
+        self.holidays = frozenset(_to_date(d) for d in holidays)
+        self.workdays = frozenset(_to_date(d) for d in workdays)
+
+        first = np.datetime64(f'{start_year:04d}-01-01', 'D')
+        last = np.datetime64(f'{end_year + 1:04d}-01-01', 'D')
+        self._base = int(first.view(np.int64))
+        self._base_ordinal = date(start_year, 1, 1).toordinal()
+
+        days = np.arange(first, last)
+        weekday = (days.view(np.int64) + 3) % 7
+        self._bitmap = bitmap = np.array([c == '1' for c in weekmask])[weekday]
+        bitmap[self._indexes(self.holidays)] = False
+        bitmap[self._indexes(self.workdays)] = True
+        # 标量查询走bytes下标，比numpy标量下标快
+        self._bitmap_bytes = bitmap.tobytes()
+        # _counts[i] 为第i天之前（不含）的工作日数量
+        self._counts = np.concatenate(([0], np.cumsum(bitmap, dtype=np.int64)))
+        # 第k个工作日对应的天下标
+        self._positions = np.flatnonzero(bitmap)
+
+    def __repr__(self) -> str:
+        return (f"BusinessCalendar({self.start_year}-{self.end_year}, weekmask={self.weekmask!r}, "
+                f"holidays={len(self.holidays)}, workdays={len(self.workdays)})")
+
+    def __len__(self) -> int:
+        """日历覆盖的天数"""
+        return len(self._bitmap)
+
+    @classmethod
+    def from_csv(
+            cls,
+            filepath: str,
+            date_column: str = 'date',
+            kind_column: str = 'kind',
+            **kwargs
+    ) -> 'BusinessCalendar':
+        """
+        从本地CSV文件加载节假日
+
+        文件每行一个日期；有表头时读取date_column列（不存在则取第一列），
+        若存在kind_column列且取值为workday/调休/班，则该日期为调休工作日，否则为节假日
+
+        Args:
+            filepath: CSV文件路径
+            date_column: 日期列名
+            kind_column: 类型列名
+            **kwargs: 传给构造函数的其他参数（weekmask、start_year、end_year）
+
+        Returns:
+            BusinessCalendar对象
+        """
+        with open(filepath, newline='', encoding='utf-8-sig') as f:
+            rows = [row for row in csv.reader(f) if row and row[0].strip()]
+        if not rows:
+            return cls(**kwargs)
+
+        header = [cell.strip() for cell in rows[0]]
+        date_index, kind_index = 0, None
+        if not _is_date(header[0]) or date_column in header:
+            date_index = header.index(date_column) if date_column in header else 0
+            kind_index = header.index(kind_column) if kind_column in header else None
+            rows = rows[1:]
+
+        holidays, workdays = [], []
+        for row in rows:
+            kind = row[kind_index].strip().lower() if kind_index is not None else ''
+            (workdays if kind in _WORKDAY_KINDS else holidays).append(row[date_index].strip())
+        return cls(holidays=holidays, workdays=workdays, **kwargs)
+
+    @classmethod
+    def from_json(cls, filepath: str, **kwargs) -> 'BusinessCalendar':
+        """
+        从本地JSON文件加载节假日
+
+        支持两种结构：日期字符串列表（均为节假日），
+        或 {"holidays": [...], "workdays": [...]}
+
+        Args:
+            filepath: JSON文件路径
+            **kwargs: 传给构造函数的其他参数
+
+        Returns:
+            BusinessCalendar对象
+        """
+        data = json.loads(Path(filepath).read_text(encoding='utf-8'))
+        if isinstance(data, list):
+            return cls(holidays=data, **kwargs)
+        return cls(holidays=data.get('holidays', []), workdays=data.get('workdays', []), **kwargs)
+
+    def is_business_day(self, dt: DateLike) -> bool:
+        """
+        判断是否为工作日
+
+        Args:
+            dt: 日期
+
+        Returns:
+            True如果是工作日，否则False
+        """
+        index = _to_date(dt).toordinal() - self._base_ordinal
+        if not 0 <= index < len(self._bitmap_bytes):
+            raise ValueError(f"日期超出日历范围({self.start_year}-{self.end_year}): {dt}")
+        return self._bitmap_bytes[index] == 1
+
+    def is_business_day_batch(self, dts: ArrayLike) -> np.ndarray:
+        """
+        批量判断是否为工作日
+
+        Args:
+            dts: 日期序列（列表、datetime64数组或pandas Series）
+
+        Returns:
+            bool数组，NaT为False
+        """
+        return _map_valid(lambda arr: self._bitmap[self._day_indexes(arr)], _to_dates(dts), False)
+
+    def add_business_days(
+            self,
+            dts: ArrayLike,
+            n: Union[int, ArrayLike],
+            roll: str = 'forward'
+    ) -> np.ndarray:
+        """
+        批量加减工作日
+
+        起始日不是工作日时先按roll滚动到相邻工作日，再前后移动n个工作日
+        （与numpy.busday_offset的语义一致）
+
+        Args:
+            dts: 起始日期序列
+            n: 加减的工作日数，整数或与dts等长的整数序列
+            roll: 非工作日的滚动方向，可选：'forward'（下一个工作日）, 'backward'（上一个工作日）
+
+        Returns:
+            datetime64[D]数组，起始日为NaT时结果为NaT
+        """
+        if roll not in ('forward', 'backward'):
+            raise ValueError(f"不支持的滚动方向: {roll}")
+        return _map_valid(self._add_valid, _to_dates(dts), np.datetime64('NaT', 'D'),
+                          np.asarray(n, dtype=np.int64), roll)
+
+    def _add_valid(self, arr: np.ndarray, n: np.ndarray, roll: str) -> np.ndarray:
+        """add_business_days 在不含NaT的日期上的计算"""
+        index = self._day_indexes(arr)
+        # 滚动后的起始日在所有工作日中的序号
+        rank = self._counts[index] if roll == 'forward' else self._counts[index + 1] - 1
+        rank = rank + n
+        if len(rank) and (rank.min() < 0 or rank.max() >= len(self._positions)):
+            raise ValueError(f"结果超出日历范围({self.start_year}-{self.end_year})")
+        return (self._positions[rank] + self._base).view('datetime64[D]')
+
+    def business_days_between(self, starts: ArrayLike, ends: ArrayLike) -> np.ndarray:
+        """
+        批量计算[start, end)区间内的工作日数量
+
+        end早于start时结果为负数，且满足 between(a, b) == -between(b, a)
+
+        Args:
+            starts: 起始日期序列（包含）
+            ends: 结束日期序列（不包含），也可以是单个日期
+
+        Returns:
+            int64数组；任一端为NaT时该位置为NaN，此时结果为float64
+        """
+        starts, ends = np.broadcast_arrays(_to_dates(starts), _to_dates(ends))
+        missing = np.isnat(starts) | np.isnat(ends)
+        if missing.any():
+            valid = ~missing
+            counts = self._counts[self._day_indexes(ends[valid])] - self._counts[self._day_indexes(starts[valid])]
+            return _restore_nat(counts, missing, np.nan)
+        return self._counts[self._day_indexes(ends)] - self._counts[self._day_indexes(starts)]
+
+    def _indexes(self, dates: Iterable[date]) -> np.ndarray:
+        """将日期集合转换为位图下标，忽略日历范围外的日期"""
+        indexes = np.array([d.toordinal() - self._base_ordinal for d in dates], dtype=np.int64)
+        return indexes[(indexes >= 0) & (indexes < len(self))]
+
+    def _day_indexes(self, arr: np.ndarray) -> np.ndarray:
+        """将不含NaT的datetime64[us]数组转换为位图下标，超出日历范围时抛出ValueError"""
+        days = arr.view(np.int64) // 86_400_000_000
+        index = days - self._base
+        if len(index) and (index.min() < 0 or index.max() >= len(self)):
+            raise ValueError(f"日期超出日历范围({self.start_year}-{self.end_year})")
+        return index
+
+
+def _to_dates(dts: Union[ArrayLike, DateLike]) -> np.ndarray:
+    """将日期序列（或单个日期）转换为datetime64[us]数组，缺失值为NaT"""
+    if isinstance(dts, (str, date)):
+        dts = [dts]
+    return _to_datetime64(dts)
+
+
+def _to_date(value: DateLike) -> date:
+    """将字符串、datetime或date统一转换为date"""
+    if isinstance(value, str):
+        value = _parse_datetime(value)
+    return value.date() if isinstance(value, datetime) else value
+
+
+def _is_date(text: str) -> bool:
+    """判断字符串是否为ISO格式日期"""
+    try:
+        _parse_datetime(text)
+    except ValueError:
+        return False
+    return True
@@ -11,10 +11,800 @@ __author__ = "梦无矶小仔"
 日期时间通用处理工具模块
 提供时间计算、转换、格式化等常用功能
 """
-from datetime import datetime, timedelta, date
-from dateutil.relativedelta import relativedelta
+from datetime import datetime, timedelta, date, tzinfo
+from functools import lru_cache
+import threading
 import time
-from typing import Union, Tuple, Optional
+from typing import Union, Tuple, Optional, Any, Dict, List, Iterable, Iterator, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# 批量接口接受的输入：列表/元组、numpy数组（datetime64或字符串）、pandas Series
+ArrayLike = Union[list, tuple, 'np.ndarray', Any]
+
+# 批量计算统一使用微秒精度，与datetime对象保持一致
+_DT64_UNIT = 'datetime64[us]'
+# 本地时区偏移按15分钟分桶计算（时区切换总是发生在15分钟边界上）
+_OFFSET_BUCKET_SECONDS = 900
+_EPOCH = datetime(1970, 1, 1)
+_ONE_SECOND = timedelta(seconds=1)
+# 时区切换表覆盖的UTC秒数范围[1900-01-01, 2100-01-01)，范围外逐个计算
+_ZONE_TABLE_START = -2208988800
+_ZONE_TABLE_END = 4102444800
+
+_DAY_US = 86_400_000_000
+# 平年各月天数，下标为月份(1-12)
+_DAYS_IN_MONTH = (0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+
+# 时间分桶支持的粒度
+_BUCKET_GRANULARITIES = ('minute', 'hour', 'day', 'week', 'month', 'quarter')
+# 1970-01在月份下标（(year - 1) * 12 + (month - 1)）中的位置
+_EPOCH_MONTH_INDEX = 1969 * 12
+
+_TIME_UNITS = {
+    'seconds': 1,
+    'minutes': 60,
+    'hours': 3600,
+    'days': 86400
+}
+
+
+class _IsoParser:
+    """
+    共享的ISO时间字符串解析层
+
+    datetime/date对象不可变，解析结果可以安全缓存；
+    所有DateTimeUtils入口的字符串解析都经过这里
+    """
+
+    def __init__(self, maxsize: int = 4096):
+        self.configure(maxsize)
+
+    def configure(self, maxsize: Optional[int]) -> None:
+        """重建缓存，maxsize为None表示不限大小，0表示关闭缓存"""
+        self.maxsize = maxsize
+        self.parse_datetime = lru_cache(maxsize=maxsize)(datetime.fromisoformat)
+        self.parse_date = lru_cache(maxsize=maxsize)(date.fromisoformat)
+
+    def cache_info(self) -> Dict[str, Any]:
+        """汇总datetime与date两个缓存的命中统计"""
+        dt_info = self.parse_datetime.cache_info()
+        d_info = self.parse_date.cache_info()
+        return {
+            'hits': dt_info.hits + d_info.hits,
+            'misses': dt_info.misses + d_info.misses,
+            'maxsize': self.maxsize,
+            'currsize': dt_info.currsize + d_info.currsize
+        }
+
+    def cache_clear(self) -> None:
+        """清空缓存及命中统计"""
+        self.parse_datetime.cache_clear()
+        self.parse_date.cache_clear()
+
+
+_PARSER = _IsoParser()
+
+
+def _parse_datetime(value: Any) -> datetime:
+    """将单个值解析为无时区的datetime（带时区的值会先转换为本地时间）"""
+    if isinstance(value, str):
+        value = _PARSER.parse_datetime(value)
+    elif isinstance(value, date) and not isinstance(value, datetime):
+        value = datetime(value.year, value.month, value.day)
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        value = value.astimezone().replace(tzinfo=None)
+    return value
+
+
+def _native_datetime64(arr: 'np.ndarray') -> 'np.ndarray':
+    """
+    不逐个解析的整列转换：对象数组交给pandas（已安装时），字符串与其他数组用numpy的astype
+
+    输入含时区、非ISO格式或超出范围时抛出异常，由调用方回退到逐个解析
+    """
+    import warnings
+
+    with warnings.catch_warnings():
+        # numpy遇到带时区的值只给出警告并按UTC换算，而逐个解析会换算为本地时间，视为失败
+        warnings.simplefilter('error')
+        if arr.dtype == object:
+            try:
+                import pandas as pd
+            except ImportError:
+                pass
+            else:
+                result = pd.to_datetime(arr, format='ISO8601')
+                if result.tz is not None:
+                    raise ValueError("带时区的时间需要换算为本地时间")
+                return result.to_numpy().astype(_DT64_UNIT)
+        return arr.astype(_DT64_UNIT)
+
+
+def _to_datetime64(values: ArrayLike) -> 'np.ndarray':
+    """
+    将批量输入统一转换为datetime64[us]数组
+
+    先整列转换（datetime对象、ISO格式字符串都不需要逐个解析），
+    只有整列转换失败（如带时区、非ISO格式）时才去重后逐个解析
+
+    Args:
+        values: 列表、numpy数组或pandas Series，元素可以是datetime、date、
+                ISO格式字符串或datetime64；None与NaT转换为NaT
+
+    Returns:
+        一维datetime64[us]数组
+    """
+    import numpy as np
+
+    if hasattr(values, 'to_numpy'):
+        # pandas Series / Index，避免在此处导入pandas
+        values = values.to_numpy()
+    # 列表直接建对象数组，省去numpy推断定长字符串类型再整体拷贝的一步
+    arr = np.asarray(values, dtype=object if isinstance(values, (list, tuple)) else None).reshape(-1)
+    if arr.dtype.kind == 'M':
+        return arr.astype(_DT64_UNIT, copy=False)
+    try:
+        return _native_datetime64(arr)
+    except (ValueError, TypeError, OverflowError, Warning):
+        pass
+
+    try:
+        # 只解析去重后的值，再按位置广播回去
+        uniques, inverse = np.unique(arr, return_inverse=True)
+    except TypeError:
+        # 混合类型无法排序去重，逐个解析
+        return np.array([_parse_datetime(v) for v in arr], dtype=_DT64_UNIT)
+    parsed = np.array([_parse_datetime(v) for v in uniques], dtype=_DT64_UNIT)
+    return parsed[inverse.reshape(-1)]
+
+
+def _restore_nat(values: 'np.ndarray', missing: 'np.ndarray', fill: Any) -> 'np.ndarray':
+    """
+    把只在有效行上算出的结果放回原位置，NaT所在位置填入fill
+
+    Args:
+        values: 有效行（非NaT）的计算结果
+        missing: 原数组的NaT掩码
+        fill: NaT位置的取值，如NaT、NaN、False；结果类型会放宽到能容纳fill（整数填NaN时为float64）
+
+    Returns:
+        与missing等长的数组
+    """
+    import numpy as np
+
+    fill = np.asarray(fill)
+    result = np.full(len(missing), fill, dtype=np.result_type(values.dtype, fill.dtype))
+    result[~missing] = values
+    return result
+
+
+def _map_valid(func, arr: 'np.ndarray', fill: Any, *args) -> Any:
+    """
+    只在非NaT的行上计算 func(arr, *args)，NaT所在位置填入fill
+
+    NaT在int64视图中是最小整数，直接参与日历换算会越界或得到无意义的结果。
+    与arr等长的数组参数按同一掩码筛选；func返回元组时逐项放回
+
+    Args:
+        func: 批量计算函数，输入不含NaT
+        arr: datetime64数组
+        fill: NaT位置的取值，见_restore_nat
+        *args: 传给func的其他参数
+
+    Returns:
+        func的结果（没有NaT时不做任何拷贝）
+    """
+    import numpy as np
+
+    missing = np.isnat(arr)
+    if not missing.any():
+        return func(arr, *args)
+    valid = ~missing
+    args = [arg[valid] if isinstance(arg, np.ndarray) and arg.shape == arr.shape else arg for arg in args]
+    result = func(arr[valid], *args)
+    if isinstance(result, tuple):
+        return tuple(_restore_nat(item, missing, fill) for item in result)
+    return _restore_nat(result, missing, fill)
+
+
+def _to_float_array(values: ArrayLike) -> 'np.ndarray':
+    """将时间戳批量输入转换为float64数组"""
+    import numpy as np
+
+    if hasattr(values, 'to_numpy'):
+        values = values.to_numpy()
+    return np.asarray(values, dtype=np.float64).reshape(-1)
+
+
+def _to_int_array(values: ArrayLike) -> 'np.ndarray':
+    """将整数批量输入转换为int64数组"""
+    import numpy as np
+
+    if hasattr(values, 'to_numpy'):
+        values = values.to_numpy()
+    return np.asarray(values, dtype=np.int64).reshape(-1)
+
+
+def _offset_at(second: int, from_local: bool) -> int:
+    """计算某一时刻本地时区相对UTC的偏移秒数"""
+    if from_local:
+        return second - int((_EPOCH + timedelta(seconds=second)).timestamp())
+    local = datetime.fromtimestamp(second)
+    return (local - _EPOCH) // _ONE_SECOND - second
+
+
+def _local_offsets(seconds: 'np.ndarray', from_local: bool) -> 'np.ndarray':
+    """
+    批量计算本地时区相对UTC的偏移秒数
+
+    先按天计算偏移，只有当天首尾偏移不同（发生夏令时切换）时，
+    才对当天的元素按15分钟分桶细算
+
+    Args:
+        seconds: 以秒为单位的整数数组（本地墙上时间或UTC时间戳），不能含NaT，由调用方先筛掉
+        from_local: True表示输入为本地墙上时间，False表示输入为UTC时间戳
+
+    Returns:
+        与输入等长的偏移秒数数组
+    """
+    import numpy as np
+
+    day_index = seconds // 86400
+    if len(day_index) == 0:
+        return np.zeros(0, dtype=np.int64)
+
+    first, last = int(day_index.min()), int(day_index.max())
+    if last - first < max(len(day_index), 1024):
+        # 日期跨度较小时直接按天建表，避免排序去重；相邻两天共用边界偏移
+        boundaries = np.array([_offset_at(d * 86400, from_local) for d in range(first, last + 2)],
+                              dtype=np.int64)
+        starts, ends = boundaries[:-1], boundaries[1:]
+        inverse = day_index - first
+    else:
+        days, inverse = np.unique(day_index, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        starts = np.array([_offset_at(d * 86400, from_local) for d in days.tolist()], dtype=np.int64)
+        ends = np.array([_offset_at(d * 86400 + 86400, from_local) for d in days.tolist()], dtype=np.int64)
+    day_changed = starts != ends
+    if not day_changed.any() and starts.min() == starts.max():
+        # 整个区间偏移一致（最常见的情况），无需逐元素查表
+        return np.full(len(seconds), starts[0], dtype=np.int64)
+    offsets = starts[inverse]
+
+    changed = day_changed[inverse]
+    if changed.any():
+        buckets, sub_inverse = np.unique(seconds[changed] // _OFFSET_BUCKET_SECONDS, return_inverse=True)
+        fine = np.array([_offset_at(b * _OFFSET_BUCKET_SECONDS, from_local) for b in buckets.tolist()],
+                        dtype=np.int64)
+        offsets[changed] = fine[sub_inverse.reshape(-1)]
+    return offsets
+
+
+def _get_zone(tz: Union[str, tzinfo]) -> tzinfo:
+    """将时区名称（如'Asia/Shanghai'）转换为ZoneInfo，tzinfo对象原样返回"""
+    if isinstance(tz, str):
+        from zoneinfo import ZoneInfo
+        return ZoneInfo(tz)
+    return tz
+
+
+def _zone_offset_at(second: int, zone: tzinfo, from_local: bool) -> int:
+    """
+    计算某一时刻指定时区相对UTC的偏移秒数
+
+    from_local为True时second表示该时区的墙上时间，重复或跳过的时刻按fold=0处理，
+    与datetime.replace(tzinfo=zone).timestamp()一致
+    """
+    if from_local:
+        offset = (_EPOCH + timedelta(seconds=second)).replace(tzinfo=zone).utcoffset()
+    else:
+        offset = datetime.fromtimestamp(second, zone).utcoffset()
+    return offset // _ONE_SECOND
+
+
+@lru_cache(maxsize=64)
+def _zone_transitions(zone: tzinfo) -> Tuple['np.ndarray', 'np.ndarray', 'np.ndarray']:
+    """
+    预计算时区在[1900, 2100)内的UTC偏移切换表（每个时区只计算一次）
+
+    先按天探测偏移变化，再在变化的那一天内二分查找精确的切换秒
+
+    Returns:
+        (切换时刻的UTC秒数, 各区间偏移秒数, 按墙上时间查找用的切换阈值)
+        偏移数组比切换表多一项：offsets[i]为第i次切换之前的偏移
+    """
+    import numpy as np
+
+    probes = list(range(_ZONE_TABLE_START, _ZONE_TABLE_END + 1, 86400))
+    probe_offsets = [_zone_offset_at(t, zone, False) for t in probes]
+    transitions = []
+    offsets = [probe_offsets[0]]
+    for k in np.flatnonzero(np.diff(probe_offsets)).tolist():
+        low, high = probes[k], probes[k + 1]
+        while high - low > 1:
+            middle = (low + high) // 2
+            if _zone_offset_at(middle, zone, False) == probe_offsets[k]:
+                low = middle
+            else:
+                high = middle
+        transitions.append(high)
+        offsets.append(probe_offsets[k + 1])
+
+    transitions = np.array(transitions, dtype=np.int64)
+    offsets = np.array(offsets, dtype=np.int64)
+    # 墙上时间到达 切换时刻 + max(切换前偏移, 切换后偏移) 后才使用新偏移：
+    # 夏令时开始跳过的时刻、结束时重复的时刻都沿用切换前的偏移（fold=0）
+    local_thresholds = transitions + np.maximum(offsets[:-1], offsets[1:])
+    return transitions, offsets, local_thresholds
+
+
+def _zone_offsets(seconds: 'np.ndarray', zone: tzinfo, from_local: bool) -> 'np.ndarray':
+    """
+    批量计算指定时区相对UTC的偏移秒数，在预计算的切换表上二分查找
+
+    Args:
+        seconds: 以秒为单位的整数数组（该时区的墙上时间或UTC时间戳），不能含NaT，由调用方先筛掉
+        zone: 时区
+        from_local: True表示输入为墙上时间，False表示输入为UTC时间戳
+
+    Returns:
+        与输入等长的偏移秒数数组
+    """
+    import numpy as np
+
+    transitions, offsets, local_thresholds = _zone_transitions(zone)
+    points = local_thresholds if from_local else transitions
+    if len(seconds) == 0:
+        return np.zeros(0, dtype=np.int64)
+    # 只在数据覆盖的那一段切换表上查找，缩短二分查找的路径
+    low, high = np.searchsorted(points, [seconds.min(), seconds.max()], side='right')
+    result = offsets[low:high + 1][np.searchsorted(points[low:high], seconds, side='right')]
+
+    outside = np.flatnonzero((seconds < _ZONE_TABLE_START) | (seconds >= _ZONE_TABLE_END))
+    for i in outside.tolist():
+        result[i] = _zone_offset_at(int(seconds[i]), zone, from_local)
+    return result
+
+
+def _days_in_month(year: int, month: int) -> int:
+    """某年某月的天数"""
+    if month == 2 and year % 4 == 0 and (year % 100 != 0 or year % 400 == 0):
+        return 29
+    return _DAYS_IN_MONTH[month]
+
+
+def _shift_months(value: Union[datetime, date], months: int) -> Union[datetime, date]:
+    """
+    按自然月加减，日期超出目标月天数时取月末（与relativedelta(months=n)一致）
+
+    Args:
+        value: datetime或date对象
+        months: 加减月数
+
+    Returns:
+        与输入同类型的对象
+    """
+    year, month = divmod(value.year * 12 + value.month - 1 + months, 12)
+    month += 1
+    day = value.day
+    if day > 28:
+        day = min(day, _days_in_month(year, month))
+    return value.replace(year=year, month=month, day=day)
+
+
+@lru_cache(maxsize=None)
+def _month_table() -> Tuple[int, 'np.ndarray', 'np.ndarray']:
+    """
+    预计算0001-01至9999-12每个月的起始日与天数
+
+    Returns:
+        (0001-01-01距1970-01-01的天数, 各月起始日相对0001-01-01的天数, 各月天数)
+        月份下标为 (year - 1) * 12 + (month - 1)，起始日表多一项9999年之后的哨兵
+    """
+    import numpy as np
+
+    starts = np.arange(np.datetime64('0001-01'), np.datetime64('10000-02'))
+    starts = starts.astype('datetime64[D]').view(np.int64)
+    base = int(starts[0])
+    starts = starts - base
+    return base, starts, np.diff(starts)
+
+
+def _month_index(days: 'np.ndarray', starts: 'np.ndarray') -> 'np.ndarray':
+    """
+    由相对0001-01-01的天数计算月份下标（(year - 1) * 12 + (month - 1)）
+
+    先用平均月长估算（400年共146097天、4800个月，误差不超过±1）再查表修正
+    """
+    index = days * 4800 // 146097
+    index -= starts[index] > days
+    index += starts[index + 1] <= days
+    return index
+
+
+def _datetime_components(arr: 'np.ndarray') -> Dict[str, 'np.ndarray']:
+    """
+    批量拆分datetime64[us]数组的年月日时分秒
+
+    Returns:
+        {'Y': 年, 'm': 月, 'd': 日, 'H': 时, 'M': 分, 'S': 秒}，均为int32数组
+    """
+    import numpy as np
+
+    base, starts, _ = _month_table()
+    micros = arr.view(np.int64)
+    days = micros // _DAY_US
+    seconds = ((micros - days * _DAY_US) // 1_000_000).astype(np.int32)
+    days -= base
+
+    index = _month_index(days, starts)
+    day = (days - starts[index]).astype(np.int32)
+    day += 1
+    year, month = np.divmod(index.astype(np.int32), 12)
+    year += 1
+    month += 1
+    hour, seconds = np.divmod(seconds, 3600)
+    minute, second = np.divmod(seconds, 60)
+    return {'Y': year, 'm': month, 'd': day, 'H': hour, 'M': minute, 'S': second}
+
+
+def _shift_months_array(arr: 'np.ndarray', months: Union[int, 'np.ndarray']) -> 'np.ndarray':
+    """
+    批量按自然月加减，语义与_shift_months一致
+
+    先用平均月长估算月份下标（误差不超过±1）再查表修正，
+    全程只做整数运算，不经过逐元素的日历换算
+
+    Args:
+        arr: datetime64[us]数组
+        months: 加减月数，整数或与arr等长的整数数组
+
+    Returns:
+        datetime64[us]数组
+    """
+    import numpy as np
+
+    base, starts, month_days = _month_table()
+    micros = arr.view(np.int64)
+    days = micros // _DAY_US
+    time_of_day = micros - days * _DAY_US
+    days -= base
+
+    index = _month_index(days, starts)
+    day_of_month = days - starts[index]
+
+    index += months
+    if len(index) and (index.min() < 0 or index.max() >= len(month_days)):
+        raise ValueError("year is out of range")
+    np.minimum(day_of_month, month_days[index] - 1, out=day_of_month)
+
+    result = starts[index] + day_of_month
+    result += base
+    result *= _DAY_US
+    result += time_of_day
+    return result.view(_DT64_UNIT)
+
+
+def _weekday(arr: 'np.ndarray') -> 'np.ndarray':
+    """批量计算星期几 (0=周一, 6=周日)，1970-01-01为周四"""
+    import numpy as np
+
+    if arr.dtype == np.dtype(_DT64_UNIT):
+        days = arr.view(np.int64) // 86_400_000_000
+    else:
+        days = arr.astype('datetime64[D]').view(np.int64)
+    # 原地运算，减少大数组的临时分配
+    days += 3
+    days %= 7
+    return days
+
+
+def _week_range(arr: 'np.ndarray') -> Tuple['np.ndarray', 'np.ndarray']:
+    """批量计算所在周的周一与周日（datetime64[D]）"""
+    import numpy as np
+
+    days = (arr.view(np.int64) // _DAY_US).view('datetime64[D]')
+    start = days - _weekday(arr).view('timedelta64[D]')
+    return start, start + np.timedelta64(6, 'D')
+
+
+def _time_bucket(arr: 'np.ndarray', granularity: str, output: str) -> 'np.ndarray':
+    """批量计算时间桶编号或起始时间，参数见time_bucket_batch"""
+    import numpy as np
+
+    micros = arr.view(np.int64)
+    if granularity in ('minute', 'hour'):
+        size = 60_000_000 if granularity == 'minute' else 3_600_000_000
+        keys = micros // size
+        return keys if output == 'key' else (keys * size).view(_DT64_UNIT)
+
+    days = micros // _DAY_US
+    if granularity == 'day':
+        return days if output == 'key' else days.view('datetime64[D]')
+    if granularity == 'week':
+        # 1970-01-01为周四，+3后按7天取整即以周一为界
+        keys = (days + 3) // 7
+        return keys if output == 'key' else (keys * 7 - 3).view('datetime64[D]')
+
+    base, starts, _ = _month_table()
+    index = _month_index(days - base, starts)
+    if granularity == 'quarter':
+        index -= index % 3
+    if output == 'start':
+        return (starts[index] + base).view('datetime64[D]')
+    index -= _EPOCH_MONTH_INDEX
+    return index if granularity == 'month' else index // 3
+
+
+def _to_timestamps(arr: 'np.ndarray', zone: Optional[tzinfo]) -> 'np.ndarray':
+    """把墙上时间批量换算为UTC时间戳（秒），zone为None时按本地时区"""
+    micros = arr.view('int64')
+    if zone is not None:
+        offsets = _zone_offsets(micros // 1_000_000, zone, from_local=True)
+    else:
+        offsets = _local_offsets(micros // 1_000_000, from_local=True)
+    offsets *= 1_000_000
+    result = micros - offsets
+    return result / 1e6
+
+
+def _from_timestamps(ts: 'np.ndarray', zone: Optional[tzinfo]) -> 'np.ndarray':
+    """把UTC时间戳（秒，不含NaN）批量换算为墙上时间，zone为None时按本地时区"""
+    import numpy as np
+
+    micros = np.round(ts * 1e6).astype(np.int64)
+    if zone is not None:
+        offsets = _zone_offsets(micros // 1_000_000, zone, from_local=False)
+    else:
+        offsets = _local_offsets(micros // 1_000_000, from_local=False)
+    return (micros + offsets * 1_000_000).view(_DT64_UNIT)
+
+
+class CompiledFormat:
+    """
+    预编译的时间格式化器
+
+    格式字符串只在创建时解析一次。只包含 %Y %m %d %H %M %S、%% 与普通文本的格式
+    走快速路径：单个值用预先生成的%模板拼接，数组按列批量拆出年月日时分秒后
+    直接写入定长字符串数组；其余格式回退到strftime（数组按去重后的值格式化）。
+    """
+
+    # 快速路径支持的指令及其固定宽度
+    FAST_DIRECTIVES = {'Y': 4, 'm': 2, 'd': 2, 'H': 2, 'M': 2, 'S': 2}
+    # 每批处理的行数，让批量拆分的临时数组留在CPU缓存内
+    CHUNK_SIZE = 1 << 16
+
+    def __init__(self, fmt: str):
+        self.fmt = fmt
+        self.parts = []
+        self.fast = True
+        template = []
+        literal = []
+        i = 0
+        while i < len(fmt):
+            char = fmt[i]
+            if char == '%' and i + 1 < len(fmt) and fmt[i + 1] in self.FAST_DIRECTIVES:
+                if literal:
+                    self.parts.append(('literal', ''.join(literal)))
+                    literal = []
+                directive = fmt[i + 1]
+                self.parts.append(('directive', directive))
+                # strftime的%Y对1000年以前的年份不补零
+                template.append('%d' if directive == 'Y' else '%02d')
+                i += 2
+            elif char == '%' and fmt[i + 1:i + 2] == '%':
+                literal.append('%')
+                template.append('%%')
+                i += 2
+            elif char == '%':
+                self.fast = False
+                break
+            else:
+                literal.append(char)
+                template.append(char)
+                i += 1
+        if literal:
+            self.parts.append(('literal', ''.join(literal)))
+
+        self._template = ''.join(template)
+        self._fields = tuple(_FIELD_NAMES[value] for kind, value in self.parts if kind == 'directive')
+
+    def __call__(self, dt: Union[datetime, date]) -> str:
+        """格式化单个datetime或date对象"""
+        if not self.fast:
+            return dt.strftime(self.fmt)
+        return self._template % tuple(getattr(dt, field, 0) for field in self._fields)
+
+    def __repr__(self) -> str:
+        return f"CompiledFormat({self.fmt!r}, fast={self.fast})"
+
+    def format_array(self, values: ArrayLike) -> 'np.ndarray':
+        """
+        批量格式化
+
+        Args:
+            values: 时间序列（列表、datetime64数组或pandas Series）
+
+        Returns:
+            定长Unicode字符串数组，NaT格式化为'NaT'
+        """
+        return _map_valid(self._format_valid, _to_datetime64(values), 'NaT')
+
+    def _format_valid(self, arr: 'np.ndarray') -> 'np.ndarray':
+        """批量格式化不含NaT的datetime64[us]数组"""
+        import numpy as np
+
+        if not self.fast:
+            # 重复值只格式化一次
+            uniques, inverse = np.unique(arr, return_inverse=True)
+            formatted = np.array([dt.strftime(self.fmt) for dt in uniques.astype(object)], dtype=object)
+            return formatted[inverse.reshape(-1)].astype(str)
+
+        width = sum(len(value) if kind == 'literal' else self.FAST_DIRECTIVES[value]
+                    for kind, value in self.parts)
+        result = np.empty(len(arr), dtype=f'U{max(width, 1)}')
+        if width == 0 or len(arr) == 0:
+            return result
+        # U数组的底层就是每字符一个UCS4码点；先按"字符位置 x 行"连续写入，再整块转置拷贝
+        codes = result.view(np.uint32).reshape(len(arr), width)
+        has_year = any(kind == 'directive' and value == 'Y' for kind, value in self.parts)
+
+        for begin in range(0, len(arr), self.CHUNK_SIZE):
+            components = _datetime_components(arr[begin:begin + self.CHUNK_SIZE])
+            rows = len(components['S'])
+            columns = np.empty((width, rows), dtype=np.uint32)
+            pos = 0
+            for kind, value in self.parts:
+                if kind == 'literal':
+                    for char in value:
+                        columns[pos] = ord(char)
+                        pos += 1
+                elif value == 'Y':
+                    high, low = np.divmod(components['Y'], 100)
+                    _write_two_digits(columns, pos, high)
+                    _write_two_digits(columns, pos + 2, low)
+                    pos += 4
+                else:
+                    _write_two_digits(columns, pos, components[value])
+                    pos += 2
+            codes[begin:begin + rows] = columns.T
+
+            # 1000年以前的年份strftime不补零，这部分行单独格式化
+            if has_year:
+                for row in np.flatnonzero(components['Y'] < 1000):
+                    result[begin + row] = self(arr[begin + row].astype(object))
+        return result
+
+
+def _write_two_digits(columns: 'np.ndarray', pos: int, values: 'np.ndarray') -> None:
+    """将0-99的整数写成两位数字字符（码点）到columns[pos]和columns[pos + 1]"""
+    tens = values // 10
+    columns[pos + 1] = values - tens * 10 + 48
+    tens += 48
+    columns[pos] = tens
+
+
+# 快速路径指令对应的datetime属性名
+_FIELD_NAMES = {'Y': 'year', 'm': 'month', 'd': 'day', 'H': 'hour', 'M': 'minute', 'S': 'second'}
+
+
+@lru_cache(maxsize=256)
+def _compile_format(fmt: str) -> CompiledFormat:
+    """按格式字符串缓存编译结果"""
+    return CompiledFormat(fmt)
+
+
+class CoarseClock:
+    """
+    粗粒度缓存时钟
+
+    在分辨率(resolution)内重复读取当前时间时直接返回缓存值，并缓存本次刻度内
+    now(fmt)的格式化结果。刷新方式有两种：
+    - 默认：每次读取时用单调时钟判断是否超过分辨率，超过才重新读取墙上时间
+    - background=True：由后台守护线程按分辨率定期刷新，读取只是一次属性访问
+
+    读取到的时间最多比真实时间落后一个分辨率。可以作为上下文管理器在代码块内
+    临时启用，也可以通过DateTimeUtils.enable_coarse_clock全局启用。
+    """
+
+    def __init__(self, resolution: float = 0.001, background: bool = False):
+        if resolution <= 0:
+            raise ValueError(f"分辨率必须为正数: {resolution}")
+        self.resolution = resolution
+        self.background = background
+        self._last_refresh = 0.0
+        self._tick = (datetime.now(), {})
+        self._stop_event = None
+        self._thread = None
+        self._previous = []
+
+    def _refresh(self, mono: float) -> None:
+        # 时间与格式化缓存作为一个元组整体替换，读取方不会看到不一致的组合
+        self._tick = (datetime.now(), {})
+        self._last_refresh = mono
+
+    def _run(self) -> None:
+        while not self._stop_event.wait(self.resolution):
+            self._refresh(time.monotonic())
+
+    def now(self) -> datetime:
+        """获取缓存的当前时间"""
+        if not self.background:
+            mono = time.monotonic()
+            if mono - self._last_refresh >= self.resolution:
+                self._refresh(mono)
+        return self._tick[0]
+
+    def strftime(self, fmt: str) -> str:
+        """获取当前时间的格式化字符串，同一刻度内相同格式只格式化一次"""
+        self.now()
+        current, formatted = self._tick
+        result = formatted.get(fmt)
+        if result is None:
+            result = formatted[fmt] = _compile_format(fmt)(current)
+        return result
+
+    def start(self) -> 'CoarseClock':
+        """启动后台刷新线程（仅background=True时有效）"""
+        if self.background and self._thread is None:
+            self._refresh(time.monotonic())
+            self._stop_event = threading.Event()
+            self._thread = threading.Thread(target=self._run, name='CoarseClock', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """停止后台刷新线程"""
+        if self._thread is not None:
+            self._stop_event.set()
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self) -> 'CoarseClock':
+        global _CLOCK
+        self._previous.append(_CLOCK)
+        _CLOCK = self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        global _CLOCK
+        _CLOCK = self._previous.pop()
+        self.stop()
+
+
+# 全局启用的粗粒度时钟，None表示每次直接读取系统时间
+_CLOCK: Optional[CoarseClock] = None
+
+
+def _now() -> datetime:
+    """获取当前时间，启用粗粒度时钟时读取缓存值"""
+    clock = _CLOCK
+    return clock.now() if clock is not None else datetime.now()
+
+
+def _iter_date_range(
+        start: datetime,
+        end: Optional[datetime],
+        step: int,
+        unit: str,
+        fmt: Optional[str]
+) -> Iterator[Union[datetime, str]]:
+    """date_range的惰性实现，逐个产生时间，内存占用与区间长度无关"""
+    formatter = _compile_format(fmt) if fmt else None
+    delta = timedelta(seconds=step * _TIME_UNITS[unit]) if unit != 'months' else None
+    current = start
+    k = 0
+    while True:
+        if delta is None:
+            current = _shift_months(start, k * step)
+        if end is not None and (current > end if step > 0 else current < end):
+            return
+        yield formatter(current) if formatter else current
+        k += 1
+        if delta is not None:
+            current += delta
 
 
 class DateTimeUtils:
@@ -31,8 +821,11 @@ class DateTimeUtils:
         Returns:
             格式化后的时间字符串或datetime对象
         """
+        clock = _CLOCK
+        if clock is not None:
+            return clock.strftime(fmt) if fmt else clock.now()
         current = datetime.now()
-        return current.strftime(fmt) if fmt else current
+        return _compile_format(fmt)(current) if fmt else current
 
     @staticmethod
     def add_time(
@@ -56,48 +849,78 @@ class DateTimeUtils:
             计算后的datetime对象
         """
         if base_time is None:
-            base_time = datetime.now()
+            base_time = _now()
         elif isinstance(base_time, str):
-            base_time = datetime.fromisoformat(base_time)
+            base_time = _PARSER.parse_datetime(base_time)
 
         if months:
-            # 使用relativedelta处理月份加减（考虑不同月份天数）
-            result = base_time + relativedelta(months=months)
-            result += timedelta(days=days, hours=hours, minutes=minutes)
-        else:
-            result = base_time + timedelta(days=days, hours=hours, minutes=minutes)
+            # 按自然月加减（考虑不同月份天数，超出时取月末）
+            base_time = _shift_months(base_time, months)
 
-        return result
+        return base_time + timedelta(days=days, hours=hours, minutes=minutes)
+
+    @staticmethod
+    def shift_months(
+            base_time: Union[datetime, date, str],
+            months: int
+    ) -> Union[datetime, date]:
+        """
+        按自然月加减，日期超出目标月天数时取月末（如1月31日加1个月为2月28日）
+
+        Args:
+            base_time: 基准时间
+            months: 加减月数
+
+        Returns:
+            与输入同类型的datetime或date对象（字符串输入返回datetime）
+        """
+        if isinstance(base_time, str):
+            base_time = _PARSER.parse_datetime(base_time)
+        return _shift_months(base_time, months)
 
     @staticmethod
-    def to_timestamp(dt: Union[datetime, str] = None) -> float:
+    def to_timestamp(
+            dt: Union[datetime, str] = None,
+            tz: Union[str, tzinfo] = None
+    ) -> float:
         """
         将datetime转换为时间戳
 
         Args:
             dt: datetime对象或时间字符串
+            tz: 时区名称（如'Asia/Shanghai'）或tzinfo，无时区的dt按该时区解释，
+                默认按本地时区解释
 
         Returns:
             时间戳（浮点数，单位秒）
         """
         if dt is None:
-            dt = datetime.now()
-        elif isinstance(dt, str):
-            dt = datetime.fromisoformat(dt)
+            dt = _now()
+        else:
+            if isinstance(dt, str):
+                dt = _PARSER.parse_datetime(dt)
+            if tz is not None and dt.tzinfo is None:
+                dt = dt.replace(tzinfo=_get_zone(tz))
 
         return dt.timestamp()
 
     @staticmethod
-    def from_timestamp(timestamp: float) -> datetime:
+    def from_timestamp(
+            timestamp: float,
+            tz: Union[str, tzinfo] = None
+    ) -> datetime:
         """
         将时间戳转换为datetime对象
 
         Args:
             timestamp: 时间戳
+            tz: 时区名称（如'Asia/Shanghai'）或tzinfo，默认返回本地时间
 
         Returns:
-            datetime对象
+            datetime对象（指定tz时为带时区的datetime）
         """
+        if tz is not None:
+            return datetime.fromtimestamp(timestamp, _get_zone(tz))
         return datetime.fromtimestamp(timestamp)
 
     @staticmethod
@@ -118,22 +941,15 @@ class DateTimeUtils:
             时间差数值
         """
         if isinstance(time1, str):
-            time1 = datetime.fromisoformat(time1)
+            time1 = _PARSER.parse_datetime(time1)
         if time2 is None:
-            time2 = datetime.now()
+            time2 = _now()
         elif isinstance(time2, str):
-            time2 = datetime.fromisoformat(time2)
+            time2 = _PARSER.parse_datetime(time2)
 
         diff = abs((time2 - time1).total_seconds())
 
-        units = {
-            'seconds': 1,
-            'minutes': 60,
-            'hours': 3600,
-            'days': 86400
-        }
-
-        return diff / units.get(unit, 1)
+        return diff / _TIME_UNITS.get(unit, 1)
 
     @staticmethod
     def future_date(
@@ -153,12 +969,12 @@ class DateTimeUtils:
             格式化后的日期字符串
         """
         if from_date is None:
-            from_date = date.today()
+            from_date = _now().date()
         elif isinstance(from_date, str):
-            from_date = date.fromisoformat(from_date)
+            from_date = _PARSER.parse_date(from_date)
 
         future = from_date + timedelta(days=days_after)
-        return future.strftime(fmt)
+        return _compile_format(fmt)(future)
 
     @staticmethod
     def format_time(
@@ -176,8 +992,8 @@ class DateTimeUtils:
             格式化后的时间字符串
         """
         if isinstance(dt, str):
-            dt = datetime.fromisoformat(dt)
-        return dt.strftime(fmt)
+            dt = _PARSER.parse_datetime(dt)
+        return _compile_format(fmt)(dt)
 
     @staticmethod
     def is_weekend(dt: Union[datetime, str] = None) -> bool:
@@ -191,9 +1007,9 @@ class DateTimeUtils:
             True如果是周末，否则False
         """
         if dt is None:
-            dt = datetime.now()
+            dt = _now()
         elif isinstance(dt, str):
-            dt = datetime.fromisoformat(dt)
+            dt = _PARSER.parse_datetime(dt)
 
         return dt.weekday() >= 5
 
@@ -211,9 +1027,9 @@ class DateTimeUtils:
             (周一开始日期, 周日结束日期)
         """
         if dt is None:
-            dt = datetime.now()
+            dt = _now()
         elif isinstance(dt, str):
-            dt = datetime.fromisoformat(dt)
+            dt = _PARSER.parse_datetime(dt)
 
         # 获取星期几 (0=周一, 6=周日)
         weekday = dt.weekday()
@@ -223,4 +1039,421 @@ class DateTimeUtils:
         # 计算周日的日期
         end_date = start_date + timedelta(days=6)
 
-        return (start_date, end_date)
\ No newline at end of file
+        return (start_date, end_date)
+
+    @staticmethod
+    def compile_format(fmt: str) -> CompiledFormat:
+        """
+        预编译格式字符串，返回可重复使用的格式化器（按格式字符串缓存）
+
+        Args:
+            fmt: 格式字符串，如'%Y-%m-%d %H:%M:%S'
+
+        Returns:
+            CompiledFormat对象：formatter(dt)格式化单个值，
+            formatter.format_array(values)批量格式化
+
+        Example:
+            formatter = DateTimeUtils.compile_format('%Y/%m/%d')
+            formatter(datetime(2025, 1, 1))            # '2025/01/01'
+            formatter.format_array(datetime64_array)   # 字符串数组
+        """
+        return _compile_format(fmt)
+
+    # ==================== 日期序列 ====================
+
+    @staticmethod
+    def date_range(
+            start: Union[datetime, date, str],
+            end: Union[datetime, date, str] = None,
+            step: int = 1,
+            unit: str = 'days',
+            lazy: bool = False,
+            fmt: str = None
+    ) -> Union['np.ndarray', Iterator[Union[datetime, str]]]:
+        """
+        生成日期时间序列（包含end）
+
+        Args:
+            start: 起始时间
+            end: 结束时间（包含），lazy=True时可以为None表示无限序列
+            step: 步长，可以为负数（此时end应早于start）
+            unit: 步长单位，可选：'days', 'hours', 'minutes', 'months'
+            lazy: True返回惰性生成器（常量内存，适合超长或无限区间），
+                  False一次性返回datetime64[us]数组
+            fmt: 指定时返回格式化后的字符串
+
+        Returns:
+            lazy=False时为datetime64[us]数组（或字符串数组），
+            lazy=True时为逐个产生datetime（或字符串）的生成器
+
+        Note:
+            按月步进时每一项都从start计算（第k项为start加k*step个月），
+            1月31日按月步进依次为2月28日、3月31日，不会因月末对齐而逐月漂移
+        """
+        if not step:
+            raise ValueError("步长不能为0")
+        if unit != 'months' and unit not in _TIME_UNITS:
+            raise ValueError(f"不支持的步长单位: {unit}")
+
+        start = _parse_datetime(start)
+        if end is not None:
+            end = _parse_datetime(end)
+        elif not lazy:
+            raise ValueError("非惰性模式必须指定end")
+
+        if lazy:
+            return _iter_date_range(start, end, step, unit, fmt)
+
+        import numpy as np
+
+        start64 = np.datetime64(start, 'us')
+        end64 = np.datetime64(end, 'us')
+        if unit == 'months':
+            months = (end.year - start.year) * 12 + end.month - start.month
+            offsets = np.arange(0, months // step + 1, dtype=np.int64) * step
+            values = _shift_months_array(np.full(len(offsets), start64), offsets)
+            values = values[values <= end64] if step > 0 else values[values >= end64]
+        else:
+            delta = np.timedelta64(step * _TIME_UNITS[unit], 's')
+            # arange不包含终点，向步进方向多延伸1微秒以包含end
+            stop = end64 + np.timedelta64(1 if step > 0 else -1, 'us')
+            values = np.arange(start64, stop, delta).astype(_DT64_UNIT)
+
+        if fmt:
+            return _compile_format(fmt).format_array(values)
+        return values
+
+    # ==================== 粗粒度时钟 ====================
+
+    @staticmethod
+    def coarse_clock(resolution: float = 0.001, background: bool = False) -> CoarseClock:
+        """
+        创建粗粒度缓存时钟，配合with语句在代码块内启用
+
+        Args:
+            resolution: 分辨率（秒），如0.001表示1毫秒，1表示1秒
+            background: 是否使用后台线程刷新，否则在读取时按单调时钟判断刷新
+
+        Returns:
+            CoarseClock对象
+
+        Example:
+            with DateTimeUtils.coarse_clock(0.001):
+                DateTimeUtils.now('%Y-%m-%d %H:%M:%S')
+        """
+        return CoarseClock(resolution, background)
+
+    @staticmethod
+    def enable_coarse_clock(resolution: float = 0.001, background: bool = False) -> CoarseClock:
+        """
+        全局启用粗粒度缓存时钟，now()及各方法的默认当前时间都会读取缓存值
+
+        Args:
+            resolution: 分辨率（秒）
+            background: 是否使用后台线程刷新
+
+        Returns:
+            已启用的CoarseClock对象
+        """
+        global _CLOCK
+        DateTimeUtils.disable_coarse_clock()
+        _CLOCK = CoarseClock(resolution, background).start()
+        return _CLOCK
+
+    @staticmethod
+    def disable_coarse_clock() -> None:
+        """关闭全局粗粒度时钟，恢复每次直接读取系统时间"""
+        global _CLOCK
+        clock, _CLOCK = _CLOCK, None
+        if clock is not None:
+            clock.stop()
+
+    # ==================== 字符串解析缓存 ====================
+
+    @staticmethod
+    def parse_many(values: Iterable[Union[datetime, date, str]]) -> List[datetime]:
+        """
+        批量解析时间字符串，每个不同的字符串只解析一次，再按位置广播回结果
+
+        Args:
+            values: ISO格式时间字符串组成的序列，非字符串元素原样返回
+
+        Returns:
+            与输入一一对应的datetime列表
+        """
+        values = list(values)
+        parsed = {}
+        for value in values:
+            if value not in parsed:
+                parsed[value] = _PARSER.parse_datetime(value) if isinstance(value, str) else value
+        return [parsed[value] for value in values]
+
+    @staticmethod
+    def set_parse_cache_size(maxsize: Optional[int]) -> None:
+        """
+        设置字符串解析缓存的大小（会清空已有缓存）
+
+        Args:
+            maxsize: 缓存条目上限，None表示不限大小，0表示关闭缓存
+        """
+        _PARSER.configure(maxsize)
+
+    @staticmethod
+    def parse_cache_info() -> Dict[str, Any]:
+        """
+        获取字符串解析缓存的统计信息
+
+        Returns:
+            {'hits': 命中次数, 'misses': 未命中次数, 'maxsize': 上限, 'currsize': 当前条目数}
+        """
+        return _PARSER.cache_info()
+
+    @staticmethod
+    def clear_parse_cache() -> None:
+        """清空字符串解析缓存及统计"""
+        _PARSER.cache_clear()
+
+    # ==================== 批量（向量化）接口 ====================
+
+    @staticmethod
+    def add_time_batch(
+            base_times: ArrayLike,
+            days: int = 0,
+            hours: int = 0,
+            minutes: int = 0,
+            months: int = 0
+    ) -> 'np.ndarray':
+        """
+        批量时间加减计算，语义与add_time一致
+
+        Args:
+            base_times: 基准时间序列（列表、datetime64数组或pandas Series）
+            days: 加减天数
+            hours: 加减小时数
+            minutes: 加减分钟数
+            months: 加减月数
+
+        Returns:
+            datetime64[us]数组
+        """
+        import numpy as np
+
+        arr = _to_datetime64(base_times)
+
+        if months:
+            arr = _map_valid(_shift_months_array, arr, np.datetime64('NaT', 'us'), months)
+
+        delta = np.timedelta64(days * 86400 + hours * 3600 + minutes * 60, 's')
+        return arr + delta
+
+    @staticmethod
+    def shift_months_batch(
+            base_times: ArrayLike,
+            months: Union[int, ArrayLike]
+    ) -> 'np.ndarray':
+        """
+        批量按自然月加减，日期超出目标月天数时取月末
+
+        Args:
+            base_times: 基准时间序列
+            months: 加减月数，整数或与base_times等长的整数序列
+
+        Returns:
+            datetime64[us]数组
+        """
+        import numpy as np
+
+        arr = _to_datetime64(base_times)
+        if not isinstance(months, int):
+            months = _to_int_array(months)
+        return _map_valid(_shift_months_array, arr, np.datetime64('NaT', 'us'), months)
+
+    @staticmethod
+    def to_timestamp_batch(
+            dts: ArrayLike,
+            tz: Union[str, tzinfo] = None
+    ) -> 'np.ndarray':
+        """
+        批量将时间转换为时间戳
+
+        Args:
+            dts: 时间序列（列表、datetime64数组或pandas Series），视为tz时区的墙上时间
+            tz: 时区名称（如'Asia/Shanghai'）或tzinfo，默认按本地时区解释。
+                指定时区时该时区的切换表只计算一次，之后按二分查找批量换算
+
+        Returns:
+            float64时间戳数组（单位秒），NaT对应NaN
+        """
+        import numpy as np
+
+        zone = _get_zone(tz) if tz is not None else None
+        return _map_valid(_to_timestamps, _to_datetime64(dts), np.nan, zone)
+
+    @staticmethod
+    def from_timestamp_batch(
+            timestamps: ArrayLike,
+            tz: Union[str, tzinfo] = None
+    ) -> 'np.ndarray':
+        """
+        批量将时间戳转换为墙上时间
+
+        Args:
+            timestamps: 时间戳序列（单位秒）
+            tz: 时区名称（如'Asia/Shanghai'）或tzinfo，默认转换为本地时间
+
+        Returns:
+            datetime64[us]数组（tz时区的墙上时间，不带时区信息），NaN对应NaT
+        """
+        import numpy as np
+
+        zone = _get_zone(tz) if tz is not None else None
+        ts = _to_float_array(timestamps)
+        missing = np.isnan(ts)
+        if missing.any():
+            return _restore_nat(_from_timestamps(ts[~missing], zone), missing, np.datetime64('NaT', 'us'))
+        return _from_timestamps(ts, zone)
+
+    @staticmethod
+    def time_difference_batch(
+            times1: ArrayLike,
+            times2: Union[ArrayLike, datetime, str] = None,
+            unit: str = 'seconds'
+    ) -> 'np.ndarray':
+        """
+        批量计算时间差，语义与time_difference一致
+
+        Args:
+            times1: 时间序列1
+            times2: 时间序列2或单个时间，默认为当前时间
+            unit: 返回单位，可选：'seconds', 'minutes', 'hours', 'days'
+
+        Returns:
+            float64时间差数组（绝对值），任一侧为NaT时为NaN
+        """
+        import numpy as np
+
+        arr1 = _to_datetime64(times1)
+        if times2 is None:
+            arr2 = np.datetime64(_now(), 'us')
+        elif isinstance(times2, (str, datetime, date)):
+            arr2 = np.datetime64(_parse_datetime(times2), 'us')
+        else:
+            arr2 = _to_datetime64(times2)
+
+        diff = arr2 - arr1
+        # NaT参与相减仍为NaT，转为秒数前换成NaN
+        seconds = np.abs(diff.astype(np.int64)) / 1e6
+        seconds[np.isnat(diff)] = np.nan
+        return seconds / _TIME_UNITS.get(unit, 1)
+
+    @staticmethod
+    def format_time_batch(
+            dts: ArrayLike,
+            fmt: str = "%Y-%m-%d %H:%M:%S"
+    ) -> 'np.ndarray':
+        """
+        批量格式化时间
+
+        Args:
+            dts: 时间序列
+            fmt: 格式字符串
+
+        Returns:
+            字符串数组
+        """
+        return _compile_format(fmt).format_array(dts)
+
+    @staticmethod
+    def future_date_batch(
+            days_after: ArrayLike,
+            from_date: Union[date, str] = None,
+            fmt: str = "%Y-%m-%d"
+    ) -> 'np.ndarray':
+        """
+        批量计算多少天之后的日期，语义与future_date一致
+
+        Args:
+            days_after: 天数序列
+            from_date: 起始日期，默认为今天
+            fmt: 返回格式
+
+        Returns:
+            格式化后的日期字符串数组
+        """
+        import numpy as np
+
+        if from_date is None:
+            from_date = _now().date()
+        elif isinstance(from_date, str):
+            from_date = _PARSER.parse_date(from_date)
+
+        start = np.datetime64(from_date, 'D')
+        days = start + _to_int_array(days_after).astype('timedelta64[D]')
+        return _compile_format(fmt).format_array(days)
+
+    @staticmethod
+    def is_weekend_batch(dts: ArrayLike) -> 'np.ndarray':
+        """
+        批量判断是否为周末
+
+        Args:
+            dts: 时间序列
+
+        Returns:
+            bool数组，NaT为False
+        """
+        return _map_valid(lambda arr: _weekday(arr) >= 5, _to_datetime64(dts), False)
+
+    @staticmethod
+    def time_bucket_batch(
+            dts: ArrayLike,
+            granularity: str = 'day',
+            output: str = 'key'
+    ) -> 'np.ndarray':
+        """
+        批量将时间映射到时间桶，一次向量化计算，可直接作为分组列使用
+
+        Args:
+            dts: 时间序列（列表、datetime64数组或pandas Series）
+            granularity: 粒度，可选：'minute', 'hour', 'day',
+                         'week'（周一为一周开始，与get_week_range一致）, 'month', 'quarter'
+            output: 'key' 返回整数桶编号（自1970-01-01起的分钟/小时/天/周/月/季度序号，
+                    保持时间顺序）；'start' 返回桶的起始时间
+
+        Returns:
+            output='key'时为int64数组；output='start'时，minute/hour为datetime64[us]数组，
+            其余粒度为datetime64[D]数组。NaT对应NaT；output='key'时含NaT的结果为float64，
+            NaT对应NaN（分组时与pandas一样被丢弃）
+
+        Example:
+            df['week'] = DateTimeUtils.time_bucket_batch(df['created_at'], 'week', output='start')
+            TableUtils.aggregate_data(df, 'week', {'amount': 'sum'})
+        """
+        import numpy as np
+
+        if granularity not in _BUCKET_GRANULARITIES:
+            raise ValueError(f"不支持的时间粒度: {granularity}")
+        if output not in ('key', 'start'):
+            raise ValueError(f"不支持的输出类型: {output}")
+
+        if output == 'key':
+            fill = np.nan
+        else:
+            fill = np.datetime64('NaT', 'us' if granularity in ('minute', 'hour') else 'D')
+        return _map_valid(_time_bucket, _to_datetime64(dts), fill, granularity, output)
+
+    @staticmethod
+    def get_week_range_batch(dts: ArrayLike) -> Tuple['np.ndarray', 'np.ndarray']:
+        """
+        批量获取每个日期所在周的起止日期
+
+        Args:
+            dts: 时间序列
+
+        Returns:
+            (周一开始日期数组, 周日结束日期数组)，均为datetime64[D]，NaT对应NaT
+        """
+        import numpy as np
+
+        return _map_valid(_week_range, _to_datetime64(dts), np.datetime64('NaT', 'D'))
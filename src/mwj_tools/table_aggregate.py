@@ -0,0 +1,494 @@
+# -*- coding: utf-8 -*-
+"""
+@Time : 2026/10/18 00:10
+@Email : Lvan826199@163.com
+@公众号 : 梦无矶测开实录
+@File : table_aggregate.py
+"""
+__author__ = "梦无矶小仔"
+
+"""
+流式分组聚合模块
+对数据块逐个计算每组的可合并中间状态（计数、和、最小值、最大值、平方差和），
+各块的状态可以任意顺序合并，整个输入不必同时放在内存里；
+另提供按分组键哈希分区、多进程并行的整表聚合
+"""
+import multiprocessing
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from pathlib import Path
+from typing import Union, List, Dict, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+from .table_parallel import resolve_jobs
+
+# 支持的聚合函数及其依赖的中间状态
+_FUNC_STATES = {
+    'count': ('count',),
+    'sum': ('sum',),
+    'mean': ('count', 'sum'),
+    'min': ('min',),
+    'max': ('max',),
+    'var': ('count', 'sum', 'm2'),
+    'std': ('count', 'sum', 'm2'),
+}
+# 中间状态的固定顺序
+_STATE_ORDER = ('count', 'sum', 'min', 'max', 'm2')
+
+
+def _normalize_aggregations(aggregations: Dict[str, Union[str, List[str]]]) -> Dict[str, List[str]]:
+    """{列名: 聚合函数或列表} 统一为 {列名: [聚合函数]}，并检查是否支持"""
+    normalized = {}
+    for column, funcs in aggregations.items():
+        funcs = [funcs] if isinstance(funcs, str) else list(funcs)
+        unsupported = [func for func in funcs if func not in _FUNC_STATES]
+        if unsupported:
+            raise ValueError(f"流式聚合不支持的聚合函数: {unsupported}，可选：{list(_FUNC_STATES)}")
+        normalized[column] = funcs
+    return normalized
+
+
+def merge_states(states: pd.DataFrame, keys: List[str]) -> pd.DataFrame:
+    """
+    合并同一组的多份中间状态
+
+    计数、和直接相加，最小/最大值取最值；平方差和按Chan等人的并行公式合并：
+    M2 = ΣM2_i + Σn_i·(mean_i - mean)²，其中 mean = Σsum_i / Σn_i
+
+    Args:
+        states: 行索引为分组键（可重复）、列为 (列名, 状态名) 的中间状态
+        keys: 分组键名
+
+    Returns:
+        每组一行的中间状态
+    """
+    if not states.index.has_duplicates:
+        return states
+
+    def group(values: pd.Series):
+        return values.groupby(level=keys, sort=False)
+
+    merged = {}
+    for column, state in states.columns:
+        values = states[(column, state)]
+        if state in ('count', 'sum'):
+            merged[(column, state)] = group(values).sum()
+        elif state == 'min':
+            merged[(column, state)] = group(values).min()
+        elif state == 'max':
+            merged[(column, state)] = group(values).max()
+        else:
+            count = states[(column, 'count')]
+            mean = group(states[(column, 'sum')]).sum() / group(count).sum()
+            # 按分组键把合并后的均值对齐回每份状态
+            spread = count * (states[(column, 'sum')] / count - mean.reindex(states.index).to_numpy()) ** 2
+            merged[(column, state)] = group(values).sum() + group(spread).sum()
+    return pd.DataFrame(merged, columns=states.columns)
+
+
+class StreamingAggregator:
+    """
+    流式分组聚合器
+
+    每个数据块用pandas分组计算中间状态，各块的状态先暂存，暂存的行数超过max_groups时
+    一次性合并。合并后的分组数仍超过max_groups时，按分组键的哈希值把状态分成若干分区
+    写入临时目录；结束时逐个分区合并并计算结果，峰值内存约为一个分区的分组数
+
+    Example:
+        aggregator = StreamingAggregator('city', {'amount': ['sum', 'mean', 'std']})
+        for chunk in TableUtils.iter_table('orders.csv'):
+            aggregator.update(chunk)
+        result = aggregator.result()
+    """
+
+    # 溢写时的分区数
+    PARTITIONS = 16
+
+    def __init__(
+            self,
+            group_by: Union[str, List[str]],
+            aggregations: Dict[str, Union[str, List[str]]],
+            max_groups: int = 1_000_000,
+            spill_dir: Optional[str] = None
+    ):
+        """
+        Args:
+            group_by: 分组列名
+            aggregations: 聚合操作字典，同 TableUtils.aggregate_data
+                聚合函数: 'sum', 'mean', 'count', 'min', 'max', 'std', 'var'
+            max_groups: 内存中最多保留的分组数，超过后溢写到磁盘
+            spill_dir: 溢写临时文件所在目录，None表示系统临时目录
+        """
+        self.group_by = group_by
+        self.keys = [group_by] if isinstance(group_by, str) else list(group_by)
+        self.aggregations = aggregations
+        self.funcs = _normalize_aggregations(aggregations)
+        self.max_groups = max_groups
+        self.spill_dir = spill_dir
+        self.rows = 0
+        self._pending = []
+        self._pending_rows = 0
+        self._spill = None
+        self._spill_files = [[] for _ in range(self.PARTITIONS)]
+
+    def __repr__(self) -> str:
+        return (f"StreamingAggregator({self.keys}, rows={self.rows}, "
+                f"states_in_memory={self._pending_rows}, spills={self.spills})")
+
+    @property
+    def states(self) -> Optional[pd.DataFrame]:
+        """内存中尚未溢写的中间状态（每组一行），没有时为None"""
+        self._compact()
+        return self._pending[0] if self._pending else None
+
+    @property
+    def spills(self) -> int:
+        """已溢写到磁盘的次数"""
+        return len(self._spill_files[0])
+
+    def chunk_states(self, chunk: pd.DataFrame) -> pd.DataFrame:
+        """
+        计算一个数据块每组的中间状态
+
+        Args:
+            chunk: 数据块
+
+        Returns:
+            行索引为分组键、列为 (列名, 状态名) 的DataFrame
+        """
+        grouped = chunk.groupby(self.keys, sort=False)
+        states = {}
+        for column, funcs in self.funcs.items():
+            needed = {state for func in funcs for state in _FUNC_STATES[func]}
+            series = grouped[column]
+            for state in _STATE_ORDER:
+                if state not in needed:
+                    continue
+                if state == 'm2':
+                    states[(column, state)] = series.var(ddof=0) * states[(column, 'count')]
+                else:
+                    states[(column, state)] = getattr(series, state)()
+        return pd.DataFrame(states)
+
+    def update(self, chunk: pd.DataFrame) -> 'StreamingAggregator':
+        """
+        并入一个数据块
+
+        Args:
+            chunk: 数据块
+
+        Returns:
+            聚合器本身
+        """
+        self.rows += len(chunk)
+        self.merge(self.chunk_states(chunk))
+        return self
+
+    def merge(self, states: pd.DataFrame) -> 'StreamingAggregator':
+        """
+        并入一份中间状态（chunk_states的结果，或另一个聚合器的states）
+
+        Args:
+            states: 中间状态
+
+        Returns:
+            聚合器本身
+        """
+        self._pending.append(states)
+        self._pending_rows += len(states)
+        if self._pending_rows > self.max_groups:
+            self._compact()
+            if self._pending_rows > self.max_groups:
+                self._spill_states()
+        return self
+
+    def result(self) -> pd.DataFrame:
+        """
+        计算最终结果，格式与 TableUtils.aggregate_data 一致（按分组键排序）
+
+        Returns:
+            聚合后的DataFrame
+        """
+        if not self.spills:
+            return self.finalize(self.states)
+
+        self._spill_states()
+        parts = []
+        for files in self._spill_files:
+            states = pd.concat([pd.read_pickle(path) for path in files])
+            parts.append(merge_states(states, self.keys))
+        self._cleanup()
+        return self.finalize(pd.concat(parts))
+
+    def finalize(self, states: Optional[pd.DataFrame]) -> pd.DataFrame:
+        """
+        由每组一行的中间状态计算聚合结果
+
+        Args:
+            states: 中间状态，None表示没有输入
+
+        Returns:
+            聚合后的DataFrame
+        """
+        if states is None:
+            states = pd.DataFrame(
+                {(column, state): pd.Series(dtype=float)
+                 for column, funcs in self.funcs.items()
+                 for state in _STATE_ORDER if state in {s for func in funcs for s in _FUNC_STATES[func]}},
+                index=pd.MultiIndex.from_arrays([[]] * len(self.keys), names=self.keys)
+                if len(self.keys) > 1 else pd.Index([], name=self.keys[0])
+            )
+        states = states.sort_index()
+
+        results = {}
+        for column, funcs in self.funcs.items():
+            for func in funcs:
+                if func in ('count', 'sum', 'min', 'max'):
+                    value = states[(column, func)]
+                elif func == 'mean':
+                    value = states[(column, 'sum')] / states[(column, 'count')]
+                else:
+                    # 样本方差（ddof=1），与pandas一致；不足两个值时为NaN
+                    count = states[(column, 'count')]
+                    value = states[(column, 'm2')] / (count - 1).where(count > 1)
+                    if func == 'std':
+                        value = np.sqrt(value)
+                results[(column, func)] = value
+
+        result = pd.DataFrame(results, index=states.index)
+        # 与groupby().agg()一致：聚合函数均为字符串时列名为单层
+        if all(isinstance(funcs, str) for funcs in self.aggregations.values()):
+            result.columns = result.columns.get_level_values(0)
+        return result.reset_index()
+
+    def _compact(self) -> None:
+        """一次性合并暂存的各份状态"""
+        if len(self._pending) > 1:
+            self._pending = [merge_states(pd.concat(self._pending), self.keys)]
+            self._pending_rows = len(self._pending[0])
+
+    def _spill_states(self) -> None:
+        """把内存中的状态按分组键哈希分区写入临时文件"""
+        states = self.states
+        if states is None or not len(states):
+            return
+        if self._spill is None:
+            self._spill = tempfile.TemporaryDirectory(prefix='mwj_groupby_', dir=self.spill_dir)
+        hashes = pd.util.hash_pandas_object(states.index.to_frame(index=False), index=False).to_numpy()
+        partitions = hashes % self.PARTITIONS
+        spill = self.spills
+        for partition in range(self.PARTITIONS):
+            path = Path(self._spill.name) / f'part{partition}_{spill}.pkl'
+            states[partitions == partition].to_pickle(path)
+            self._spill_files[partition].append(path)
+        self._pending = []
+        self._pending_rows = 0
+
+    def _cleanup(self) -> None:
+        if self._spill is not None:
+            self._spill.cleanup()
+            self._spill = None
+        self._spill_files = [[] for _ in range(self.PARTITIONS)]
+
+
+def aggregate_chunks(
+        chunks: Iterable[pd.DataFrame],
+        group_by: Union[str, List[str]],
+        aggregations: Dict[str, Union[str, List[str]]],
+        max_groups: int = 1_000_000,
+        spill_dir: Optional[str] = None
+) -> pd.DataFrame:
+    """
+    对数据块迭代器做分组聚合，参数见 StreamingAggregator
+
+    Returns:
+        聚合后的DataFrame
+    """
+    aggregator = StreamingAggregator(group_by, aggregations, max_groups=max_groups, spill_dir=spill_dir)
+    for chunk in chunks:
+        aggregator.update(chunk)
+    return aggregator.result()
+
+
+# 行数少于该值时进程间调度的开销大于收益，直接单进程聚合
+PARALLEL_MIN_ROWS = 200_000
+# 分组键哈希用的乘数（64位黄金分割常数）
+_HASH_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+
+# 每种进程数一个进程池：不同进程数的并发调用各用各的，不会关闭别的调用正在使用的进程池
+_executors: Dict[int, ProcessPoolExecutor] = {}
+_executors_lock = threading.Lock()
+
+
+def _get_executor(n_jobs: int) -> ProcessPoolExecutor:
+    """复用进程池，避免每次聚合都重新启动工作进程"""
+    with _executors_lock:
+        executor = _executors.get(n_jobs)
+        if executor is None:
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+            executor = _executors[n_jobs] = ProcessPoolExecutor(n_jobs, mp_context=context)
+    return executor
+
+
+def _is_shareable(dtype) -> bool:
+    """是否为可直接放入共享内存的numpy数值/时间类型"""
+    return isinstance(dtype, np.dtype) and dtype.kind in 'biufmM'
+
+
+def _parallel_supported(df: pd.DataFrame, keys: List[str], aggregations: dict) -> bool:
+    """
+    判断能否并行聚合：分组键不是分类类型，聚合列是numpy数值/时间类型且不是分组键，
+    聚合函数均为字符串（可跨进程传递）
+    """
+    if df.columns.has_duplicates or any(key not in df.columns for key in keys):
+        return False
+    if any(isinstance(df[key].dtype, pd.CategoricalDtype) for key in keys):
+        return False
+    for column, funcs in aggregations.items():
+        funcs = [funcs] if isinstance(funcs, str) else funcs
+        if column in keys or column not in df.columns or not _is_shareable(df[column].dtype):
+            return False
+        if not all(isinstance(func, str) for func in funcs):
+            return False
+    return True
+
+
+def _key_hash(values: np.ndarray) -> np.ndarray:
+    """分组键的64位乘法哈希，相等的键（包括0.0与-0.0）哈希值相同"""
+    if values.dtype.kind == 'f':
+        values = values + values.dtype.type(0)
+    bits = values.view(f'u{values.dtype.itemsize}').astype(np.uint64)
+    return bits * _HASH_MULTIPLIER
+
+
+def _partition_ids(keys: List[np.ndarray], partitions: int) -> np.ndarray:
+    """每行所属的哈希分区号（同一组的行必然落在同一分区）"""
+    hashes = _key_hash(keys[0])
+    for values in keys[1:]:
+        hashes = (hashes ^ _key_hash(values)) * _HASH_MULTIPLIER
+    ids = (hashes >> np.uint64(32)) % np.uint64(partitions)
+    # 分区号用窄整数类型，稳定排序时走基数排序
+    return ids.astype(np.uint16 if partitions <= np.iinfo(np.uint16).max else np.int64)
+
+
+def _aggregate_partition(
+        name: str,
+        layout: List[tuple],
+        rows: int,
+        order_offset: int,
+        start: int,
+        stop: int,
+        group_by: Union[str, List[str]],
+        aggregations: dict
+) -> pd.DataFrame:
+    """工作进程：按共享内存中的分区行号 order[start:stop] 取出自己分区的行并分组聚合"""
+    shm = shared_memory.SharedMemory(name=name, track=False)
+    try:
+        arrays = {column: np.ndarray(rows, dtype=dtype, buffer=shm.buf, offset=offset)
+                  for column, dtype, offset in layout}
+        selected = np.ndarray(stop - start, dtype=np.intp, buffer=shm.buf,
+                              offset=order_offset + start * np.dtype(np.intp).itemsize)
+        # take按原顺序复制出本分区的行，之后不再引用共享内存
+        frame = pd.DataFrame({column: values.take(selected) for column, values in arrays.items()}, copy=False)
+        del arrays, selected
+    finally:
+        shm.close()
+    return frame.groupby(group_by).agg(aggregations)
+
+
+def aggregate_parallel(
+        df: pd.DataFrame,
+        group_by: Union[str, List[str]],
+        aggregations: Dict[str, Union[str, List[str]]],
+        n_jobs: int = -1
+) -> pd.DataFrame:
+    """
+    多进程并行分组聚合，结果与 df.groupby(group_by).agg(aggregations).reset_index() 完全一致
+
+    用到的列复制到一块共享内存，工作进程只接收共享内存名与分区号，不序列化数据。
+    主进程按分组键的哈希值把行分到各分区（同一组必然落在同一分区），按分区号稳定排序的行号
+    也放入共享内存；每个工作进程只取出自己分区的一段行号（保持原有行序，求和等结果与单进程逐位一致）
+    并独立聚合，最后按分组键排序拼接。
+    非数值的分组键先编码为整数，工作进程按编码分组，结果再还原为原值
+
+    不满足并行条件（分类类型分组键、非数值聚合列、自定义聚合函数）
+    或行数少于PARALLEL_MIN_ROWS时退回单进程聚合。
+    进程池的启动方式为forkserver/spawn，在脚本中调用时需放在 if __name__ == '__main__': 下
+
+    Args:
+        df: 原始DataFrame
+        group_by: 分组列名
+        aggregations: 聚合操作字典，同 TableUtils.aggregate_data
+        n_jobs: 进程数，-1表示使用全部CPU核
+
+    Returns:
+        聚合后的DataFrame
+    """
+    keys = [group_by] if isinstance(group_by, str) else list(group_by)
+    n_jobs = resolve_jobs(n_jobs)
+    if n_jobs <= 1 or len(df) < PARALLEL_MIN_ROWS or not _parallel_supported(df, keys, aggregations):
+        return df.groupby(group_by).agg(aggregations).reset_index()
+
+    arrays = {}
+    uniques = {}
+    for key in keys:
+        values = df[key]
+        if _is_shareable(values.dtype):
+            arrays[key] = values.to_numpy()
+        else:
+            codes, uniques[key] = pd.factorize(values, sort=True)
+            # 缺失的分组键编码为-1，换成浮点NaN后与groupby一样被丢弃
+            arrays[key] = codes if (codes >= 0).all() else np.where(codes >= 0, codes, np.nan)
+    for column in aggregations:
+        arrays[column] = df[column].to_numpy()
+
+    # 分区只在主进程哈希一次：按分区号稳定排序得到各分区的行号（分区内保持原有行序），
+    # 工作进程只读取自己分区对应的一段
+    ids = _partition_ids([arrays[key] for key in keys], n_jobs)
+    order = np.argsort(ids, kind='stable').astype(np.intp, copy=False)
+    offsets = np.concatenate(([0], np.cumsum(np.bincount(ids, minlength=n_jobs))))
+
+    rows = len(df)
+    layout, size = [], 0
+    for column, values in arrays.items():
+        layout.append((column, values.dtype.str, size))
+        size += -(-rows * values.dtype.itemsize // 64) * 64
+    order_offset = size
+    size += rows * order.itemsize
+    shm = shared_memory.SharedMemory(create=True, size=size)
+    try:
+        for column, dtype, offset in layout:
+            view = np.ndarray(rows, dtype=dtype, buffer=shm.buf, offset=offset)
+            np.copyto(view, arrays[column])
+            del view
+        view = np.ndarray(rows, dtype=np.intp, buffer=shm.buf, offset=order_offset)
+        np.copyto(view, order)
+        del view
+
+        executor = _get_executor(n_jobs)
+        futures = [
+            executor.submit(_aggregate_partition, shm.name, layout, rows, order_offset,
+                            int(offsets[partition]), int(offsets[partition + 1]), group_by, aggregations)
+            for partition in range(n_jobs)
+        ]
+        result = pd.concat([future.result() for future in futures]).sort_index()
+    finally:
+        shm.close()
+        shm.unlink()
+
+    if uniques:
+        index = result.index
+        if isinstance(index, pd.MultiIndex):
+            result.index = pd.MultiIndex.from_arrays(
+                [uniques[name].take(index.get_level_values(name).astype(np.intp)) if name in uniques
+                 else index.get_level_values(name) for name in index.names],
+                names=index.names
+            )
+        else:
+            result.index = uniques[index.name].take(index.to_numpy().astype(np.intp)).rename(index.name)
+    return result.reset_index()
@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+"""
+@Time : 2026/10/18 23:30
+@Email : Lvan826199@163.com
+@公众号 : 梦无矶测开实录
+@File : table_compat.py
+"""
+__author__ = "梦无矶小仔"
+
+"""
+pandas运行模式相关的辅助函数，供各表格模块共用
+"""
+import pandas as pd
+
+
+def copy_on_write() -> bool:
+    """
+    pandas是否开启了Copy-on-Write（pandas 3起默认开启）
+
+    开启时取列、浅复制得到的对象与原DataFrame共享数据，写入时才复制，
+    原地修改不会影响其他对象；关闭时浅复制后的原地修改会写回原DataFrame
+
+    Returns:
+        True如果已开启
+    """
+    return getattr(pd.options.mode, 'copy_on_write', True) is True
@@ -0,0 +1,264 @@
+# -*- coding: utf-8 -*-
+"""
+@Time : 2026/10/18 21:00
+@Email : Lvan826199@163.com
+@公众号 : 梦无矶测开实录
+@File : table_dtypes.py
+"""
+__author__ = "梦无矶小仔"
+
+"""
+列类型压缩模块
+读取得到的int64/float64/object列往往远大于数据实际需要：
+- 整数列换成能容纳最小值与最大值的最窄有符号整数类型（原列为无符号时保持无符号）
+- 浮点列在float32能无损表示全部取值时换成float32
+- 字符串列在更省内存时换成category（取值重复多）或pyarrow字符串（取值重复少，需要pyarrow）
+选出的类型可以保存为JSON，后续读取直接套用，不再逐列推断
+"""
+import importlib.util
+import json
+from typing import Dict, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+# 不同取值个数占非空行数的比例不超过此值时才考虑category
+CATEGORY_MAX_RATIO = 0.5
+
+# 只选有符号类型（与pd.to_numeric(downcast='integer')一致）：无符号列做减法等运算时会静默回绕，
+# 原列已经是无符号类型时才保留无符号
+_INTEGER_DTYPES = [np.dtype(name) for name in ('int8', 'int16', 'int32', 'int64')]
+_UNSIGNED_DTYPES = [np.dtype(name) for name in ('uint8', 'uint16', 'uint32', 'uint64')]
+
+_ARROW_STRING = 'string[pyarrow]'
+# 估算内存占用时抽样的行数
+_SAMPLE_ROWS = 1024
+
+
+def estimate_nbytes(df: pd.DataFrame) -> int:
+    """
+    估算DataFrame的内存占用
+
+    memory_usage(deep=True)要逐个计算字符串对象的大小，与写盘本身耗时相当，
+    行数较多时改为对均匀抽样的行计算后按比例放大
+
+    Args:
+        df: DataFrame
+
+    Returns:
+        估算的字节数（不含索引）
+    """
+    if len(df) <= _SAMPLE_ROWS * 4:
+        return int(df.memory_usage(index=False, deep=True).sum())
+    sample = df.take(np.linspace(0, len(df) - 1, _SAMPLE_ROWS).astype(np.intp))
+    return int(sample.memory_usage(index=False, deep=True).sum() * len(df) / _SAMPLE_ROWS)
+
+
+def _has_pyarrow() -> bool:
+    return importlib.util.find_spec('pyarrow') is not None
+
+
+def _dtype_name(dtype) -> str:
+    """可保存并能用pandas_dtype还原的类型名（pyarrow字符串的str()与python字符串相同，需要单独区分）"""
+    if isinstance(dtype, pd.StringDtype) and dtype.storage == 'pyarrow':
+        return _ARROW_STRING
+    return str(dtype)
+
+
+def _integer_dtype(low, high, unsigned: bool = False) -> Optional[np.dtype]:
+    """能容纳 [low, high] 的最窄有符号整数类型，unsigned为True时选无符号类型"""
+    for dtype in (_UNSIGNED_DTYPES if unsigned else _INTEGER_DTYPES):
+        info = np.iinfo(dtype)
+        if info.min <= low and high <= info.max:
+            return dtype
+    return None
+
+
+def _float32_lossless(values: np.ndarray) -> bool:
+    """float32能否无损表示全部取值（含NaN、无穷）"""
+    with np.errstate(over='ignore'):
+        return np.array_equal(values.astype(np.float32).astype(values.dtype), values, equal_nan=True)
+
+
+def _arrow_nbytes(series: pd.Series) -> int:
+    """
+    估算转为pyarrow large_string后的占用：字符串的UTF-8字节数 + 每行8字节偏移 + 空值位图，
+    字节数按均匀抽样的行放大，不构造整列的Arrow数组
+    """
+    n = len(series)
+    sample = series
+    if n > _SAMPLE_ROWS * 4:
+        sample = series.take(np.linspace(0, n - 1, _SAMPLE_ROWS).astype(np.intp))
+    data = sum(len(value.encode('utf-8')) for value in sample.dropna()) * n // max(len(sample), 1)
+    validity = (n + 7) // 8 if series.hasnans else 0
+    return data + 8 * (n + 1) + validity
+
+
+def _string_dtype(series: pd.Series, category_ratio: float, arrow: bool) -> Optional[str]:
+    """字符串列在object、category、pyarrow字符串中占用最小的类型，object最小时为None"""
+    if pd.api.types.infer_dtype(series, skipna=True) != 'string':
+        return None
+    # 逐个字符串计算大小很慢，只需比较各候选的大小，按抽样估算
+    sizes = {None: estimate_nbytes(series.to_frame())}
+    non_null = series.dropna()
+    uniques = pd.unique(non_null.to_numpy())
+    if len(non_null) and len(uniques) <= category_ratio * len(non_null):
+        codes = _integer_dtype(-1, len(uniques)).itemsize
+        sizes['category'] = codes * len(series) + estimate_nbytes(pd.DataFrame({'uniques': uniques}))
+    if arrow:
+        sizes[_ARROW_STRING] = _arrow_nbytes(series)
+    return min(sizes, key=sizes.get)
+
+
+def infer_dtypes(df: pd.DataFrame, category_ratio: float = CATEGORY_MAX_RATIO,
+                 strings: Union[bool, str] = 'auto') -> Dict[str, str]:
+    """
+    为每列选出更省内存且不丢失信息的类型
+
+    Args:
+        df: 输入DataFrame
+        category_ratio: 不同取值个数占非空行数的比例不超过此值的字符串列才考虑category
+        strings: 是否考虑pyarrow字符串，'auto'表示安装了pyarrow时考虑
+
+    Returns:
+        {列名: 类型名}，只包含需要改变类型的列
+    """
+    arrow = _has_pyarrow() if strings == 'auto' else bool(strings)
+    dtypes = {}
+    for column in df.columns:
+        series = df[column]
+        dtype = series.dtype
+        target = None
+        if not isinstance(dtype, np.dtype) or not len(series):
+            continue
+        if dtype.kind in 'iu':
+            values = series.to_numpy()
+            target = _integer_dtype(values.min(), values.max(), unsigned=dtype.kind == 'u')
+        elif dtype.kind == 'f' and dtype.itemsize > 4:
+            target = np.dtype(np.float32) if _float32_lossless(series.to_numpy()) else None
+        elif dtype == object:
+            target = _string_dtype(series, category_ratio, arrow)
+        if target is not None and str(target) != str(dtype):
+            dtypes[column] = str(target)
+    return dtypes
+
+
+def apply_dtypes(df: pd.DataFrame, dtypes: Dict[str, str]) -> pd.DataFrame:
+    """
+    按指定类型转换各列，不会截断或丢失数据：
+    整数列的取值超出指定类型时换成能容纳的最窄类型，有符号列不会换成无符号类型（运算时会回绕），
+    浮点列不能无损转为float32时保持原类型
+
+    Args:
+        df: 输入DataFrame（不修改）
+        dtypes: {列名: 类型名}，如 infer_dtypes 或 load_dtypes 的结果；df中没有的列忽略
+
+    Returns:
+        转换后的DataFrame，未转换的列与df共享数据
+    """
+    result = df.copy(deep=False)
+    for column, name in dtypes.items():
+        if column not in df.columns or _dtype_name(df[column].dtype) == name:
+            continue
+        series = df[column]
+        target = pd.api.types.pandas_dtype(name)
+        if isinstance(target, np.dtype) and target.kind in 'iu':
+            if not (isinstance(series.dtype, np.dtype) and series.dtype.kind in 'iu'):
+                continue
+            values = series.to_numpy()
+            unsigned = series.dtype.kind == 'u'
+            if len(values):
+                info = np.iinfo(target)
+                if values.min() < info.min or values.max() > info.max or (target.kind == 'u' and not unsigned):
+                    target = _integer_dtype(values.min(), values.max(), unsigned=unsigned)
+        elif isinstance(target, np.dtype) and target.kind == 'f':
+            if not (isinstance(series.dtype, np.dtype) and series.dtype.kind in 'iuf'):
+                continue
+            if target.itemsize < series.dtype.itemsize and not _float32_lossless(series.to_numpy()):
+                continue
+        result[column] = series.astype(target)
+    return result
+
+
+def save_dtypes(dtypes: Dict[str, str], filepath: str) -> None:
+    """把类型映射保存为JSON文件"""
+    with open(filepath, 'w', encoding='utf-8') as f:
+        json.dump(dtypes, f, ensure_ascii=False, indent=2)
+
+
+def load_dtypes(filepath: str) -> Dict[str, str]:
+    """读取 save_dtypes 保存的类型映射"""
+    with open(filepath, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def parser_dtypes(dtypes: Dict[str, str]) -> Dict[str, str]:
+    """
+    可以直接交给CSV解析器的类型：category与pyarrow字符串在解析时就不产生Python字符串对象；
+    整数与浮点类型在解析器中溢出时会静默截断，仍由 apply_dtypes 检查后转换
+    """
+    return {column: name for column, name in dtypes.items() if name in ('category', _ARROW_STRING)}
+
+
+class DtypeReport:
+    """
+    optimize_dtypes 的结果说明
+
+    Attributes:
+        dtypes: {列名: 新类型名}，只包含改变了类型的列，可用 save 保存供后续读取使用
+        table: 每列一行，列为 before_dtype、after_dtype、before_bytes、after_bytes、saved_bytes
+    """
+
+    def __init__(self, dtypes: Dict[str, str], table: pd.DataFrame):
+        self.dtypes = dtypes
+        self.table = table
+
+    def __repr__(self) -> str:
+        return (f"DtypeReport(columns_changed={len(self.dtypes)}, saved_bytes={self.saved_bytes}, "
+                f"ratio={self.ratio:.2f}x)")
+
+    @property
+    def saved_bytes(self) -> int:
+        """总共节省的字节数"""
+        return int(self.table['saved_bytes'].sum())
+
+    @property
+    def ratio(self) -> float:
+        """压缩前后的内存占用之比"""
+        after = self.table['after_bytes'].sum()
+        return float(self.table['before_bytes'].sum() / after) if after else 1.0
+
+    def save(self, filepath: str) -> None:
+        """把选出的类型保存为JSON文件，可传给 read_table / iter_table 的dtypes参数"""
+        save_dtypes(self.dtypes, filepath)
+
+
+def optimize_dtypes(df: pd.DataFrame, dtypes: Optional[Dict[str, str]] = None,
+                    category_ratio: float = CATEGORY_MAX_RATIO, strings: Union[bool, str] = 'auto') -> tuple:
+    """
+    压缩各列类型
+
+    Args:
+        df: 输入DataFrame（不修改）
+        dtypes: 已保存的类型映射，指定时不再推断
+        category_ratio: 见 infer_dtypes
+        strings: 见 infer_dtypes
+
+    Returns:
+        (压缩后的DataFrame, DtypeReport)
+    """
+    if dtypes is None:
+        dtypes = infer_dtypes(df, category_ratio=category_ratio, strings=strings)
+    result = apply_dtypes(df, dtypes)
+    before = df.memory_usage(deep=True, index=False)
+    after = result.memory_usage(deep=True, index=False)
+    table = pd.DataFrame({
+        'before_dtype': df.dtypes.map(_dtype_name),
+        'after_dtype': result.dtypes.map(_dtype_name),
+        'before_bytes': before,
+        'after_bytes': after,
+        'saved_bytes': before - after
+    })
+    changed = {column: dtype for column, dtype in table['after_dtype'].items()
+               if dtype != table.at[column, 'before_dtype']}
+    return result, DtypeReport(changed, table)
@@ -0,0 +1,466 @@
+# -*- coding: utf-8 -*-
+"""
+@Time : 2026/10/17 23:20
+@Email : Lvan826199@163.com
+@公众号 : 梦无矶测开实录
+@File : table_index.py
+"""
+__author__ = "梦无矶小仔"
+
+"""
+DataFrame列索引模块
+为常驻内存、反复筛选的DataFrame建立列索引，filter_data匹配到索引时不再全表扫描：
+- 哈希索引：'==', 'in', 'not in'
+- 排序索引：'>', '<', '>=', '<='
+- n-gram索引：'contains', 'contains_literal'（子串查找）
+"""
+import re
+import weakref
+from collections import defaultdict
+from bisect import bisect_left, bisect_right
+from typing import Union, List, Dict, Any, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+from .table_compat import copy_on_write
+
+
+def _position_dtype(n: int) -> type:
+    """行位置数组使用的整数类型，行数较少时用int32节省一半内存"""
+    return np.int32 if n < 2 ** 31 else np.int64
+
+
+# 正则元字符；不含这些字符的模式按普通子串查找，结果与正则匹配相同
+_REGEX_META = re.compile(r'[.^$*+?{}\[\]\\|()]')
+
+
+def literal_substring(op: str, value: Any) -> Optional[str]:
+    """
+    contains类条件等价的普通子串
+
+    Args:
+        op: 'contains'（正则）或 'contains_literal'（普通子串）
+        value: 模式
+
+    Returns:
+        普通子串；模式包含正则元字符时返回None
+    """
+    if not isinstance(value, str):
+        return None
+    if op == 'contains_literal' or (op == 'contains' and not _REGEX_META.search(value)):
+        return value
+    return None
+
+
+def _buffer_address(series: pd.Series) -> int:
+    """列底层数据的标识：NumPy列为数据缓冲区地址，其他为数组对象的id"""
+    if isinstance(series.dtype, np.dtype):
+        return series.to_numpy().__array_interface__['data'][0]
+    return id(series.array)
+
+
+def column_unchanged(df: pd.DataFrame, column: str, series: pd.Series, address: int) -> bool:
+    """
+    检查df[column]是否仍是先前取到的列，规则见 ColumnIndex；只比较对象与地址，开销与行数无关
+
+    Args:
+        df: DataFrame
+        column: 列名
+        series: 先前取到的列对象（调用方需一直持有）
+        address: 先前取列时的 _buffer_address
+
+    Returns:
+        True如果列未被修改过
+    """
+    if column not in df.columns:
+        return False
+    current = df[column]
+    return current is series or (copy_on_write()
+                                 and len(current) == len(series)
+                                 and current.dtype == series.dtype
+                                 and _buffer_address(current) == address)
+
+
+class ColumnIndex:
+    """
+    列索引基类
+
+    索引持有建立时的列对象，每次使用前校验列是否被修改过：
+    - 默认模式下pandas对列对象有缓存，任何经过pandas的修改（列赋值、loc/iloc/at写入、
+      增删行等）都会清除缓存，之后取到的列不再是同一个对象
+    - Copy-on-Write模式下每次取列都是新对象，改为比较底层缓冲区：索引持有列的引用，
+      任何修改都会写入复制出的新缓冲区
+    校验不读取列的内容。关闭Copy-on-Write时，链式赋值（df[col][i] = x）与直接改写 df[col].values
+    等原地写入同一个列对象或缓冲区的修改无法检测，之后需调用 drop_index 或重新 create_index；
+    开启Copy-on-Write时链式赋值不会修改df，只有改写 .values 等原始缓冲区的写入无法检测
+    """
+
+    kind = ''
+    # 可以通过本索引计算的操作符
+    operators = ()
+
+    def __init__(self, df: pd.DataFrame, column: str):
+        self.column = column
+        self._series = series = df[column]
+        self._length = len(series)
+        self._dtype = series.dtype
+        self._address = _buffer_address(series)
+        self._build(series)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.column!r}, {self.nbytes} bytes)"
+
+    @property
+    def nbytes(self) -> int:
+        """索引结构占用的内存字节数（不含被索引的列本身）"""
+        raise NotImplementedError
+
+    def is_valid(self, df: pd.DataFrame) -> bool:
+        """
+        检查索引是否仍与df的当前数据一致
+
+        Args:
+            df: 建立索引的DataFrame
+
+        Returns:
+            True如果索引可用，否则False
+        """
+        return column_unchanged(df, self.column, self._series, self._address)
+
+    def count(self, op: str, value: Any) -> Optional[int]:
+        """
+        不生成行位置，只计算满足条件的行数，用于选择最有效的索引
+
+        Returns:
+            行数；索引无法处理该条件时返回None
+        """
+        raise NotImplementedError
+
+    def lookup(self, op: str, value: Any) -> Optional[np.ndarray]:
+        """
+        通过索引计算满足条件的行
+
+        Args:
+            op: 操作符
+            value: 比较值
+
+        Returns:
+            升序的行位置数组；索引无法处理该条件时返回None
+        """
+        raise NotImplementedError
+
+    def _build(self, series: pd.Series) -> None:
+        raise NotImplementedError
+
+
+class HashIndex(ColumnIndex):
+    """
+    哈希索引：按取值分组的行位置
+
+    factorize得到每行的取值编号，行位置按编号排序后存放，
+    order[offsets[k]:offsets[k+1]] 为第k个取值的全部行
+    """
+
+    kind = 'hash'
+    operators = ('==', 'in', 'not in')
+
+    def _build(self, series: pd.Series) -> None:
+        codes, uniques = pd.factorize(series, use_na_sentinel=False)
+        self._uniques = pd.Index(uniques)
+        # 预先建立取值的哈希表，第一次查询不必再等待
+        self._uniques.get_indexer_for(self._uniques[:1])
+        # 缺失值统一为一个取值编号，与isin中NaN/None互相匹配的语义一致
+        missing = np.flatnonzero(pd.isna(uniques))
+        self._na_code = int(missing[0]) if len(missing) else -1
+        self._order = np.argsort(codes.astype(_position_dtype(len(uniques)))).astype(_position_dtype(len(codes)))
+        self._offsets = np.concatenate(([0], np.cumsum(np.bincount(codes, minlength=len(uniques)))))
+
+    @property
+    def nbytes(self) -> int:
+        return int(self._order.nbytes + self._offsets.nbytes + self._uniques.memory_usage(deep=True))
+
+    def count(self, op: str, value: Any) -> Optional[int]:
+        codes = self._codes(op, value)
+        if codes is None:
+            return None
+        matched = int((self._offsets[codes + 1] - self._offsets[codes]).sum())
+        return self._length - matched if op == 'not in' else matched
+
+    def lookup(self, op: str, value: Any) -> Optional[np.ndarray]:
+        codes = self._codes(op, value)
+        if codes is None:
+            return None
+        rows = np.concatenate([self._order[self._offsets[c]:self._offsets[c + 1]] for c in codes]
+                              or [np.array([], dtype=self._order.dtype)])
+        if op == 'not in':
+            mask = np.ones(self._length, dtype=bool)
+            mask[rows] = False
+            return np.flatnonzero(mask)
+        return np.sort(rows).astype(np.int64)
+
+    def _codes(self, op: str, value: Any) -> Optional[np.ndarray]:
+        """条件匹配到的取值编号，无法通过哈希查找表达时返回None"""
+        if op == '==':
+            if not pd.api.types.is_scalar(value):
+                return None
+            # NaN与任何值（包括NaN）比较都不相等
+            if pd.isna(value):
+                return np.array([], dtype=np.intp)
+            value = [value]
+        elif op not in ('in', 'not in') or isinstance(value, str):
+            return None
+
+        targets = [v for v in value if not (pd.api.types.is_scalar(v) and pd.isna(v))]
+        is_bool = [isinstance(v, (bool, np.bool_)) for v in targets]
+        if (self._dtype == bool and not all(is_bool)) or (self._dtype != bool and any(is_bool)):
+            # 布尔值与0/1按数值相等（isin的语义），按取值哈希查找无法表达，退回扫描
+            return None
+        codes = self._uniques.get_indexer_for(targets) if targets else np.array([], dtype=np.intp)
+        if len(targets) < len(value) and self._na_code >= 0:
+            codes = np.append(codes, self._na_code)
+        return np.unique(codes[codes >= 0])
+
+
+class SortedIndex(ColumnIndex):
+    """
+    排序索引：按列值排序后的行位置，范围条件通过二分查找定位
+
+    只支持NumPy数值、布尔与日期时间列；NaN/NaT排在末尾，不参与比较
+    """
+
+    kind = 'sorted'
+    operators = ('>', '<', '>=', '<=')
+
+    def _build(self, series: pd.Series) -> None:
+        if not (isinstance(series.dtype, np.dtype) and series.dtype.kind in 'biufmM'):
+            raise ValueError(f"排序索引只支持数值或日期时间列: {self.column} ({series.dtype})")
+        values = series.to_numpy()
+        self._order = np.argsort(values).astype(_position_dtype(len(values)))
+        self._valid = int(len(values) - series.isna().sum())
+
+    @property
+    def nbytes(self) -> int:
+        return int(self._order.nbytes)
+
+    def count(self, op: str, value: Any) -> Optional[int]:
+        bounds = self._bounds(op, value)
+        return None if bounds is None else bounds[1] - bounds[0]
+
+    def lookup(self, op: str, value: Any) -> Optional[np.ndarray]:
+        bounds = self._bounds(op, value)
+        if bounds is None:
+            return None
+        return np.sort(self._order[bounds[0]:bounds[1]]).astype(np.int64)
+
+    def _bounds(self, op: str, value: Any) -> Optional[tuple]:
+        """满足条件的行在排序后的区间[lo, hi)"""
+        if op not in self.operators:
+            return None
+        values = self._series.to_numpy()
+        if values.dtype.kind in 'mM':
+            value = (pd.Timestamp(value) if values.dtype.kind == 'M' else pd.Timedelta(value)).to_numpy()
+        # 在排序后的行位置上二分查找；NaN/NaT排在末尾，只在前self._valid个位置中查找。
+        # 不用np.searchsorted(sorter=...)：它每次都要校验并转换整个sorter数组
+        search = bisect_right if op in ('>', '<=') else bisect_left
+        position = search(self._order, value, 0, self._valid, key=values.__getitem__)
+        return (position, self._valid) if op in ('>', '>=') else (0, position)
+
+
+class NgramIndex(ColumnIndex):
+    """
+    n-gram子串索引：适合对同一列反复做contains查询
+
+    列中不同的取值（按str转换，与astype(str)一致）各编号一次，记录每个n-gram出现在哪些取值中。
+    查询子串时取其各n-gram倒排表的交集作为候选，再逐个确认，最后按取值编号展开为行；
+    短于n的子串直接在不同取值上查找。只能处理不含正则元字符的模式
+    """
+
+    kind = 'ngram'
+    operators = ('contains', 'contains_literal')
+    N = 3
+
+    def _build(self, series: pd.Series) -> None:
+        codes, uniques = pd.factorize(series)
+        self._texts = [str(value) for value in uniques]
+        # factorize会把None与NaN合并为一个缺失值；缺失值按各行自身转换的字符串（'None'、'nan'等）
+        # 另行编号，与扫描时逐行str转换的结果一致
+        missing = np.flatnonzero(codes < 0)
+        if len(missing):
+            texts = np.array([str(value) for value in series.to_numpy()[missing]], dtype=object)
+            missing_codes, missing_texts = pd.factorize(texts)
+            codes[missing] = len(uniques) + missing_codes
+            self._texts.extend(missing_texts)
+        size = len(self._texts)
+        self._order = np.argsort(codes.astype(_position_dtype(size))).astype(_position_dtype(len(codes)))
+        self._offsets = np.concatenate(([0], np.cumsum(np.bincount(codes, minlength=size))))
+
+        n = self.N
+        postings = defaultdict(list)
+        for i, text in enumerate(self._texts):
+            for gram in {text[j:j + n] for j in range(len(text) - n + 1)}:
+                postings[gram].append(i)
+        self._postings = {gram: np.array(ids, dtype=np.int32) for gram, ids in postings.items()}
+        self._last = (None, None)
+
+    @property
+    def nbytes(self) -> int:
+        texts = sum(len(text) for text in self._texts)
+        postings = sum(ids.nbytes for ids in self._postings.values()) + len(self._postings) * self.N
+        return int(self._order.nbytes + self._offsets.nbytes + texts + postings)
+
+    def count(self, op: str, value: Any) -> Optional[int]:
+        codes = self._codes(op, value)
+        return None if codes is None else int((self._offsets[codes + 1] - self._offsets[codes]).sum())
+
+    def lookup(self, op: str, value: Any) -> Optional[np.ndarray]:
+        codes = self._codes(op, value)
+        if codes is None:
+            return None
+        rows = np.concatenate([self._order[self._offsets[c]:self._offsets[c + 1]] for c in codes]
+                              or [np.array([], dtype=self._order.dtype)])
+        return np.sort(rows).astype(np.int64)
+
+    def _codes(self, op: str, value: Any) -> Optional[np.ndarray]:
+        """包含该子串的取值编号；缓存最近一次查询，count与lookup连续调用时只计算一次"""
+        needle = literal_substring(op, value)
+        if needle is None:
+            return None
+        if self._last[0] == needle:
+            return self._last[1]
+
+        n = self.N
+        if len(needle) < n:
+            candidates = range(len(self._texts))
+        else:
+            grams = {needle[j:j + n] for j in range(len(needle) - n + 1)}
+            lists = sorted((self._postings.get(gram, np.array([], dtype=np.int32)) for gram in grams), key=len)
+            candidates = lists[0]
+            for ids in lists[1:]:
+                if not len(candidates):
+                    break
+                candidates = np.intersect1d(candidates, ids, assume_unique=True)
+        texts = self._texts
+        codes = np.array([i for i in candidates if needle in texts[i]], dtype=np.int64)
+        self._last = (needle, codes)
+        return codes
+
+
+_INDEX_CLASSES = {'hash': HashIndex, 'sorted': SortedIndex, 'ngram': NgramIndex}
+
+
+class _IndexRegistry:
+    """
+    DataFrame到其列索引的映射
+
+    DataFrame不可哈希，按id登记并用弱引用在DataFrame被回收时清理
+    """
+
+    def __init__(self):
+        self._entries: Dict[int, Dict[tuple, ColumnIndex]] = {}
+
+    def add(self, df: pd.DataFrame, index: ColumnIndex) -> None:
+        key = id(df)
+        if key not in self._entries:
+            self._entries[key] = {}
+            weakref.finalize(df, self._entries.pop, key, None)
+        self._entries[key][(index.column, index.kind)] = index
+
+    def get(self, df: pd.DataFrame, columns: Optional[Iterable[str]] = None) -> List[ColumnIndex]:
+        """返回df仍然有效的索引（columns指定时只检查这些列上的索引），失效的索引被丢弃"""
+        indexes = self._entries.get(id(df))
+        if not indexes:
+            return []
+        columns = None if columns is None else set(columns)
+        valid = []
+        for key, index in list(indexes.items()):
+            if columns is not None and index.column not in columns:
+                continue
+            if index.is_valid(df):
+                valid.append(index)
+            else:
+                del indexes[key]
+        return valid
+
+    def drop(self, df: pd.DataFrame, columns: Optional[List[str]] = None) -> None:
+        indexes = self._entries.get(id(df), {})
+        for key in list(indexes):
+            if columns is None or key[0] in columns:
+                del indexes[key]
+
+
+_REGISTRY = _IndexRegistry()
+
+
+def create_index(
+        df: pd.DataFrame,
+        columns: Union[str, List[str]],
+        kind: str = 'auto'
+) -> List[ColumnIndex]:
+    """
+    为df的列建立索引并登记，之后对该DataFrame的filter_data自动使用
+
+    Args:
+        df: DataFrame
+        columns: 列名或列名列表
+        kind: 索引类型，可选：'hash', 'sorted', 'ngram', 'auto'
+              'auto'为整数列建立哈希与排序索引，浮点数与日期时间列只建立排序索引，其他列只建立哈希索引；
+              n-gram子串索引只在显式指定时建立
+
+    Returns:
+        新建的索引列表
+    """
+    if kind not in ('hash', 'sorted', 'ngram', 'auto'):
+        raise ValueError(f"不支持的索引类型: {kind}")
+    if isinstance(columns, str):
+        columns = [columns]
+
+    created = []
+    for column in columns:
+        if column not in df.columns:
+            raise KeyError(f"列不存在: {column}")
+        kinds = [kind]
+        if kind == 'auto':
+            dtype = df[column].dtype
+            if isinstance(dtype, np.dtype) and dtype.kind in 'iu':
+                kinds = ['hash', 'sorted']
+            elif isinstance(dtype, np.dtype) and dtype.kind in 'fmM':
+                # 浮点数与时间几乎每行取值都不同，等值查询少见，只建排序索引
+                kinds = ['sorted']
+            else:
+                kinds = ['hash']
+        for name in kinds:
+            index = _INDEX_CLASSES[name](df, column)
+            _REGISTRY.add(df, index)
+            created.append(index)
+    return created
+
+
+def drop_index(df: pd.DataFrame, columns: Union[str, List[str], None] = None) -> None:
+    """
+    删除df上的索引
+
+    Args:
+        df: DataFrame
+        columns: 列名或列名列表，None表示全部列
+    """
+    _REGISTRY.drop(df, [columns] if isinstance(columns, str) else columns)
+
+
+def index_info(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """
+    列出df上仍然有效的索引及其内存占用（失效的索引会被丢弃）
+
+    Args:
+        df: DataFrame
+
+    Returns:
+        [{'column': 列名, 'kind': 'hash'/'sorted', 'nbytes': 字节数}, ...]
+    """
+    return [{'column': index.column, 'kind': index.kind, 'nbytes': index.nbytes}
+            for index in _REGISTRY.get(df)]
+
+
+def valid_indexes(df: pd.DataFrame, columns: Optional[Iterable[str]] = None) -> List[ColumnIndex]:
+    """df上仍然有效的索引（columns指定时只检查这些列上的索引），失效的索引被丢弃"""
+    return _REGISTRY.get(df, columns)
@@ -0,0 +1,381 @@
+# -*- coding: utf-8 -*-
+"""
+@Time : 2026/10/18 10:20
+@Email : Lvan826199@163.com
+@公众号 : 梦无矶测开实录
+@File : table_join.py
+"""
+__author__ = "梦无矶小仔"
+
+"""
+分区哈希连接模块（Grace hash join）
+两侧数据按连接键的哈希值写入磁盘上的分桶，同一个键的行必然落在同一个桶里，
+逐个桶读回内存连接并输出结果，内存占用取决于单个桶的大小而不是整张表；
+另提供预先建立维度表连接键索引、反复与多批事实数据连接的 PreparedJoin
+"""
+import tempfile
+from pathlib import Path
+from typing import Union, List, Iterable, Iterator, Optional
+
+import numpy as np
+import pandas as pd
+from pandas.api.extensions import take
+
+from .table_dtypes import estimate_nbytes
+from .table_index import column_unchanged, _buffer_address
+
+# 默认内存预算：单个桶两侧数据合计的最大字节数
+DEFAULT_MEMORY_BUDGET = 256 * 1024 ** 2
+# 输入为数据块迭代器（总大小未知）时的分桶数
+DEFAULT_PARTITIONS = 64
+# 桶超出内存预算时最多再分区的层数
+MAX_DEPTH = 3
+# 多个连接键的哈希值按该奇数相乘后合并
+_HASH_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+
+TableInput = Union[pd.DataFrame, Iterable[pd.DataFrame]]
+
+
+def _key_hashes(chunk: pd.DataFrame, on: List[str], depth: int) -> np.ndarray:
+    """
+    计算连接键的哈希值，每层分区使用不同的种子
+
+    数值键统一转为float64再哈希（+0.0使-0.0与0.0相同），保证两侧类型不同
+    （如int64与float64）但pd.merge认为相等的键落在同一个桶。
+    pandas的哈希对数值类型不使用hash_key，种子通过最后的splitmix64混合加入
+    """
+    hashes = np.zeros(len(chunk), dtype=np.uint64)
+    for column in on:
+        values = chunk[column]
+        if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+            key_hash = pd.util.hash_array(values.to_numpy(dtype=np.float64, na_value=np.nan) + 0.0)
+        else:
+            key_hash = pd.util.hash_pandas_object(values, index=False).to_numpy()
+        hashes = hashes * _HASH_MULTIPLIER ^ key_hash
+    hashes ^= np.uint64(depth * int(_HASH_MULTIPLIER) & 0xFFFFFFFFFFFFFFFF)
+    hashes ^= hashes >> np.uint64(30)
+    hashes *= np.uint64(0xBF58476D1CE4E5B9)
+    hashes ^= hashes >> np.uint64(27)
+    hashes *= np.uint64(0x94D049BB133111EB)
+    hashes ^= hashes >> np.uint64(31)
+    return hashes
+
+
+def _as_chunks(table: TableInput, budget: int) -> Iterator[pd.DataFrame]:
+    """DataFrame按约1/4内存预算切块，数据块迭代器原样返回"""
+    if not isinstance(table, pd.DataFrame):
+        yield from table
+        return
+    if not len(table):
+        yield table
+        return
+    nbytes = estimate_nbytes(table)
+    rows = max(1, len(table) * (budget // 4) // max(nbytes, 1))
+    for start in range(0, len(table), rows):
+        yield table.iloc[start:start + rows]
+
+
+class _Buckets:
+    """一侧数据在磁盘上的哈希分桶"""
+
+    def __init__(self, directory: Path, side: str, partitions: int, schema: Optional[pd.DataFrame] = None):
+        self.directory = directory
+        self.side = side
+        self.partitions = partitions
+        self.schema = schema
+        self.files = [[] for _ in range(partitions)]
+        self.rows = np.zeros(partitions, dtype=np.int64)
+        self.nbytes = np.zeros(partitions, dtype=np.int64)
+
+    def write(self, chunk: pd.DataFrame, buckets: np.ndarray) -> None:
+        """把一个数据块按桶号拆开，追加写入各个桶"""
+        if self.schema is None:
+            self.schema = chunk.iloc[:0]
+        if not len(chunk):
+            return
+        counts = np.bincount(buckets, minlength=self.partitions)
+        # 内存占用按行数比例分摊到各个桶
+        self.nbytes += (counts * (estimate_nbytes(chunk) / len(chunk))).astype(np.int64)
+        self.rows += counts
+        # 稳定排序后每个桶是连续的一段，桶内保持原有行序
+        chunk = chunk.take(np.argsort(buckets, kind='stable'))
+        bounds = np.concatenate(([0], np.cumsum(counts)))
+        for bucket in np.flatnonzero(counts):
+            path = self.directory / f'{self.side}{bucket}_{len(self.files[bucket])}.pkl'
+            chunk.iloc[bounds[bucket]:bounds[bucket + 1]].reset_index(drop=True).to_pickle(path)
+            self.files[bucket].append(path)
+
+    def iter_bucket(self, bucket: int) -> Iterator[pd.DataFrame]:
+        """逐个读取桶中的数据块"""
+        for path in self.files[bucket]:
+            yield pd.read_pickle(path)
+
+    def read(self, bucket: int) -> pd.DataFrame:
+        """读取整个桶，空桶返回只有列名的DataFrame"""
+        if not self.files[bucket]:
+            return self.schema
+        return pd.concat(list(self.iter_bucket(bucket)), ignore_index=True)
+
+    def remove(self, bucket: int) -> None:
+        """删除已连接完的桶"""
+        for path in self.files[bucket]:
+            path.unlink()
+        self.files[bucket] = []
+
+
+def _partitioned_join(
+        left: Iterable[pd.DataFrame],
+        right: Iterable[pd.DataFrame],
+        on: List[str],
+        how: str,
+        budget: int,
+        partitions: int,
+        directory: Path,
+        depth: int,
+        schemas: tuple
+) -> Iterator[pd.DataFrame]:
+    """分桶写入两侧数据并逐桶连接；超出预算的桶换一个哈希种子递归再分区"""
+    sides = (_Buckets(directory, 'l', partitions, schemas[0]), _Buckets(directory, 'r', partitions, schemas[1]))
+    for buckets, chunks in zip(sides, (left, right)):
+        for chunk in chunks:
+            buckets.write(chunk, (_key_hashes(chunk, on, depth) % np.uint64(partitions)).astype(np.intp))
+    left_buckets, right_buckets = sides
+    for buckets in sides:
+        if buckets.schema is None:
+            buckets.schema = pd.DataFrame(columns=on)
+
+    # 一侧为空的桶对某些连接方式不产生结果
+    need_left = how in ('inner', 'left')
+    need_right = how in ('inner', 'right')
+    for bucket in range(partitions):
+        left_rows, right_rows = left_buckets.rows[bucket], right_buckets.rows[bucket]
+        if not left_rows and not right_rows or need_left and not left_rows or need_right and not right_rows:
+            continue
+        oversized = left_buckets.nbytes[bucket] + right_buckets.nbytes[bucket] > budget
+        # 所有行都落在同一个桶（单个热点键）时再分区也无法拆开
+        splittable = left_rows < left_buckets.rows.sum() or right_rows < right_buckets.rows.sum()
+        if oversized and splittable and depth < MAX_DEPTH:
+            subdirectory = directory / f'{depth}_{bucket}'
+            subdirectory.mkdir()
+            yield from _partitioned_join(
+                left_buckets.iter_bucket(bucket), right_buckets.iter_bucket(bucket), on, how, budget,
+                partitions, subdirectory, depth + 1, (left_buckets.schema, right_buckets.schema)
+            )
+        else:
+            yield pd.merge(left_buckets.read(bucket), right_buckets.read(bucket), on=on, how=how)
+        left_buckets.remove(bucket)
+        right_buckets.remove(bucket)
+
+
+def grace_hash_join(
+        left: TableInput,
+        right: TableInput,
+        on: Union[str, List[str]],
+        how: str = 'inner',
+        memory_budget: int = DEFAULT_MEMORY_BUDGET,
+        partitions: Optional[int] = None,
+        spill_dir: Optional[str] = None
+) -> Iterator[pd.DataFrame]:
+    """
+    分区哈希连接，逐桶输出连接结果
+
+    两侧数据先按连接键哈希写入磁盘分桶，再逐桶用pd.merge连接；某个桶两侧合计超过
+    memory_budget时换一个哈希种子把该桶再分区（最多MAX_DEPTH层）。
+    每个连接键的结果行与pd.merge相同，但输出按桶的顺序排列
+
+    Args:
+        left: 左表，DataFrame或数据块迭代器（如 TableUtils.iter_table 的结果）
+        right: 右表，DataFrame或数据块迭代器
+        on: 连接键列名
+        how: 连接方式，可选：'inner', 'left', 'right', 'outer'
+        memory_budget: 单个桶两侧数据合计的内存预算（字节）
+        partitions: 分桶数，None表示按DataFrame的大小估算，输入为迭代器时为DEFAULT_PARTITIONS
+        spill_dir: 分桶临时文件所在目录，None表示系统临时目录
+
+    Returns:
+        连接结果数据块的迭代器，至少包含一个（可能为空的）DataFrame
+    """
+    if how not in ('inner', 'left', 'right', 'outer'):
+        raise ValueError(f"不支持的连接方式: {how}")
+    if memory_budget <= 0:
+        raise ValueError(f"内存预算必须大于0: {memory_budget}")
+    on = [on] if isinstance(on, str) else list(on)
+    if partitions is None:
+        if isinstance(left, pd.DataFrame) and isinstance(right, pd.DataFrame):
+            nbytes = sum(estimate_nbytes(df) for df in (left, right))
+            # 留一倍余量，使分桶不均匀时大多数桶仍不超出预算
+            partitions = int(np.clip(-(-2 * nbytes // memory_budget), 2, 1024))
+        else:
+            partitions = DEFAULT_PARTITIONS
+
+    schemas = [None, None]
+
+    def remember_schema(chunks: Iterable[pd.DataFrame], side: int) -> Iterator[pd.DataFrame]:
+        for chunk in chunks:
+            if schemas[side] is None:
+                schemas[side] = chunk.iloc[:0]
+            yield chunk
+
+    emitted = False
+    with tempfile.TemporaryDirectory(prefix='mwj_join_', dir=spill_dir) as directory:
+        for result in _partitioned_join(
+                remember_schema(_as_chunks(left, memory_budget), 0),
+                remember_schema(_as_chunks(right, memory_budget), 1),
+                on, how, memory_budget, partitions, Path(directory), 0, (None, None)
+        ):
+            emitted = True
+            yield result
+    if not emitted:
+        # 没有任何结果行时输出一个列与pd.merge一致的空表
+        left_schema, right_schema = (schema if schema is not None else pd.DataFrame(columns=on)
+                                     for schema in schemas)
+        yield pd.merge(left_schema, right_schema, on=on, how=how)
+
+
+def _column_values(series: pd.Series) -> Union[np.ndarray, pd.api.extensions.ExtensionArray]:
+    """列的底层数组：NumPy类型为ndarray，其他为ExtensionArray"""
+    return series.to_numpy() if isinstance(series.dtype, np.dtype) else series.array
+
+
+class PreparedJoin:
+    """
+    预先建立右表（维度表）连接键索引的连接，用于多批左表数据反复连接同一张右表
+
+    建立时对右表连接键编号一次（多列连接键编号为MultiIndex），并按编号记录各组的行位置；
+    每批左表只需在编号上查找一次，再按行位置取出右表的列，不必每次重建右表的哈希表。
+    右表连接键唯一（多对一）时每个左表行最多对应一行，直接按行位置向量化take。
+    右表的连接键列被修改后索引自动失效，下次连接前重建（检测规则同 ColumnIndex）
+
+    结果与 pd.merge(left, right, on=on, how=how) 一致，支持 how='inner' 和 'left'
+
+    Example:
+        users = PreparedJoin(users_df, on='user_id')
+        for batch in TableUtils.iter_table('orders.csv'):
+            joined = users.merge(batch, how='left')
+    """
+
+    def __init__(self, right: pd.DataFrame, on: Union[str, List[str]]):
+        """
+        Args:
+            right: 右表（维度表）
+            on: 连接键列名
+        """
+        self.right = right
+        self.on = [on] if isinstance(on, str) else list(on)
+        # 因右表修改而重建索引的次数
+        self.rebuilds = 0
+        self._build()
+
+    def __repr__(self) -> str:
+        kind = 'many_to_one' if self.unique else 'many_to_many'
+        return f"PreparedJoin({self.on}, rows={len(self.right)}, keys={len(self._uniques)}, {kind})"
+
+    def is_valid(self) -> bool:
+        """右表的连接键列是否未被修改过"""
+        return all(column_unchanged(self.right, column, series, address)
+                   for column, series, address in self._snapshot)
+
+    def merge(self, left: pd.DataFrame, how: str = 'inner', suffixes: tuple = ('_x', '_y')) -> pd.DataFrame:
+        """
+        连接一批左表数据
+
+        Args:
+            left: 左表
+            how: 连接方式，可选：'inner', 'left'
+            suffixes: 两侧非连接键列重名时添加的后缀
+
+        Returns:
+            连接后的DataFrame
+        """
+        if how not in ('inner', 'left'):
+            raise ValueError(f"预建索引的连接只支持'inner'和'left': {how}")
+        if not self.is_valid():
+            self._build()
+            self.rebuilds += 1
+        self._check_dtypes(left, how)
+
+        left_rows, right_rows = self._probe(left, how)
+        left_part = left.take(left_rows) if left_rows is not None else left.copy()
+        left_part.index = pd.RangeIndex(len(left_part))
+
+        right_columns = [column for column in self.right.columns if column not in self.on]
+        overlap = set(right_columns) & set(left.columns)
+        left_part.columns = [f'{column}{suffixes[0]}' if column in overlap else column
+                             for column in left_part.columns]
+        right_part = pd.DataFrame(
+            {f'{column}{suffixes[1]}' if column in overlap else column:
+                 take(_column_values(self.right[column]), right_rows, allow_fill=True)
+             for column in right_columns},
+            index=left_part.index
+        )
+        return pd.concat([left_part, right_part], axis=1)
+
+    def _check_dtypes(self, left: pd.DataFrame, how: str) -> None:
+        """
+        检查左表连接键类型能否与右表合并，不兼容（如int64与object）时抛出与pd.merge相同的ValueError；
+        否则get_indexer会静默地匹配不到任何行。检查通过的类型组合会被记住，同类型的后续批次不再检查
+        """
+        dtypes = tuple(left[column].dtype for column in self.on)
+        if dtypes in self._checked_dtypes:
+            return
+        # 在空表上执行一次pd.merge，复用pandas自身的键类型检查
+        pd.merge(left[self.on].iloc[:0], self.right[self.on].iloc[:0], on=self.on, how=how)
+        self._checked_dtypes.add(dtypes)
+
+    def _build(self) -> None:
+        """对右表连接键编号，记录每组的行位置"""
+        right = self.right
+        self._checked_dtypes = set()
+        self._snapshot = []
+        for column in self.on:
+            series = right[column]
+            self._snapshot.append((column, series, _buffer_address(series)))
+
+        if len(self.on) == 1:
+            codes, uniques = pd.factorize(right[self.on[0]], use_na_sentinel=False)
+            self._uniques = pd.Index(uniques)
+        else:
+            # MultiIndex的编号把NaN也作为一个取值，与pd.merge中NaN互相匹配的语义一致
+            codes, self._uniques = pd.MultiIndex.from_frame(right[self.on]).factorize()
+        # 预先建立取值的哈希表，第一次连接不必再等待
+        self._uniques.get_indexer(self._uniques[:1])
+
+        counts = np.bincount(codes, minlength=len(self._uniques))
+        self.unique = bool((counts <= 1).all())
+        # 稳定排序：同一组内保持右表的行顺序，与pd.merge一致
+        self._order = np.argsort(codes, kind='stable')
+        self._offsets = np.concatenate(([0], np.cumsum(counts)))
+
+    def _probe(self, left: pd.DataFrame, how: str) -> tuple:
+        """
+        在右表索引中查找左表每行的匹配
+
+        Returns:
+            (左表行位置, 右表行位置)；左表行位置为None表示左表全部行按原顺序各出现一次，
+            右表行位置为-1表示没有匹配（左连接）
+        """
+        if len(self.on) == 1:
+            groups = self._uniques.get_indexer(left[self.on[0]])
+        else:
+            groups = self._uniques.get_indexer(pd.MultiIndex.from_frame(left[self.on]))
+        matched = groups >= 0
+
+        if self.unique:
+            # 多对一：每个左表行最多一个匹配，组号即可定位右表行
+            right_rows = np.where(matched, self._order[np.where(matched, groups, 0)], -1) \
+                if len(self._order) else np.full(len(left), -1)
+            if how == 'inner':
+                left_rows = np.flatnonzero(matched)
+                return left_rows, right_rows[left_rows]
+            return None, right_rows
+
+        counts = np.where(matched, self._offsets[groups + 1] - self._offsets[np.maximum(groups, 0)], 0)
+        repeats = np.maximum(counts, 1) if how == 'left' else counts
+        left_rows = np.repeat(np.arange(len(left)), repeats)
+        # 每个左表行对应其组内的第0..count-1个右表行
+        within = np.arange(len(left_rows)) - np.repeat(np.cumsum(repeats) - repeats, repeats)
+        starts = np.repeat(np.where(matched, self._offsets[np.maximum(groups, 0)], 0), repeats)
+        has_match = np.repeat(counts > 0, repeats)
+        right_rows = np.where(has_match, self._order[np.where(has_match, starts + within, 0)], -1) \
+            if len(self._order) else np.full(len(left_rows), -1)
+        return left_rows, right_rows
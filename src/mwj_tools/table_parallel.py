@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""
+@Time : 2026/10/18 17:10
+@Email : Lvan826199@163.com
+@公众号 : 梦无矶测开实录
+@File : table_parallel.py
+"""
+__author__ = "梦无矶小仔"
+
+"""
+按列并行执行模块
+各列相互独立的统计（describe_data、clean_data、compute_fill_values、profile_data）共用一个线程池：
+- NumPy/pandas对数值数组的归约、排序、缺失值判断会释放GIL，多线程可同时计算多列
+- object列的哈希计数、比较全程持有GIL，多线程只会互相等待：有GIL的解释器中这些列在调用线程中逐列计算
+  （与线程池中的数值列同时进行），只有在自由线程（free-threaded）Python 3.13+中才一起交给线程池
+- 结果按列的顺序返回，与逐列计算完全相同
+"""
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import pandas as pd
+
+# 行数少于此值时逐列计算，线程调度的开销大于并行的收益
+PARALLEL_MIN_ROWS = 10_000
+
+# 每种线程数一个线程池：不同线程数的调用各用各的，不会关闭别的调用正在使用的线程池
+_pools: Dict[int, ThreadPoolExecutor] = {}
+_pools_lock = threading.Lock()
+
+
+def resolve_jobs(n_jobs: int) -> int:
+    """
+    把n_jobs参数换算为实际的线程/进程数
+
+    Args:
+        n_jobs: 并行数；负数时按 CPU核数 + 1 + n_jobs 计算，-1表示使用全部核
+
+    Returns:
+        不小于1的并行数
+    """
+    if n_jobs < 0:
+        n_jobs = (os.cpu_count() or 1) + 1 + n_jobs
+    return max(n_jobs, 1)
+
+
+def free_threaded() -> bool:
+    """当前解释器是否关闭了GIL（free-threaded Python 3.13+）"""
+    is_gil_enabled = getattr(sys, '_is_gil_enabled', None)
+    return is_gil_enabled is not None and not is_gil_enabled()
+
+
+def _holds_gil(item: Any) -> bool:
+    """该列的计算是否全程持有GIL：参数（或参数元组的第一项）是object类型的Series"""
+    series = item[0] if isinstance(item, tuple) and item else item
+    return isinstance(series, pd.Series) and series.dtype == object
+
+
+def _get_pool(n_jobs: int) -> ThreadPoolExecutor:
+    """复用线程池，避免每次调用都重新创建线程（线程按需创建，空闲的线程池不占用CPU）"""
+    with _pools_lock:
+        pool = _pools.get(n_jobs)
+        if pool is None:
+            pool = _pools[n_jobs] = ThreadPoolExecutor(n_jobs, thread_name_prefix='mwj_tools-column')
+    return pool
+
+
+def map_columns(func: Callable[[Any], Any], items: Iterable[Any], n_jobs: Optional[int] = None,
+                rows: Optional[int] = None) -> List[Any]:
+    """
+    对每一列调用func，按items的顺序返回结果
+
+    Args:
+        func: 处理单列的函数，不同列的调用之间不能共享可变状态
+        items: 各列的参数（Series，或第一项为Series的元组，应在调用线程中先从DataFrame取出）；
+               有GIL时object列在调用线程中逐列计算，其余列交给线程池
+        n_jobs: 线程数，None或1表示逐列计算，-1表示使用全部CPU核
+        rows: 数据行数，少于 PARALLEL_MIN_ROWS 时逐列计算；None表示不按行数判断
+
+    Returns:
+        各列的结果列表；任一列出错时抛出该列的异常
+    """
+    items = list(items)
+    workers = 1 if n_jobs is None else resolve_jobs(n_jobs)
+    if workers <= 1 or len(items) <= 1 or (rows is not None and rows < PARALLEL_MIN_ROWS):
+        return [func(item) for item in items]
+    pool = _get_pool(workers)
+    if free_threaded():
+        return list(pool.map(func, items))
+    futures = {i: pool.submit(func, item) for i, item in enumerate(items) if not _holds_gil(item)}
+    results = [func(item) if i not in futures else None for i, item in enumerate(items)]
+    for i, future in futures.items():
+        results[i] = future.result()
+    return results
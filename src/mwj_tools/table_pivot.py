@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+"""
+@Time : 2026/10/18 19:20
+@Email : Lvan826199@163.com
+@公众号 : 梦无矶测开实录
+@File : table_pivot.py
+"""
+__author__ = "梦无矶小仔"
+
+"""
+透视表模块
+- 多个聚合函数只做一次分组聚合（pd.pivot_table 对每个聚合函数各分组一次），再按函数拆成透视表
+- 稀疏透视表 SparsePivot：只保存有数据的单元格，按CSR（压缩行）格式组织，
+  列索引有十万级不同取值时也不会分配 行数×列数 的稠密矩阵
+"""
+from typing import Callable, List, Union
+
+import numpy as np
+import pandas as pd
+
+AggFunc = Union[str, Callable]
+
+
+def _as_list(arg) -> list:
+    if arg is None:
+        return []
+    return list(arg) if isinstance(arg, (list, tuple)) else [arg]
+
+
+def _func_name(func: AggFunc) -> str:
+    """与pd.pivot_table相同的聚合函数名（结果列的第一层）"""
+    return getattr(func, '__name__', func)
+
+
+def one_pass_supported(df: pd.DataFrame, index, columns, values) -> bool:
+    """
+    能否用一次分组完成透视：指定了行索引与数值列，分组键都不是分类类型
+    （分类键在pd.pivot_table中会展开未出现的类别，仍交给pandas处理）
+    """
+    if not _as_list(index) or not _as_list(values):
+        return False
+    return not any(isinstance(df[key].dtype, pd.CategoricalDtype) for key in _as_list(index) + _as_list(columns))
+
+
+def pivot_long(df: pd.DataFrame, index, columns, values, aggfunc) -> pd.DataFrame:
+    """
+    一次分组计算所有聚合函数
+
+    Returns:
+        长表：行为 (行索引..., 列索引...) 的每个出现过的组合，列为 (数值列, 聚合函数名)
+    """
+    keys = _as_list(index) + _as_list(columns)
+    return df.groupby(keys, sort=True, dropna=True, observed=True)[_as_list(values)].agg(_as_list(aggfunc))
+
+
+def _dense_piece(agged: pd.DataFrame, n_index: int, n_keys: int, values) -> pd.DataFrame:
+    """一个聚合函数的宽表，步骤与pd.pivot_table相同；放在单独函数中，中间结果用完即释放"""
+    if len(agged.columns):
+        agged = agged.dropna(how='all')
+    table = agged
+    if n_keys > n_index:
+        table = table.unstack(list(range(n_index, n_keys)))
+    table = table.sort_index(axis=1)
+    if not isinstance(values, (list, tuple)) and table.columns.nlevels > 1:
+        table.columns = table.columns.droplevel(0)
+    return table.dropna(how='all', axis=1)
+
+
+def _dense_from_long(long: pd.DataFrame, index, columns, values, aggfunc) -> pd.DataFrame:
+    """把 pivot_long 的长表按聚合函数逐个展开为宽表，结果与pd.pivot_table相同"""
+    n_index = len(_as_list(index))
+    n_keys = n_index + len(_as_list(columns))
+    names = [_func_name(func) for func in _as_list(aggfunc)]
+    pieces = [_dense_piece(long.xs(name, axis=1, level=1), n_index, n_keys, values) for name in names]
+    if not isinstance(aggfunc, list):
+        return pieces[0]
+    return pd.concat(pieces, keys=names, axis=1)
+
+
+def pivot_dense(df: pd.DataFrame, index, columns, values, aggfunc: List[AggFunc]) -> pd.DataFrame:
+    """
+    多个聚合函数的稠密透视表：只分组一次，结果与 pd.pivot_table(aggfunc=[...]) 相同
+
+    Args:
+        df: 原始DataFrame
+        index: 行索引
+        columns: 列索引，None表示不展开列
+        values: 数值列
+        aggfunc: 聚合函数列表
+
+    Returns:
+        透视表DataFrame，列的第一层为聚合函数名
+    """
+    return _dense_from_long(pivot_long(df, index, columns, values, aggfunc), index, columns, values, aggfunc)
+
+
+class SparsePivot:
+    """
+    稀疏透视表（CSR格式）
+
+    第i行有数据的单元格为 indices[indptr[i]:indptr[i + 1]]（列号升序），
+    对应的各 (数值列, 聚合函数) 取值为 data 的同一段行。占用与有数据的单元格数成正比
+
+    Attributes:
+        index: 行索引的取值（升序）
+        columns: 列索引的取值（升序）
+        indptr: 每行在indices/data中的起止位置，长度为行数+1
+        indices: 每个有数据的单元格的列号
+        data: 每个有数据的单元格的聚合结果，列为 (数值列, 聚合函数名)
+
+    Example:
+        pivot = TableUtils.pivot_table(df, 'user', 'sku', 'amount', ['sum', 'count'], sparse=True)
+        pivot.row('u001')            # 某个用户买过的SKU
+        rows, cols, data = pivot.to_coo()
+    """
+
+    def __init__(self, long: pd.DataFrame, index, columns, values, aggfunc):
+        """
+        Args:
+            long: pivot_long 的结果
+            index, columns, values, aggfunc: 透视参数，用于还原稠密透视表
+        """
+        self._params = (index, columns, values, aggfunc)
+        n_index = len(_as_list(index))
+        levels = list(range(long.index.nlevels))
+        row_keys = long.index.droplevel(levels[n_index:])
+        column_keys = long.index.droplevel(levels[:n_index])
+        # 分组结果按 (行索引, 列索引) 排序，行号按出现顺序即升序，每行内的列号也是升序
+        row_codes, self.index = row_keys.factorize()
+        self.indices, self.columns = column_keys.factorize(sort=True)
+        self.index.names = row_keys.names
+        self.columns.names = column_keys.names
+        self.indptr = np.zeros(len(self.index) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(row_codes, minlength=len(self.index)), out=self.indptr[1:])
+        self.data = long.reset_index(drop=True)
+
+    def __repr__(self) -> str:
+        return f"SparsePivot(shape={self.shape}, nnz={self.nnz}, density={self.density:.4%})"
+
+    @property
+    def shape(self) -> tuple:
+        """(行数, 列数)"""
+        return len(self.index), len(self.columns)
+
+    @property
+    def nnz(self) -> int:
+        """有数据的单元格数"""
+        return len(self.indices)
+
+    @property
+    def density(self) -> float:
+        """有数据的单元格占比"""
+        size = self.shape[0] * self.shape[1]
+        return self.nnz / size if size else 0.0
+
+    def row(self, label) -> pd.DataFrame:
+        """
+        某一行有数据的单元格
+
+        Args:
+            label: 行索引的取值（多列行索引时为元组）
+
+        Returns:
+            以列索引取值为行索引、(数值列, 聚合函数名) 为列的DataFrame
+        """
+        position = self.index.get_loc(label)
+        start, stop = self.indptr[position], self.indptr[position + 1]
+        result = self.data.iloc[start:stop]
+        result.index = self.columns[self.indices[start:stop]]
+        return result
+
+    def to_coo(self) -> tuple:
+        """
+        坐标格式
+
+        Returns:
+            (行号数组, 列号数组, data)，可直接构造 scipy.sparse.coo_matrix
+        """
+        rows = np.repeat(np.arange(len(self.index)), np.diff(self.indptr))
+        return rows, self.indices, self.data
+
+    def to_long(self) -> pd.DataFrame:
+        """
+        长表格式
+
+        Returns:
+            行索引为 (行索引..., 列索引...) 的DataFrame，与 pivot_long 的结果相同
+        """
+        rows, cols, data = self.to_coo()
+        arrays = [self.index.get_level_values(level).take(rows) for level in range(self.index.nlevels)]
+        arrays += [self.columns.get_level_values(level).take(cols) for level in range(self.columns.nlevels)]
+        data = data.copy()
+        data.index = pd.MultiIndex.from_arrays(arrays, names=list(self.index.names) + list(self.columns.names))
+        return data
+
+    def to_dense(self) -> pd.DataFrame:
+        """
+        还原为稠密透视表，与 pd.pivot_table 的结果相同（只适合列数不多时）
+
+        Returns:
+            透视表DataFrame
+        """
+        return _dense_from_long(self.to_long(), *self._params)
+
+
+def pivot_sparse(df: pd.DataFrame, index, columns, values, aggfunc: Union[AggFunc, List[AggFunc]]) -> SparsePivot:
+    """
+    稀疏透视表：一次分组计算所有聚合函数，只保存出现过的 (行, 列) 组合
+
+    Args:
+        df: 原始DataFrame
+        index: 行索引
+        columns: 列索引
+        values: 数值列
+        aggfunc: 聚合函数或聚合函数列表
+
+    Returns:
+        SparsePivot
+    """
+    if not _as_list(index) or not _as_list(columns) or not _as_list(values):
+        raise ValueError("稀疏透视表需要同时指定index、columns与values")
+    return SparsePivot(pivot_long(df, index, columns, values, aggfunc), index, columns, values, aggfunc)
@@ -0,0 +1,450 @@
+# -*- coding: utf-8 -*-
+"""
+@Time : 2026/10/18 15:30
+@Email : Lvan826199@163.com
+@公众号 : 梦无矶测开实录
+@File : table_profile.py
+"""
+__author__ = "梦无矶小仔"
+
+"""
+流式数据概要模块
+用可合并的概要结构（sketch）逐块统计超出内存的数据，结果格式与 TableUtils.describe_data 相同：
+- 矩统计（Welford/Chan）：均值、标准差、最小值、最大值，精确
+- KLL分位数概要：中位数，秩误差有界
+- HyperLogLog：不同取值个数，相对误差有界
+- Misra-Gries频繁项概要：出现最多的取值及次数，计数误差有界
+各结构只含NumPy数组与pandas Series，可以序列化后在进程、机器之间传递并合并
+"""
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from .table_parallel import map_columns
+
+
+class Moments:
+    """计数、均值、平方差和、最小值、最大值；两份结果按Chan等人的并行公式合并"""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def update(self, values: np.ndarray) -> None:
+        """并入一批不含NaN的数值"""
+        if not len(values):
+            return
+        other = Moments()
+        other.count = len(values)
+        other.mean = float(values.mean())
+        other.m2 = float(((values - other.mean) ** 2).sum())
+        other.min = float(values.min())
+        other.max = float(values.max())
+        self.merge(other)
+
+    def merge(self, other: 'Moments') -> None:
+        """合并另一份矩统计"""
+        if not other.count:
+            return
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta ** 2 * self.count * other.count / count
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    @property
+    def std(self) -> float:
+        """样本标准差（ddof=1），与pandas一致"""
+        return float(np.sqrt(self.m2 / (self.count - 1))) if self.count > 1 else np.nan
+
+
+class KLLSketch:
+    """
+    KLL分位数概要（Karnin, Lang, Liberty 2016）
+
+    第h层的每个元素代表2^h个原始值。某层超出容量时排序后随机保留奇数位或偶数位的元素，
+    升入上一层，总权重不变；越低的层容量越小（按2/3递减）。
+    保留的元素数约为3k，分位数的归一化秩误差约为 2.296 / k^0.9723（DataSketches的经验公式，99%置信）。
+    从未压缩过时保存的是全部原始值，分位数精确
+    """
+
+    def __init__(self, k: int = 200, seed: Optional[int] = None):
+        """
+        Args:
+            k: 精度参数，越大越精确、占用越多
+            seed: 随机数种子
+        """
+        if k < 8:
+            raise ValueError(f"k不能小于8: {k}")
+        self.k = k
+        self.n = 0
+        self.levels = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def __repr__(self) -> str:
+        return f"KLLSketch(k={self.k}, n={self.n}, retained={sum(len(level) for level in self.levels)})"
+
+    @property
+    def exact(self) -> bool:
+        """是否仍保存着全部原始值"""
+        return len(self.levels) == 1
+
+    @property
+    def rank_error(self) -> float:
+        """分位数的归一化秩误差上界"""
+        return 0.0 if self.exact else 2.296 / self.k ** 0.9723
+
+    def update(self, values: np.ndarray) -> None:
+        """并入一批不含NaN的数值"""
+        if not len(values):
+            return
+        self.levels[0] = np.concatenate([self.levels[0], np.asarray(values, dtype=np.float64)])
+        self.n += len(values)
+        self._compress()
+
+    def merge(self, other: 'KLLSketch') -> None:
+        """合并另一份概要"""
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self.n += other.n
+        self._compress()
+
+    def quantile(self, q: float) -> float:
+        """
+        分位数
+
+        Args:
+            q: 0到1之间的分位点
+
+        Returns:
+            分位数；精确模式下与numpy/pandas一样线性插值，没有数据时为NaN
+        """
+        if not self.n:
+            return np.nan
+        if self.exact:
+            return float(np.quantile(self.levels[0], q))
+        values = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(items), 2 ** level) for level, items in enumerate(self.levels)])
+        order = np.argsort(values)
+        cumulative = np.cumsum(weights[order])
+        position = min(int(np.searchsorted(cumulative, q * cumulative[-1])), len(values) - 1)
+        return float(values[order][position])
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.levels) - 1 - level
+        return max(2, int(np.ceil(self.k * (2 / 3) ** depth)))
+
+    def _compress(self) -> None:
+        """从低到高压缩超出容量的层，直到所有层都不超出"""
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) <= self._capacity(level):
+                level += 1
+                continue
+            if level + 1 == len(self.levels):
+                self.levels.append(np.empty(0))
+            items = np.sort(items)
+            # 元素个数为奇数时留下最大的一个，其余两两配对，随机保留每对中的一个
+            keep = items[len(items) - len(items) % 2:]
+            promoted = items[self._rng.integers(2):len(items) - len(keep):2]
+            self.levels[level] = keep
+            self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+            # 层数增加后低层的容量变小，从头检查
+            level = 0
+
+
+class HyperLogLog:
+    """
+    HyperLogLog基数估计（Flajolet等 2007）
+
+    哈希值的高precision位选择寄存器，其余位的前导零个数+1取最大值；
+    估计值的相对标准误差为 1.04 / sqrt(2^precision)，基数较小时改用线性计数
+    """
+
+    def __init__(self, precision: int = 14):
+        """
+        Args:
+            precision: 寄存器个数为2^precision，取值11~18
+        """
+        if not 11 <= precision <= 18:
+            raise ValueError(f"precision必须在11~18之间: {precision}")
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    @property
+    def relative_error(self) -> float:
+        """估计值的相对标准误差"""
+        return 1.04 / np.sqrt(len(self.registers))
+
+    def update(self, hashes: np.ndarray) -> None:
+        """并入一批64位哈希值"""
+        if not len(hashes):
+            return
+        bits = 64 - self.precision
+        index = (hashes >> np.uint64(bits)).astype(np.intp)
+        rest = hashes & np.uint64((1 << bits) - 1)
+        # rest不超过2^53，转为float64没有误差，frexp的指数即二进制位数
+        rank = bits - np.frexp(rest.astype(np.float64))[1] + 1
+        np.maximum.at(self.registers, index, rank.astype(np.uint8))
+
+    def merge(self, other: 'HyperLogLog') -> None:
+        """合并另一份概要（精度必须相同）"""
+        if other.precision != self.precision:
+            raise ValueError(f"precision不同的HyperLogLog不能合并: {self.precision} != {other.precision}")
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def estimate(self) -> float:
+        """不同取值个数的估计值"""
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * np.log(m / zeros)
+        return float(estimate)
+
+
+class MisraGries:
+    """
+    Misra-Gries频繁项概要（可合并版本，Agarwal等 2012）
+
+    最多保留capacity个计数器；超出时所有计数减去第capacity+1大的计数并丢弃非正的计数器。
+    每个保留的计数比真实次数少，但不超过error（累计减去的量）；
+    出现次数超过 n/(capacity+1) 的取值一定被保留。从未丢弃过计数器时所有计数精确
+    """
+
+    def __init__(self, capacity: int = 64):
+        """
+        Args:
+            capacity: 计数器个数
+        """
+        self.capacity = capacity
+        self.counts = pd.Series(dtype=np.int64)
+        self.error = 0
+
+    @property
+    def exact(self) -> bool:
+        """计数是否精确（从未丢弃过计数器）"""
+        return self.error == 0
+
+    def update(self, values: pd.Series) -> None:
+        """并入一批不含缺失值的取值"""
+        self._add(values.value_counts(sort=False))
+
+    def merge(self, other: 'MisraGries') -> None:
+        """合并另一份概要"""
+        self.error += other.error
+        self._add(other.counts)
+
+    def top(self) -> tuple:
+        """
+        出现次数最多的取值
+
+        Returns:
+            (取值, 计数)；并列时与Series.mode()一样取最小的取值，没有数据时为 (None, 0)。
+            计数不超过误差上界error时任何未保留的取值都可能出现得更多，结果不可信，同样返回 (None, 0)
+        """
+        counts = self.counts[self.counts > 0]
+        if not len(counts):
+            return None, 0
+        best = counts.max()
+        if best <= self.error:
+            return None, 0
+        candidates = counts.index[counts.to_numpy() == best]
+        try:
+            value = candidates.sort_values()[0]
+        except TypeError:
+            value = candidates[0]
+        return value, int(best)
+
+    def _add(self, counts: pd.Series) -> None:
+        counts = self._reduce(counts[counts > 0].astype(np.int64))
+        if not len(counts):
+            return
+        # 先把新计数缩减到capacity个再与已有计数器对齐，避免与高基数的数据块整体对齐
+        if len(self.counts):
+            counts = self._reduce(self.counts.add(counts, fill_value=0).astype(np.int64))
+        self.counts = counts
+
+    def _reduce(self, counts: pd.Series) -> pd.Series:
+        """计数器超过capacity个时减去第capacity+1大的计数，丢弃非正的计数器"""
+        if len(counts) <= self.capacity:
+            return counts
+        threshold = int(np.partition(counts.to_numpy(), -(self.capacity + 1))[-(self.capacity + 1)])
+        self.error += threshold
+        counts = counts - threshold
+        return counts[counts > 0]
+
+
+def _update_column(item: tuple) -> None:
+    """用一列数据更新该列的概要"""
+    series, numeric, categorical = item
+    if numeric is not None:
+        values = series.to_numpy(dtype=np.float64, na_value=np.nan)
+        values = values[~np.isnan(values)]
+        numeric[0].update(values)
+        numeric[1].update(values)
+    else:
+        values = series.dropna()
+        categorical[0].update(pd.util.hash_pandas_object(values, index=False).to_numpy())
+        categorical[1].update(values)
+
+
+class TableProfile:
+    """
+    流式数据概要：逐块更新，结果格式与 TableUtils.describe_data 相同
+
+    数值列（select_dtypes(np.number)）统计均值、标准差、最小值、最大值（精确）与中位数（KLL）；
+    object/category列统计不同取值个数（HyperLogLog）与出现最多的取值（Misra-Gries）。
+    多个TableProfile（不同文件、不同进程）可以用merge合并
+
+    Example:
+        profile = TableProfile()
+        for chunk in TableUtils.iter_table('orders.csv'):
+            profile.update(chunk)
+        profile.merge(other_profile)
+        description = profile.result()
+    """
+
+    def __init__(self, k: int = 200, precision: int = 14, top_k: int = 64, seed: Optional[int] = None):
+        """
+        Args:
+            k: KLL分位数概要的精度参数
+            precision: HyperLogLog的精度，寄存器个数为2^precision
+            top_k: Misra-Gries的计数器个数
+            seed: KLL压缩使用的随机数种子
+        """
+        self.k = k
+        self.precision = precision
+        self.top_k = top_k
+        self.seed = seed
+        self.rows = 0
+        self.dtypes = {}
+        self.missing = {}
+        self.numeric = {}
+        self.categorical = {}
+
+    def __repr__(self) -> str:
+        return (f"TableProfile(rows={self.rows}, columns={len(self.dtypes)}, "
+                f"numeric={len(self.numeric)}, categorical={len(self.categorical)})")
+
+    def update(self, chunk: pd.DataFrame, n_jobs: Optional[int] = None) -> 'TableProfile':
+        """
+        并入一个数据块
+
+        Args:
+            chunk: 数据块
+            n_jobs: 按列并行更新的线程数，None表示逐列更新，-1表示使用全部CPU核
+
+        Returns:
+            概要本身
+        """
+        self._register(chunk)
+        self.rows += len(chunk)
+        for column, count in chunk.isnull().sum().items():
+            self.missing[column] += int(count)
+        # 每列的概要对象互不相同，可以在不同线程中同时更新
+        items = [(chunk[column], self.numeric.get(column), self.categorical.get(column))
+                 for column in chunk.columns if column in self.numeric or column in self.categorical]
+        map_columns(_update_column, items, n_jobs, rows=len(chunk))
+        return self
+
+    def merge(self, other: 'TableProfile') -> 'TableProfile':
+        """
+        合并另一份概要
+
+        Args:
+            other: 另一份概要（相同列的精度参数应一致）
+
+        Returns:
+            概要本身
+        """
+        self.rows += other.rows
+        for column, dtype in other.dtypes.items():
+            self.dtypes.setdefault(column, dtype)
+            self.missing[column] = self.missing.get(column, 0) + other.missing[column]
+        for column, (moments, quantiles) in other.numeric.items():
+            if column in self.numeric:
+                self.numeric[column][0].merge(moments)
+                self.numeric[column][1].merge(quantiles)
+            elif column not in self.categorical:
+                self.numeric[column] = (moments, quantiles)
+        for column, (distinct, frequent) in other.categorical.items():
+            if column in self.categorical:
+                self.categorical[column][0].merge(distinct)
+                self.categorical[column][1].merge(frequent)
+            elif column not in self.numeric:
+                self.categorical[column] = (distinct, frequent)
+        return self
+
+    def result(self) -> Dict[str, Any]:
+        """
+        生成与 describe_data 格式相同的描述统计，另加error_bounds：
+        - median_rank_error: 中位数的归一化秩误差上界（0表示精确）
+        - unique_count_relative_error: 不同取值个数的相对标准误差（0表示精确）
+        - top_count_max_error: top_count可能少计的最大次数（0表示精确）
+        - top_value_reliable: 出现最多的取值是否可信；计数不超过top_count_max_error时为False，
+          此时top_value为None、top_count为0
+
+        Returns:
+            包含统计信息的字典
+        """
+        description = {
+            'shape': (self.rows, len(self.dtypes)),
+            'columns': list(self.dtypes),
+            'dtypes': dict(self.dtypes),
+            'missing_values': dict(self.missing),
+            'numeric_stats': {},
+            'categorical_stats': {},
+            'error_bounds': {}
+        }
+        for column, (moments, quantiles) in self.numeric.items():
+            empty = not moments.count
+            description['numeric_stats'][column] = {
+                'mean': np.nan if empty else moments.mean,
+                'std': moments.std,
+                'min': np.nan if empty else moments.min,
+                'max': np.nan if empty else moments.max,
+                'median': quantiles.quantile(0.5)
+            }
+            description['error_bounds'][column] = {'median_rank_error': quantiles.rank_error}
+        for column, (distinct, frequent) in self.categorical.items():
+            value, count = frequent.top()
+            # 从未丢弃过计数器时计数器个数就是精确的不同取值个数
+            unique = len(frequent.counts) if frequent.exact else int(round(distinct.estimate()))
+            description['categorical_stats'][column] = {
+                'unique_count': unique,
+                'top_value': value,
+                'top_count': count
+            }
+            description['error_bounds'][column] = {
+                'unique_count_relative_error': 0.0 if frequent.exact else distinct.relative_error,
+                'top_count_max_error': int(frequent.error),
+                'top_value_reliable': bool(frequent.exact or count > frequent.error)
+            }
+        return description
+
+    def _register(self, chunk: pd.DataFrame) -> None:
+        """记录新出现的列，按第一次出现时的类型建立对应的概要"""
+        new_columns = [column for column in chunk.columns if column not in self.dtypes]
+        if not new_columns:
+            return
+        frame = chunk[new_columns]
+        numeric = set(frame.select_dtypes(include=[np.number]).columns)
+        categorical = set(frame.select_dtypes(include=['object', 'category']).columns)
+        for column in new_columns:
+            self.dtypes[column] = str(frame[column].dtype)
+            self.missing[column] = 0
+            if column in numeric:
+                self.numeric[column] = (Moments(), KLLSketch(self.k, self.seed))
+            elif column in categorical:
+                self.categorical[column] = (HyperLogLog(self.precision), MisraGries(self.top_k))
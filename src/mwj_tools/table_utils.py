@@ -12,11 +12,688 @@ __author__ = "梦无矶小仔"
 """
 import pandas as pd
 import numpy as np
-from typing import Union, List, Dict, Any, Optional
+from typing import Union, List, Dict, Any, Optional, Callable, Iterator, Iterable, Tuple
 import json
 import csv
+import operator
+import re
+import time
+import zipfile
+from itertools import islice
 from pathlib import Path
 
+from .table_aggregate import aggregate_chunks, aggregate_parallel
+from .table_join import grace_hash_join, PreparedJoin, DEFAULT_MEMORY_BUDGET
+from .table_profile import TableProfile
+from .table_parallel import map_columns
+from .table_pivot import SparsePivot, pivot_dense, pivot_sparse, one_pass_supported
+from .table_dtypes import DtypeReport, infer_dtypes, apply_dtypes, load_dtypes, parser_dtypes, optimize_dtypes
+from .table_compat import copy_on_write
+from .table_index import valid_indexes, create_index, drop_index, index_info, literal_substring, ColumnIndex
+
+# 扩展名与文件类型的对应关系
+_FILE_TYPES = {
+    '.csv': 'csv',
+    '.tsv': 'csv',
+    '.xlsx': 'excel',
+    '.xls': 'excel',
+    '.json': 'json',
+    '.jsonl': 'jsonl',
+    '.ndjson': 'jsonl',
+    '.parquet': 'parquet',
+    '.feather': 'feather',
+    '.arrow': 'arrow',
+}
+
+# 列式二进制格式，依赖pyarrow
+_ARROW_TYPES = ('parquet', 'feather', 'arrow')
+
+
+def _detect_file_type(filepath: str, file_type: Optional[str] = None, default: Optional[str] = None) -> str:
+    """
+    根据扩展名判断文件类型
+
+    Args:
+        filepath: 文件路径
+        file_type: 已指定的文件类型，不为None时直接返回
+        default: 无法识别扩展名时使用的类型，为None时抛出ValueError
+
+    Returns:
+        文件类型
+    """
+    if file_type is not None:
+        return file_type
+    ext = Path(filepath).suffix.lower()
+    if ext in _FILE_TYPES:
+        return _FILE_TYPES[ext]
+    if default is None:
+        raise ValueError(f"不支持的文件格式: {ext}")
+    return default
+
+
+def _csv_options(filepath: str) -> Dict[str, Any]:
+    """TSV文件使用制表符分隔"""
+    return {'sep': '\t'} if Path(filepath).suffix.lower() == '.tsv' else {}
+
+
+def _select_columns(df: pd.DataFrame, columns: Optional[List[str]]) -> pd.DataFrame:
+    """按columns选取列，columns为None时原样返回"""
+    return df if columns is None else df[list(columns)]
+
+
+def _import_pyarrow():
+    """按需导入pyarrow，未安装时给出安装提示"""
+    try:
+        import pyarrow
+        import pyarrow.feather
+        import pyarrow.parquet
+    except ImportError as e:
+        raise ImportError("读写parquet/feather/arrow文件需要安装pyarrow: pip install mwj-tools[arrow]") from e
+    return pyarrow
+
+
+def _read_arrow_table(filepath: str, file_type: str, columns: Optional[List[str]] = None, memory_map: bool = True):
+    """
+    读取列式文件为pyarrow.Table，只读取columns中的列
+
+    memory_map为True时通过内存映射读取：未压缩的feather/arrow文件的列数据直接引用映射的页面，
+    按需由操作系统换入，只读取少数列时几乎不产生额外拷贝
+    """
+    pa = _import_pyarrow()
+    if file_type == 'parquet':
+        return pa.parquet.read_table(filepath, columns=columns, memory_map=memory_map)
+    reader = _open_ipc_file(filepath, memory_map)
+    schema = reader.schema if columns is None else pa.schema([reader.schema.field(column) for column in columns])
+    return pa.Table.from_batches(list(_iter_ipc_batches(reader, columns)), schema=schema)
+
+
+def _open_ipc_file(filepath: str, memory_map: bool = True):
+    """
+    打开feather(v2)/arrow文件
+
+    Returns:
+        pyarrow.ipc.RecordBatchFileReader
+    """
+    pa = _import_pyarrow()
+    return pa.ipc.open_file(pa.memory_map(filepath) if memory_map else pa.OSFile(filepath))
+
+
+def _iter_ipc_batches(reader, columns: Optional[List[str]] = None):
+    """
+    逐个读取RecordBatch并只保留columns中的列
+
+    未压缩文件在内存映射下按列引用映射页面，未选中的列不会被读入；
+    压缩文件每次只解压一个批次，峰值内存为结果加一个批次
+    """
+    for i in range(reader.num_record_batches):
+        batch = reader.get_batch(i)
+        yield batch if columns is None else batch.select(columns)
+
+
+def _rebatch(batches, chunksize: int):
+    """将大小不一的RecordBatch重新切分为每块chunksize行的pyarrow.Table（最后一块可能较小）"""
+    pa = _import_pyarrow()
+    buffer, buffered = [], 0
+    for batch in batches:
+        buffer.append(batch)
+        buffered += batch.num_rows
+        while buffered >= chunksize:
+            table = pa.Table.from_batches(buffer)
+            yield table.slice(0, chunksize)
+            rest = table.slice(chunksize)
+            buffer, buffered = rest.to_batches(), rest.num_rows
+    if buffered:
+        yield pa.Table.from_batches(buffer)
+
+
+def _arrow_to_pandas(table, start: int = 0) -> pd.DataFrame:
+    """pyarrow.Table转为DataFrame，按列分块避免合并成二维块时的整表拷贝"""
+    df = table.to_pandas(split_blocks=True)
+    if start:
+        df.index = pd.RangeIndex(start, start + len(df))
+    return df
+
+
+def _write_arrow_table(df: pd.DataFrame, filepath: str, file_type: str, compression: Optional[str] = None) -> None:
+    """
+    将DataFrame写入列式文件
+
+    compression为None时使用格式默认的压缩（parquet为snappy，feather/arrow为lz4），
+    'uncompressed'表示不压缩；feather/arrow只支持lz4与zstd
+    """
+    pa = _import_pyarrow()
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    if file_type == 'parquet':
+        if compression == 'uncompressed':
+            compression = 'none'
+        pa.parquet.write_table(table, filepath, compression=compression or 'snappy')
+    else:
+        pa.feather.write_feather(table, filepath, compression=compression)
+
+
+class ReadProgress:
+    """
+    分块读取的进度信息，每读完一块更新一次
+
+    Attributes:
+        bytes_read: 已读取的字节数
+        total_bytes: 文件总字节数
+        rows: 已读取的行数
+        chunks: 已读取的块数
+        elapsed: 已耗时（秒）
+    """
+
+    __slots__ = ('bytes_read', 'total_bytes', 'rows', 'chunks', 'elapsed', '_start')
+
+    def __init__(self, total_bytes: int):
+        self.bytes_read = 0
+        self.total_bytes = total_bytes
+        self.rows = 0
+        self.chunks = 0
+        self.elapsed = 0.0
+        self._start = time.perf_counter()
+
+    @property
+    def rows_per_second(self) -> float:
+        """平均每秒读取的行数"""
+        return self.rows / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def fraction(self) -> float:
+        """按字节计算的读取进度，取值0~1"""
+        return min(self.bytes_read / self.total_bytes, 1.0) if self.total_bytes else 1.0
+
+    def __repr__(self) -> str:
+        return (f"ReadProgress(rows={self.rows}, bytes={self.bytes_read}/{self.total_bytes}, "
+                f"{self.rows_per_second:.0f} rows/s)")
+
+    def _update(self, rows: int, bytes_read: int) -> None:
+        self.rows += rows
+        self.chunks += 1
+        self.bytes_read = bytes_read
+        self.elapsed = time.perf_counter() - self._start
+
+
+def _iter_excel(file, chunksize: int, sheet_name: Union[str, int] = 0, **kwargs) -> Iterator[pd.DataFrame]:
+    """
+    以只读模式逐行读取xlsx文件，每chunksize行组装为一个DataFrame
+
+    第一行作为表头；openpyxl不支持的.xls文件退化为整表读取后切块
+    """
+    from openpyxl import load_workbook
+    from openpyxl.utils.exceptions import InvalidFileException
+
+    try:
+        workbook = load_workbook(file, read_only=True, data_only=True)
+    except (InvalidFileException, zipfile.BadZipFile):
+        # openpyxl不支持的.xls：按文件名打开时报InvalidFileException，传入文件对象时不是zip包，报BadZipFile
+        file.seek(0)
+        df = pd.read_excel(file, sheet_name=sheet_name, **kwargs)
+        for start in range(0, len(df), chunksize):
+            yield df.iloc[start:start + chunksize].reset_index(drop=True)
+        return
+
+    try:
+        sheet = workbook.worksheets[sheet_name] if isinstance(sheet_name, int) else workbook[sheet_name]
+        rows = sheet.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        start = 0
+        while batch := list(islice(rows, chunksize)):
+            yield pd.DataFrame(batch, columns=list(header), index=pd.RangeIndex(start, start + len(batch)))
+            start += len(batch)
+    finally:
+        workbook.close()
+
+
+def _iter_arrow(
+        filepath: str,
+        file_type: str,
+        chunksize: int,
+        columns: Optional[List[str]],
+        memory_map: bool,
+        tracker: ReadProgress,
+        progress: Optional[Callable[[ReadProgress], None]]
+) -> Iterator[pd.DataFrame]:
+    """分块读取parquet/feather/arrow文件，已读字节数按行数比例估算"""
+    pa = _import_pyarrow()
+    if file_type == 'parquet':
+        parquet_file = pa.parquet.ParquetFile(filepath, memory_map=memory_map)
+        total_rows = parquet_file.metadata.num_rows
+        batches = parquet_file.iter_batches(batch_size=chunksize, columns=columns)
+    else:
+        reader = _open_ipc_file(filepath, memory_map)
+        total_rows = reader.count_rows()
+        batches = _iter_ipc_batches(reader, columns)
+
+    for table in _rebatch(batches, chunksize):
+        chunk = _arrow_to_pandas(table, start=tracker.rows)
+        tracker._update(len(chunk), tracker.total_bytes * (tracker.rows + len(chunk)) // max(total_rows, 1))
+        if progress is not None:
+            progress(tracker)
+        yield chunk
+
+
+def _iter_chunks(
+        filepath: str,
+        chunksize: int,
+        file_type: str,
+        total_bytes: int,
+        progress: Optional[Callable[[ReadProgress], None]],
+        columns: Optional[List[str]],
+        memory_map: bool,
+        kwargs: Dict[str, Any]
+) -> Iterator[pd.DataFrame]:
+    """iter_table 的分块读取，参数已由 iter_table 检查"""
+    tracker = ReadProgress(total_bytes)
+    if file_type in _ARROW_TYPES:
+        yield from _iter_arrow(filepath, file_type, chunksize, columns, memory_map, tracker, progress)
+        return
+
+    with open(filepath, 'rb') as f:
+        if file_type == 'csv':
+            chunks = pd.read_csv(f, chunksize=chunksize, usecols=columns, **{**_csv_options(filepath), **kwargs})
+        elif file_type == 'jsonl':
+            chunks = pd.read_json(f, lines=True, chunksize=chunksize, **kwargs)
+        else:
+            chunks = _iter_excel(f, chunksize, **kwargs)
+
+        for chunk in chunks:
+            # 底层读取器有预读缓冲，按文件位置统计的字节数略超前于已产出的行
+            tracker._update(len(chunk), f.tell())
+            if progress is not None:
+                progress(tracker)
+            yield _select_columns(chunk, columns)
+
+
+def _apply_chunk_dtypes(chunks: Iterator[pd.DataFrame], dtypes: Optional[Dict[str, str]]) -> Iterator[pd.DataFrame]:
+    """按dtypes压缩每块的列类型，dtypes为None时按第一块推断"""
+    for chunk in chunks:
+        if dtypes is None:
+            dtypes = infer_dtypes(chunk)
+        yield apply_dtypes(chunk, dtypes)
+
+
+def _table_columns(filepath: str, file_type: str) -> Optional[List[str]]:
+    """
+    只读取表头或schema获取文件的列名
+
+    Returns:
+        列名列表；JSON Lines、Excel等需要解析数据才能得到列名的格式返回None
+    """
+    if file_type == 'csv':
+        return pd.read_csv(filepath, nrows=0, **_csv_options(filepath)).columns.tolist()
+    if file_type == 'parquet':
+        return _import_pyarrow().parquet.ParquetFile(filepath).schema_arrow.names
+    if file_type in _ARROW_TYPES:
+        return _open_ipc_file(filepath).schema.names
+    return None
+
+
+# describe_data(sketch='auto') 对行数达到此值的DataFrame才改用流式概要；内存中的表精确统计更快，
+# 概要只在整表value_counts等中间结果放不下时才划算
+SKETCH_MIN_ROWS = 50_000_000
+
+# 行数达到此值的object列才考虑先去重再查找子串
+_DISTINCT_MIN_ROWS = 1 << 16
+_DISTINCT_SAMPLE_SIZE = 1024
+
+
+def _isin(values, targets) -> Any:
+    """values中的元素是否属于targets，语义与Series.isin一致（NaN可匹配NaN）"""
+    if isinstance(values, np.ndarray):
+        return pd.Series(values, copy=False).isin(targets).to_numpy()
+    return values.isin(targets)
+
+
+def _contains(op: str, pattern: str):
+    """
+    返回子串/正则查找的判断函数，非字符串值先转为字符串（与astype(str).str.contains一致）
+
+    不含正则元字符的模式按普通子串查找；分类列只在类别上查找，
+    不同取值很少的object列先去重，在不同取值上查找后按编号展开回各行
+    """
+    needle = literal_substring(op, pattern)
+    if needle is not None:
+        def match(text: str) -> bool:
+            return needle in text
+    else:
+        search = re.compile(pattern).search
+
+        def match(text: str) -> bool:
+            return search(text) is not None
+
+    def scan(values) -> np.ndarray:
+        return np.fromiter((match(str(v)) for v in values), dtype=bool, count=len(values))
+
+    def evaluate(values, _):
+        if isinstance(values, pd.Categorical):
+            # 末尾追加缺失值（编号-1）的结果
+            matched = np.append(scan(values.categories), match(str(np.nan)))
+            return matched[values.codes]
+        if _few_distinct(values):
+            # factorize会把None与NaN合并，缺失值仍逐行转换为字符串
+            codes, uniques = pd.factorize(values)
+            matched = scan(uniques)[codes]
+            missing = np.flatnonzero(codes < 0)
+            matched[missing] = scan(values[missing])
+            return matched
+        return scan(values)
+    return evaluate
+
+
+def _few_distinct(values) -> bool:
+    """
+    按抽样估计object列是否只有少量不同取值（约数百个以内），值得先去重
+
+    对字符串做factorize的哈希开销不低，不同取值较多时反而比逐行查找慢，
+    因此只在抽样中不同取值不超过一半时去重
+    """
+    if not (isinstance(values, np.ndarray) and values.dtype == object and len(values) >= _DISTINCT_MIN_ROWS):
+        return False
+    sample = values[np.random.default_rng(0).integers(0, len(values), _DISTINCT_SAMPLE_SIZE)]
+    return len(pd.unique(sample)) <= _DISTINCT_SAMPLE_SIZE // 2
+
+
+def _as_mask(result) -> np.ndarray:
+    """比较结果转为bool数组，缺失值（pd.NA）视为不满足"""
+    if isinstance(result, np.ndarray):
+        return result
+    return result.to_numpy(dtype=bool, na_value=False)
+
+
+def _ordered(compare: Callable) -> Callable:
+    """
+    大小比较：object列先排除缺失值，缺失值行为False，与pandas Series比较的结果一致；
+    直接在object数组上比较时None/NaN与字符串比较会抛出TypeError
+    """
+    def evaluate(values, value):
+        if isinstance(values, np.ndarray) and values.dtype == object:
+            valid = pd.notna(values)
+            if not valid.all():
+                result = np.zeros(len(values), dtype=bool)
+                result[valid] = compare(values[valid], value)
+                return result
+        return compare(values, value)
+    return evaluate
+
+
+class _Predicate:
+    """单个筛选条件：列名、操作符、比较值与估算代价"""
+
+    # 各操作符相对代价：向量化比较最便宜，正则逐个匹配最贵
+    OPERATORS = {
+        '>': (_ordered(operator.gt), 1),
+        '<': (_ordered(operator.lt), 1),
+        '>=': (_ordered(operator.ge), 1),
+        '<=': (_ordered(operator.le), 1),
+        '==': (operator.eq, 1),
+        '!=': (operator.ne, 1),
+        'in': (_isin, 4),
+        'not in': (lambda values, targets: ~_as_mask(_isin(values, targets)), 4),
+    }
+    # 字符串等object列逐个元素比较，代价按此倍数放大
+    OBJECT_COST_FACTOR = 8
+    CONTAINS_COST = {'contains': 50, 'contains_literal': 20}
+
+    __slots__ = ('column', 'op', 'value', 'func', 'cost')
+
+    def __init__(self, column: str, op: str, value: Any):
+        self.column = column
+        self.op = op
+        self.value = value
+        if op in self.CONTAINS_COST:
+            self.func = _contains(op, value)
+            self.cost = self.CONTAINS_COST[op]
+        elif op in self.OPERATORS:
+            self.func, self.cost = self.OPERATORS[op]
+            if op in ('in', 'not in'):
+                # 转为列表只做一次，集合、生成器等也能重复使用
+                self.value = value if isinstance(value, str) else list(value)
+        else:
+            raise ValueError(f"不支持的操作符: {op}")
+
+    def __repr__(self) -> str:
+        return f"({self.column!r} {self.op} {self.value!r})"
+
+    def evaluate(self, values) -> np.ndarray:
+        return _as_mask(self.func(values, self.value))
+
+    def cost_for(self, values) -> float:
+        if isinstance(values, np.ndarray) and values.dtype == object and self.op not in self.CONTAINS_COST:
+            return self.cost * self.OBJECT_COST_FACTOR
+        return self.cost
+
+
+def _column_values(series: pd.Series):
+    """取列的底层数组：NumPy数值/布尔/object列为ndarray，其余（日期、可空类型等）为ExtensionArray"""
+    if isinstance(series.dtype, np.dtype) and series.dtype.kind in 'biufcO':
+        return series.to_numpy()
+    return series.array
+
+
+class FilterPlan:
+    """
+    预编译的筛选计划
+
+    条件字典只在创建时解析一次，得到的计划可重复用于多个结构相同的DataFrame。
+    执行时直接在列的底层数组上计算：
+    - 先在少量抽样行上估算每个条件的通过率，按"代价/筛除率"从小到大排序，
+      便宜且筛除多的条件先执行
+    - 后续条件只在仍满足前面条件的行上计算
+    - 没有剩余行时立即停止
+    """
+
+    # 估算通过率的抽样行数
+    SAMPLE_SIZE = 1024
+    # 索引命中超过此比例的行时，排序命中行的开销接近全表扫描，改为扫描
+    INDEX_MAX_FRACTION = 0.25
+
+    def __init__(self, conditions: Dict[str, Any]):
+        """
+        Args:
+            conditions: 筛选条件字典，格式同 TableUtils.filter_data
+        """
+        self.conditions = dict(conditions)
+        self.predicates = []
+        for column, condition in self.conditions.items():
+            if isinstance(condition, tuple) and len(condition) == 2:
+                op, value = condition
+            else:
+                # 直接相等匹配
+                op, value = '==', condition
+            self.predicates.append(_Predicate(column, op, value))
+
+    def __repr__(self) -> str:
+        return f"FilterPlan({' & '.join(map(repr, self.predicates)) or 'True'})"
+
+    def __call__(self, df: pd.DataFrame) -> pd.DataFrame:
+        return self.apply(df)
+
+    def apply(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        筛选DataFrame
+
+        Args:
+            df: 原始DataFrame
+
+        Returns:
+            筛选后的DataFrame（索引重置为0..n-1）
+        """
+        rows = self.indices(df)
+        if rows is None:
+            return df.reset_index(drop=True)
+        return df.take(rows).reset_index(drop=True)
+
+    def mask(self, df: pd.DataFrame) -> np.ndarray:
+        """
+        计算满足全部条件的行
+
+        Args:
+            df: 原始DataFrame
+
+        Returns:
+            长度为len(df)的bool数组（按位置对应，与df的索引无关）
+        """
+        mask = np.zeros(len(df), dtype=bool)
+        rows = self.indices(df)
+        mask[slice(None) if rows is None else rows] = True
+        return mask
+
+    def indices(self, df: pd.DataFrame) -> Optional[np.ndarray]:
+        """
+        计算满足全部条件的行位置
+
+        Args:
+            df: 原始DataFrame
+
+        Returns:
+            升序的行位置数组；没有可用条件（全部行都满足）时返回None
+        """
+        # 不存在的列跳过
+        predicates = [predicate for predicate in self.predicates if predicate.column in df.columns]
+        if not predicates:
+            return None
+
+        # 有列索引时，用命中行数最少的索引直接得到候选行，其余条件只在候选行上计算
+        rows = None
+        driver = self._index_driver(df, predicates)
+        if driver is not None:
+            predicate, index = driver
+            rows = index.lookup(predicate.op, predicate.value)
+            predicates.remove(predicate)
+
+        bound = [(predicate, _column_values(df[predicate.column])) for predicate in predicates]
+
+        for predicate, values in self._order(bound, len(df)):
+            if rows is not None and not len(rows):
+                break
+            if rows is None:
+                rows = np.flatnonzero(predicate.evaluate(values))
+            else:
+                rows = rows[predicate.evaluate(values[rows])]
+        return rows
+
+    def _index_driver(self, df: pd.DataFrame, predicates: list) -> Optional[tuple]:
+        """
+        选出可以用列索引计算、且命中行数最少的条件
+
+        Returns:
+            (条件, 索引)；没有可用索引或命中行数超过 INDEX_MAX_FRACTION 时返回None
+        """
+        indexes = valid_indexes(df, {predicate.column for predicate in predicates})
+        best, best_count = None, len(df) * self.INDEX_MAX_FRACTION
+        for predicate in predicates:
+            for index in indexes:
+                if index.column != predicate.column or predicate.op not in index.operators:
+                    continue
+                count = index.count(predicate.op, predicate.value)
+                if count is not None and count <= best_count:
+                    best, best_count = (predicate, index), count
+        return best
+
+    def _order(self, bound: list, n: int) -> list:
+        """按估算的 代价/筛除率 从小到大排序条件"""
+        if len(bound) == 1:
+            return bound
+        sample = np.linspace(0, n - 1, min(n, self.SAMPLE_SIZE)).astype(np.int64)
+
+        def rank(item):
+            predicate, values = item
+            passed = predicate.evaluate(values[sample]).mean() if len(sample) else 1.0
+            # 通过率为1的条件筛不掉任何行，排在最后
+            return predicate.cost_for(values) / max(1.0 - passed, 1e-3)
+        return sorted(bound, key=rank)
+
+
+def _column_partial(item: tuple) -> Any:
+    """单列的可合并中间结果：数值列为 (和, 非空计数)，其他列为取值频数"""
+    series, numeric = item
+    if numeric:
+        return series.sum(), series.count()
+    return series.value_counts(sort=False)
+
+
+def _fill_statistics(chunks: Iterable[pd.DataFrame], columns: Optional[List[str]] = None,
+                     n_jobs: Optional[int] = None) -> Dict[str, Any]:
+    """
+    计算各列的缺失值填充值：数值列为均值，其他列为众数（没有非空值时为''）
+
+    数值列累计和与非空计数，其他列累计取值频数，多个数据块的结果与整表计算
+    在浮点舍入误差内相同（分块求和的累加顺序不同，均值可能相差最后一位）；
+    每列直接在列的视图上归约，不复制数据；n_jobs不为None时各列的中间结果并行计算
+    """
+    sums, counts, frequencies, names = {}, {}, {}, {}
+    for chunk in chunks:
+        selected = chunk.columns if columns is None else [c for c in columns if c in chunk.columns]
+        items = []
+        for column in selected:
+            names.setdefault(column, None)
+            series = chunk[column]
+            # 列的类型以第一次出现时为准
+            numeric = column in sums or (column not in frequencies and pd.api.types.is_numeric_dtype(series))
+            if numeric:
+                sums.setdefault(column, 0)
+                counts.setdefault(column, 0)
+            items.append((series, numeric))
+        partials = map_columns(_column_partial, items, n_jobs, rows=len(chunk))
+        for column, (_, numeric), partial in zip(selected, items, partials):
+            if numeric:
+                sums[column] += partial[0]
+                counts[column] += partial[1]
+            else:
+                previous = frequencies.get(column)
+                frequencies[column] = partial if previous is None else previous.add(partial, fill_value=0)
+
+    fills = dict.fromkeys(names)
+    for column in sums:
+        fills[column] = sums[column] / counts[column] if counts[column] else np.nan
+    for column, counted in frequencies.items():
+        # 分类列的频数包含未出现的类别
+        counted = counted[counted > 0]
+        if not len(counted):
+            fills[column] = ''
+            continue
+        # 与Series.mode()一致：出现次数最多的取值中最小的一个（无法比较大小时取第一个）
+        modes = counted.index[counted.to_numpy() == counted.max()]
+        try:
+            fills[column] = modes.sort_values()[0]
+        except TypeError:
+            fills[column] = modes[0]
+    return fills
+
+
+def _numeric_summary(series: pd.Series) -> Dict[str, float]:
+    """describe_data 数值列的统计"""
+    return {
+        'mean': float(series.mean()),
+        'std': float(series.std()),
+        'min': float(series.min()),
+        'max': float(series.max()),
+        'median': float(series.median())
+    }
+
+
+def _categorical_summary(series: pd.Series) -> Dict[str, Any]:
+    """describe_data 分类列的统计：只做一次value_counts，不同取值个数、众数与其次数都由它得出"""
+    counts = series.value_counts(sort=False)
+    counts = counts[counts > 0]
+    top_value, top_count = None, 0
+    if len(counts):
+        top_count = int(counts.max())
+        # 并列时与Series.mode()一样取最小的取值
+        candidates = counts.index[counts.to_numpy() == top_count]
+        try:
+            top_value = candidates.sort_values()[0]
+        except TypeError:
+            top_value = candidates[0]
+    return {
+        'unique_count': len(counts),
+        'top_value': top_value,
+        'top_count': top_count
+    }
+
 
 class TableUtils:
     """表格数据处理工具类"""
@@ -24,47 +701,213 @@ class TableUtils:
     @staticmethod
     def read_table(
             filepath: str,
-            file_type: str = None
-    ) -> pd.DataFrame:
+            file_type: str = None,
+            chunksize: Optional[int] = None,
+            progress: Optional[Callable[[ReadProgress], None]] = None,
+            columns: Optional[List[str]] = None,
+            memory_map: bool = True,
+            dtypes: Optional[Union[str, Dict[str, str]]] = None,
+            optimize: bool = False
+    ) -> Union[pd.DataFrame, Iterator[pd.DataFrame]]:
         """
         读取表格文件
 
         Args:
             filepath: 文件路径
-            file_type: 文件类型，可选：'csv', 'excel', 'json'
+            file_type: 文件类型，可选：'csv', 'excel', 'json', 'jsonl', 'parquet', 'feather', 'arrow'
                         如为None则根据扩展名自动判断
+            chunksize: 分块行数，指定时返回DataFrame迭代器（见iter_table）
+            progress: 分块读取时的进度回调
+            columns: 只读取的列，None表示全部列；parquet/feather/arrow只解码这些列
+            memory_map: parquet/feather/arrow文件是否通过内存映射读取
+            dtypes: 列类型映射或其JSON文件路径（如 DtypeReport.save 保存的文件），读取后按它压缩列类型，
+                    不再推断；CSV的category与pyarrow字符串列在解析时直接生成
+            optimize: 未指定dtypes时是否推断并压缩列类型（见 optimize_dtypes）
 
         Returns:
-            pandas DataFrame对象
-        """
-        if file_type is None:
-            # 根据文件扩展名判断类型
-            ext = Path(filepath).suffix.lower()
-            if ext in ['.csv', '.tsv']:
-                file_type = 'csv'
-            elif ext in ['.xlsx', '.xls']:
-                file_type = 'excel'
-            elif ext == '.json':
-                file_type = 'json'
-            else:
-                raise ValueError(f"不支持的文件格式: {ext}")
+            pandas DataFrame对象；指定chunksize时为DataFrame迭代器
+
+        Example:
+            df, report = TableUtils.optimize_dtypes(TableUtils.read_table('orders.csv'))
+            report.save('orders.dtypes.json')
+            df = TableUtils.read_table('orders_2026.csv', dtypes='orders.dtypes.json')
+        """
+        if chunksize is not None:
+            return TableUtils.iter_table(filepath, chunksize=chunksize, file_type=file_type,
+                                         progress=progress, columns=columns, memory_map=memory_map,
+                                         dtypes=dtypes, optimize=optimize)
+
+        file_type = _detect_file_type(filepath, file_type)
+        if isinstance(dtypes, (str, Path)):
+            dtypes = load_dtypes(dtypes)
+        csv_options = {**_csv_options(filepath), 'dtype': parser_dtypes(dtypes)} if dtypes else _csv_options(filepath)
 
         readers = {
-            'csv': pd.read_csv,
-            'excel': pd.read_excel,
-            'json': pd.read_json
+            'csv': lambda: _select_columns(pd.read_csv(filepath, usecols=columns, **csv_options), columns),
+            'excel': lambda: _select_columns(pd.read_excel(filepath, usecols=columns), columns),
+            'json': lambda: _select_columns(pd.read_json(filepath), columns),
+            'jsonl': lambda: _select_columns(pd.read_json(filepath, lines=True), columns),
+            **{
+                arrow_type: lambda: _arrow_to_pandas(_read_arrow_table(filepath, file_type, columns, memory_map))
+                for arrow_type in _ARROW_TYPES
+            }
         }
 
         if file_type not in readers:
             raise ValueError(f"不支持的文件类型: {file_type}")
 
-        return readers[file_type](filepath)
+        df = readers[file_type]()
+        if dtypes:
+            return apply_dtypes(df, dtypes)
+        if optimize:
+            return apply_dtypes(df, infer_dtypes(df))
+        return df
+
+    @staticmethod
+    def iter_table(
+            filepath: str,
+            chunksize: int = 100_000,
+            file_type: str = None,
+            progress: Optional[Callable[[ReadProgress], None]] = None,
+            columns: Optional[List[str]] = None,
+            memory_map: bool = True,
+            dtypes: Optional[Union[str, Dict[str, str]]] = None,
+            optimize: bool = False,
+            **kwargs
+    ) -> Iterator[pd.DataFrame]:
+        """
+        分块读取表格文件，内存占用只与chunksize有关，适合读取超大文件
+
+        CSV/TSV与JSON Lines由pandas分块解析；Excel以只读模式逐行读取后按块组装；
+        parquet按行组流式解码，feather/arrow通过内存映射按批次切片。
+        普通JSON（整个文件为一个数组）无法分块解析，请改用JSON Lines
+
+        Args:
+            filepath: 文件路径
+            chunksize: 每块的行数
+            file_type: 文件类型，可选：'csv', 'excel', 'jsonl', 'parquet', 'feather', 'arrow'，
+                       如为None则根据扩展名自动判断
+            progress: 进度回调，每读完一块以ReadProgress对象调用一次
+                      （已读字节数、行数、每秒行数）
+            columns: 只读取的列，None表示全部列
+            memory_map: parquet/feather/arrow文件是否通过内存映射读取
+            dtypes: 列类型映射或其JSON文件路径，每块读取后按它压缩列类型
+            optimize: 未指定dtypes时按第一块推断压缩类型，后续各块沿用；整数超出该类型范围的块
+                      换用能容纳的更宽类型，category列的类别由各块分别确定（合并时可用 union_categoricals）
+            **kwargs: 传给底层读取函数的其他参数，如dtype、sheet_name
+
+        Returns:
+            DataFrame迭代器，各块的行索引连续递增
+
+        Raises:
+            ValueError: chunksize不是正整数，或文件类型不支持分块读取（调用时即抛出，不必等到迭代）
+            FileNotFoundError: 文件不存在
+
+        Example:
+            for chunk in TableUtils.iter_table('big.csv', chunksize=500_000,
+                                               progress=lambda p: print(p)):
+                ...
+        """
+        # 参数与文件在调用时就检查，不必等到第一次迭代
+        if chunksize <= 0:
+            raise ValueError(f"chunksize必须为正整数: {chunksize}")
+        file_type = _detect_file_type(filepath, file_type)
+        if file_type not in ('csv', 'jsonl', 'excel') + _ARROW_TYPES:
+            raise ValueError(f"不支持分块读取的文件类型: {file_type}")
+        total_bytes = Path(filepath).stat().st_size
+
+        if isinstance(dtypes, (str, Path)):
+            dtypes = load_dtypes(dtypes)
+        if dtypes and file_type == 'csv' and isinstance(kwargs.get('dtype', {}), dict):
+            kwargs['dtype'] = {**parser_dtypes(dtypes), **kwargs.get('dtype', {})}
+        chunks = _iter_chunks(filepath, chunksize, file_type, total_bytes, progress, columns, memory_map, kwargs)
+        if dtypes or optimize:
+            return _apply_chunk_dtypes(chunks, dtypes)
+        return chunks
+
+    @staticmethod
+    def read_filtered(
+            filepath: str,
+            conditions: Union[Dict[str, Any], 'FilterPlan'],
+            columns: Optional[List[str]] = None,
+            chunksize: int = 100_000,
+            file_type: str = None,
+            progress: Optional[Callable[[ReadProgress], None]] = None,
+            **kwargs
+    ) -> pd.DataFrame:
+        """
+        边读取边筛选，等价于 filter_data(read_table(filepath), conditions)[columns]
+
+        文件按块解析，每块读完立即筛选，只保留满足条件的行；CSV/parquet/feather/arrow
+        只解析输出列与条件列。峰值内存取决于结果大小加一个块，而不是整个文件。
+        普通JSON（整个文件为一个数组）无法分块解析，整表读取后再筛选
+
+        Args:
+            filepath: 文件路径
+            conditions: 筛选条件字典（格式同 filter_data），或 compile_filter 返回的FilterPlan
+            columns: 输出的列，None表示全部列
+            chunksize: 每块的行数
+            file_type: 文件类型，如为None则根据扩展名自动判断
+            progress: 进度回调，见 iter_table
+            **kwargs: 传给底层读取函数的其他参数
+
+        Returns:
+            筛选后的DataFrame（索引为0..n-1），没有满足条件的行时列类型与文件中相同
+
+        Example:
+            df = TableUtils.read_filtered('orders.csv', {'amount': ('>', 1000)}, columns=['id', 'amount'])
+        """
+        plan = conditions if isinstance(conditions, FilterPlan) else FilterPlan(conditions)
+        file_type = _detect_file_type(filepath, file_type)
+        if file_type == 'json':
+            # read_table不接受读取参数，其余kwargs直接传给pd.read_json
+            dtypes, optimize = kwargs.pop('dtypes', None), kwargs.pop('optimize', False)
+            if isinstance(dtypes, (str, Path)):
+                dtypes = load_dtypes(dtypes)
+            df = pd.read_json(filepath, **kwargs)
+            if dtypes:
+                df = apply_dtypes(df, dtypes)
+            elif optimize:
+                df = apply_dtypes(df, infer_dtypes(df))
+            rows = plan.indices(df)
+            if rows is not None:
+                df = df.take(rows)
+            return _select_columns(df, columns).reset_index(drop=True)
+
+        file_columns = _table_columns(filepath, file_type)
+        read_columns = None
+        if file_columns is not None:
+            output = file_columns if columns is None else list(columns)
+            # 条件列不存在时与filter_data一致，直接忽略
+            wanted = set(output) | {p.column for p in plan.predicates if p.column in file_columns}
+            read_columns = [column for column in file_columns if column in wanted]
+
+        pieces = []
+        schema = None
+        for chunk in TableUtils.iter_table(filepath, chunksize=chunksize, file_type=file_type,
+                                           progress=progress, columns=read_columns, **kwargs):
+            if schema is None:
+                # 没有满足条件的行时按第一块的列类型返回空表
+                schema = _select_columns(chunk.iloc[:0], columns)
+            rows = plan.indices(chunk)
+            if rows is not None:
+                if not len(rows):
+                    continue
+                chunk = chunk.take(rows)
+            pieces.append(_select_columns(chunk, columns))
+
+        if pieces:
+            return pd.concat(pieces, ignore_index=True)
+        if schema is not None:
+            return schema.reset_index(drop=True)
+        return pd.DataFrame(columns=columns if columns is not None else file_columns)
 
     @staticmethod
     def save_table(
             df: pd.DataFrame,
             filepath: str,
-            file_type: str = None
+            file_type: str = None,
+            compression: Optional[str] = None
     ) -> None:
         """
         保存表格到文件
@@ -73,22 +916,20 @@ class TableUtils:
             df: pandas DataFrame
             filepath: 保存路径
             file_type: 文件类型，自动判断或指定
+            compression: parquet/feather/arrow的压缩算法，如'snappy', 'zstd', 'lz4', 'uncompressed'，
+                         None表示使用格式默认值；未压缩的feather/arrow文件读取时可零拷贝内存映射
         """
-        if file_type is None:
-            ext = Path(filepath).suffix.lower()
-            if ext in ['.csv', '.tsv']:
-                file_type = 'csv'
-            elif ext in ['.xlsx', '.xls']:
-                file_type = 'excel'
-            elif ext == '.json':
-                file_type = 'json'
-            else:
-                file_type = 'csv'  # 默认保存为CSV
+        file_type = _detect_file_type(filepath, file_type, default='csv')  # 默认保存为CSV
 
         savers = {
-            'csv': lambda: df.to_csv(filepath, index=False),
+            'csv': lambda: df.to_csv(filepath, index=False, **_csv_options(filepath)),
             'excel': lambda: df.to_excel(filepath, index=False),
-            'json': lambda: df.to_json(filepath, orient='records', indent=2)
+            'json': lambda: df.to_json(filepath, orient='records', indent=2),
+            'jsonl': lambda: df.to_json(filepath, orient='records', lines=True),
+            **{
+                arrow_type: lambda: _write_arrow_table(df, filepath, file_type, compression)
+                for arrow_type in _ARROW_TYPES
+            }
         }
 
         if file_type not in savers:
@@ -99,148 +940,394 @@ class TableUtils:
     @staticmethod
     def filter_data(
             df: pd.DataFrame,
-            conditions: Dict[str, Any]
+            conditions: Union[Dict[str, Any], FilterPlan]
     ) -> pd.DataFrame:
         """
         根据条件筛选数据
 
+        条件之间为"且"的关系，不存在的列会被忽略。重复使用同一组条件时，
+        可先用 compile_filter 预编译
+
         Args:
             df: 原始DataFrame
-            conditions: 筛选条件字典
+            conditions: 筛选条件字典，或 compile_filter 返回的FilterPlan
                 {列名: 值} 或 {列名: (操作符, 值)}
-                操作符: '>', '<', '==', '!=', 'in', 'not in', 'contains'
+                操作符: '>', '<', '>=', '<=', '==', '!=', 'in', 'not in',
+                        'contains'（正则匹配）, 'contains_literal'（普通子串匹配）
 
         Returns:
             筛选后的DataFrame
+
+        Raises:
+            ValueError: 操作符不在上述列表中（早期版本会静默忽略该条件）
         """
-        mask = pd.Series([True] * len(df))
+        if not isinstance(conditions, FilterPlan):
+            conditions = FilterPlan(conditions)
+        return conditions.apply(df)
 
-        for column, condition in conditions.items():
-            if column not in df.columns:
-                continue
+    @staticmethod
+    def compile_filter(conditions: Dict[str, Any]) -> FilterPlan:
+        """
+        预编译筛选条件，返回可重复用于多个结构相同的DataFrame的筛选计划
 
-            if isinstance(condition, tuple) and len(condition) == 2:
-                op, value = condition
-                if op == '>':
-                    mask &= (df[column] > value)
-                elif op == '<':
-                    mask &= (df[column] < value)
-                elif op == '>=':
-                    mask &= (df[column] >= value)
-                elif op == '<=':
-                    mask &= (df[column] <= value)
-                elif op == '==':
-                    mask &= (df[column] == value)
-                elif op == '!=':
-                    mask &= (df[column] != value)
-                elif op == 'in':
-                    mask &= df[column].isin(value)
-                elif op == 'not in':
-                    mask &= ~df[column].isin(value)
-                elif op == 'contains':
-                    mask &= df[column].astype(str).str.contains(value)
-            else:
-                # 直接相等匹配
-                mask &= (df[column] == condition)
+        Args:
+            conditions: 筛选条件字典，格式同 filter_data
+
+        Returns:
+            FilterPlan对象：plan(df)返回筛选后的DataFrame，plan.mask(df)返回bool数组
 
-        return df[mask].reset_index(drop=True)
+        Example:
+            plan = TableUtils.compile_filter({'age': ('>=', 18), 'city': ('in', ['北京', '上海'])})
+            for chunk in TableUtils.iter_table('big.csv'):
+                result = plan(chunk)
+        """
+        return FilterPlan(conditions)
 
     @staticmethod
-    def aggregate_data(
+    def create_index(
             df: pd.DataFrame,
+            columns: Union[str, List[str]],
+            kind: str = 'auto'
+    ) -> List[ColumnIndex]:
+        """
+        为常驻内存、需要反复筛选的DataFrame建立列索引
+
+        建立后对同一个DataFrame调用filter_data时自动使用：哈希索引处理'==', 'in', 'not in'，
+        排序索引处理'>', '<', '>=', '<='，n-gram索引处理不含正则元字符的'contains'与'contains_literal'。
+        列被重新赋值、增删行或修改元素后索引自动失效，失效的条件退回全表扫描
+
+        Args:
+            df: DataFrame
+            columns: 列名或列名列表
+            kind: 索引类型，可选：'hash', 'sorted', 'ngram', 'auto'
+                  'auto'为整数列建立哈希与排序索引，浮点数与日期时间列只建立排序索引，其他列只建立哈希索引；
+                  n-gram索引只在显式指定时建立
+
+        Returns:
+            新建的索引列表
+
+        Example:
+            TableUtils.create_index(df, ['user_id', 'created_at'])
+            TableUtils.filter_data(df, {'user_id': 42})                      # 查哈希索引
+            TableUtils.filter_data(df, {'created_at': ('>=', '2025-01-01')})  # 查排序索引
+            TableUtils.create_index(df, 'url', kind='ngram')
+            TableUtils.filter_data(df, {'url': ('contains', '/api/v2')})      # 查n-gram索引
+        """
+        return create_index(df, columns, kind)
+
+    @staticmethod
+    def drop_index(df: pd.DataFrame, columns: Union[str, List[str], None] = None) -> None:
+        """
+        删除DataFrame上的列索引
+
+        Args:
+            df: DataFrame
+            columns: 列名或列名列表，None表示全部列
+        """
+        drop_index(df, columns)
+
+    @staticmethod
+    def index_info(df: pd.DataFrame) -> List[Dict[str, Any]]:
+        """
+        列出DataFrame上仍然有效的列索引及各自的内存占用
+
+        Args:
+            df: DataFrame
+
+        Returns:
+            [{'column': 列名, 'kind': 'hash'/'sorted', 'nbytes': 字节数}, ...]
+        """
+        return index_info(df)
+
+    @staticmethod
+    def aggregate_data(
+            df: Union[pd.DataFrame, Iterable[pd.DataFrame]],
             group_by: Union[str, List[str]],
-            aggregations: Dict[str, Union[str, List[str]]]
+            aggregations: Dict[str, Union[str, List[str]]],
+            max_groups: int = 1_000_000,
+            spill_dir: Optional[str] = None,
+            n_jobs: Optional[int] = None
     ) -> pd.DataFrame:
         """
         数据分组聚合
 
+        df也可以是数据块迭代器（如 iter_table 的结果），此时流式聚合：每块只计算各组可合并的
+        中间状态，内存中的分组数超过max_groups时溢写到磁盘，输出格式与一次性聚合相同
+
+        n_jobs大于1（或为负数）时按分组键哈希分区、多进程并行聚合DataFrame，数据经共享内存
+        传给工作进程，结果与单进程完全一致
+
         Args:
-            df: 原始DataFrame
+            df: 原始DataFrame，或DataFrame数据块迭代器
             group_by: 分组列名
             aggregations: 聚合操作字典
                 {列名: 聚合函数} 或 {列名: [聚合函数列表]}
-                聚合函数: 'sum', 'mean', 'count', 'min', 'max', 'std'
+                聚合函数: 'sum', 'mean', 'count', 'min', 'max', 'std'（流式聚合另支持'var'）
+            max_groups: 流式聚合时内存中最多保留的分组数
+            spill_dir: 流式聚合溢写临时文件的目录，None表示系统临时目录
+            n_jobs: 并行进程数，None表示单进程，-1表示使用全部CPU核；只对DataFrame输入生效
 
         Returns:
             聚合后的DataFrame
+
+        Example:
+            chunks = TableUtils.iter_table('orders.csv', chunksize=1_000_000)
+            TableUtils.aggregate_data(chunks, 'city', {'amount': ['sum', 'mean', 'std']})
+            TableUtils.aggregate_data(df, ['city', 'day'], {'amount': ['sum', 'mean']}, n_jobs=-1)
         """
-        return df.groupby(group_by).agg(aggregations).reset_index()
+        if isinstance(df, pd.DataFrame):
+            if n_jobs is not None:
+                return aggregate_parallel(df, group_by, aggregations, n_jobs=n_jobs)
+            return df.groupby(group_by).agg(aggregations).reset_index()
+        return aggregate_chunks(df, group_by, aggregations, max_groups=max_groups, spill_dir=spill_dir)
 
     @staticmethod
     def merge_tables(
-            df1: pd.DataFrame,
-            df2: pd.DataFrame,
+            df1: Union[pd.DataFrame, Iterable[pd.DataFrame]],
+            df2: Union[pd.DataFrame, Iterable[pd.DataFrame], PreparedJoin],
             on: Union[str, List[str]],
-            how: str = 'inner'
+            how: str = 'inner',
+            memory_budget: Optional[int] = None,
+            spill_dir: Optional[str] = None
     ) -> pd.DataFrame:
         """
         合并两个表格
 
+        df2也可以是 prepare_join 预建了连接键索引的右表，反复与同一张右表连接时不再重建哈希表
+
+        指定memory_budget或传入数据块迭代器时使用分区哈希连接：两侧按连接键哈希写入磁盘分桶，
+        逐桶连接，连接过程中的内存占用不超过预算（结果仍全部放在内存，结果也放不下时用 iter_merge）。
+        此时行的顺序按分桶排列，与pd.merge不同
+
         Args:
-            df1: 左侧表格
-            df2: 右侧表格
+            df1: 左侧表格，DataFrame或数据块迭代器
+            df2: 右侧表格，DataFrame、数据块迭代器或PreparedJoin
             on: 合并依据的列
-            how: 合并方式，可选：'inner', 'left', 'right', 'outer'
+            how: 合并方式，可选：'inner', 'left', 'right', 'outer'（PreparedJoin只支持'inner', 'left'）
+            memory_budget: 分区连接时单个桶两侧数据合计的内存预算（字节），None表示直接pd.merge
+            spill_dir: 分桶临时文件所在目录，None表示系统临时目录
 
         Returns:
             合并后的DataFrame
         """
-        return pd.merge(df1, df2, on=on, how=how)
+        if isinstance(df2, PreparedJoin):
+            if ([on] if isinstance(on, str) else list(on)) != df2.on:
+                raise ValueError(f"连接键与预建索引不一致: {on} != {df2.on}")
+            return df2.merge(df1, how=how)
+        if memory_budget is None and isinstance(df1, pd.DataFrame) and isinstance(df2, pd.DataFrame):
+            return pd.merge(df1, df2, on=on, how=how)
+        parts = TableUtils.iter_merge(df1, df2, on, how=how, memory_budget=memory_budget, spill_dir=spill_dir)
+        return pd.concat(list(parts), ignore_index=True)
+
+    @staticmethod
+    def prepare_join(df: pd.DataFrame, on: Union[str, List[str]]) -> PreparedJoin:
+        """
+        为右表（维度表）预建连接键索引，结果可作为 merge_tables 的df2反复使用
+
+        右表连接键唯一时连接退化为按行位置的向量化取值；右表连接键列被修改后索引在下次连接前自动重建
+
+        Args:
+            df: 右表
+            on: 连接键列名
+
+        Returns:
+            PreparedJoin对象
+
+        Example:
+            users = TableUtils.prepare_join(users_df, 'user_id')
+            for batch in TableUtils.iter_table('orders.csv'):
+                joined = TableUtils.merge_tables(batch, users, on='user_id', how='left')
+        """
+        return PreparedJoin(df, on)
+
+    @staticmethod
+    def iter_merge(
+            df1: Union[pd.DataFrame, Iterable[pd.DataFrame]],
+            df2: Union[pd.DataFrame, Iterable[pd.DataFrame]],
+            on: Union[str, List[str]],
+            how: str = 'inner',
+            memory_budget: Optional[int] = None,
+            spill_dir: Optional[str] = None
+    ) -> Iterator[pd.DataFrame]:
+        """
+        分区哈希连接（Grace hash join），逐桶输出合并结果
+
+        Args:
+            df1: 左侧表格，DataFrame或数据块迭代器（如 iter_table 的结果）
+            df2: 右侧表格，DataFrame或数据块迭代器
+            on: 合并依据的列
+            how: 合并方式，可选：'inner', 'left', 'right', 'outer'
+            memory_budget: 单个桶两侧数据合计的内存预算（字节），None表示256MB
+            spill_dir: 分桶临时文件所在目录，None表示系统临时目录
+
+        Returns:
+            合并结果数据块的迭代器
+
+        Example:
+            orders = TableUtils.iter_table('orders.csv')
+            users = TableUtils.iter_table('users.csv')
+            for part in TableUtils.iter_merge(orders, users, on='user_id', how='left',
+                                              memory_budget=512 * 1024 ** 2):
+                part.to_csv('joined.csv', mode='a', header=False, index=False)
+        """
+        return grace_hash_join(df1, df2, on, how=how,
+                               memory_budget=memory_budget or DEFAULT_MEMORY_BUDGET, spill_dir=spill_dir)
 
     @staticmethod
     def clean_data(
             df: pd.DataFrame,
             strategy: str = 'drop',
             fill_value: Any = None,
-            columns: List[str] = None
+            columns: List[str] = None,
+            fill_values: Optional[Dict[str, Any]] = None,
+            inplace: bool = False,
+            n_jobs: Optional[int] = None
     ) -> pd.DataFrame:
         """
         数据清洗：处理缺失值
 
+        填充时只为含缺失值的列计算填充值（数值列为均值，其他列为众数），再用一次fillna填充；
+        流式处理多批数据时可先用 compute_fill_values 算好填充值，每批通过fill_values传入，
+        各批填充一致且不再重复计算。
+        默认返回新的DataFrame：开启pandas Copy-on-Write时只复制被修改的数据，否则复制一次；
+        inplace=True时直接修改df，不产生整表副本。
+        n_jobs不为None时缺失值检查与填充值计算按列多线程并行，结果与逐列计算相同
+
         Args:
             df: 原始DataFrame
             strategy: 处理策略，可选：'drop', 'fill'
             fill_value: 填充值（当strategy为'fill'时使用）
             columns: 指定处理的列，None表示处理所有列
+            fill_values: {列名: 填充值}，如 compute_fill_values 的结果；不在其中的列不填充
+            inplace: 是否直接修改df
+            n_jobs: 按列并行的线程数，None表示逐列计算，-1表示使用全部CPU核
 
         Returns:
-            清洗后的DataFrame
-        """
-        df_clean = df.copy()
+            清洗后的DataFrame（行索引重置为0..n-1）；inplace=True时为df本身
 
+        Example:
+            fills = TableUtils.compute_fill_values(TableUtils.iter_table('orders.csv'))
+            for batch in TableUtils.iter_table('orders.csv'):
+                batch = TableUtils.clean_data(batch, 'fill', fill_values=fills, inplace=True)
+        """
         if columns is None:
             columns = df.columns.tolist()
 
         if strategy == 'drop':
-            df_clean = df_clean.dropna(subset=columns)
-        elif strategy == 'fill':
-            for col in columns:
-                if col in df_clean.columns:
-                    # 为每一列单独计算填充值
-                    col_fill_value = fill_value
-                    if col_fill_value is None:
-                        if pd.api.types.is_numeric_dtype(df_clean[col]):
-                            col_fill_value = df_clean[col].mean()
-                        else:
-                            mode_values = df_clean[col].mode()
-                            col_fill_value = mode_values[0] if not mode_values.empty else ''
-
-                    if col_fill_value is not None:
-                        df_clean[col] = df_clean[col].fillna(col_fill_value)
-
-        return df_clean.reset_index(drop=True)
+            if inplace:
+                df.dropna(subset=columns, inplace=True, ignore_index=True)
+                return df
+            return df.dropna(subset=columns, ignore_index=True)
+
+        fills = {}
+        if strategy == 'fill':
+            present = [column for column in columns if column in df.columns]
+            hasnans = map_columns(lambda series: series.hasnans, [df[column] for column in present], n_jobs,
+                                  rows=len(df))
+            missing = [column for column, flag in zip(present, hasnans) if flag]
+            if fill_value is not None:
+                fills = dict.fromkeys(missing, fill_value)
+            elif fill_values is not None:
+                fills = {column: fill_values[column] for column in missing if column in fill_values}
+            else:
+                fills = _fill_statistics([df], missing, n_jobs=n_jobs)
+
+        if inplace:
+            result = df
+        else:
+            # Copy-on-Write下浅复制，fillna只复制被写入的数据；否则整表复制一次后原地填充
+            result = df.copy(deep=not copy_on_write())
+        if fills:
+            result.fillna(fills, inplace=True)
+        result.index = pd.RangeIndex(len(result))
+        return result
 
     @staticmethod
-    def describe_data(df: pd.DataFrame) -> Dict[str, Any]:
+    def compute_fill_values(
+            df: Union[pd.DataFrame, Iterable[pd.DataFrame]],
+            columns: Optional[List[str]] = None,
+            n_jobs: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        计算 clean_data 填充缺失值用的填充值：数值列为均值，其他列为众数（没有非空值时为''）
+
+        df也可以是数据块迭代器，各块的和、计数与取值频数合并后计算，结果与整表一次计算
+        在浮点舍入误差内相同（累加顺序不同，均值可能相差最后一位），众数完全相同
+
+        Args:
+            df: DataFrame或数据块迭代器
+            columns: 指定计算的列，None表示所有列
+            n_jobs: 按列并行的线程数，None表示逐列计算，-1表示使用全部CPU核
+
+        Returns:
+            {列名: 填充值}，可作为 clean_data 的fill_values反复使用
+        """
+        return _fill_statistics([df] if isinstance(df, pd.DataFrame) else df, columns, n_jobs=n_jobs)
+
+    @staticmethod
+    def optimize_dtypes(
+            df: pd.DataFrame,
+            dtypes: Optional[Union[str, Dict[str, str]]] = None,
+            category_ratio: float = 0.5,
+            strings: Union[bool, str] = 'auto'
+    ) -> Tuple[pd.DataFrame, DtypeReport]:
+        """
+        压缩列类型以减少内存占用，不丢失任何取值
+
+        整数列换成能容纳取值范围的最窄整数类型；浮点列在float32能无损表示全部取值时换成float32；
+        字符串列在object、category、pyarrow字符串中选占用最小的一种
+
+        Args:
+            df: 输入DataFrame（不修改）
+            dtypes: 已保存的列类型映射或其JSON文件路径，指定时不再推断
+            category_ratio: 不同取值个数占非空行数的比例不超过此值的字符串列才考虑category
+            strings: 是否考虑pyarrow字符串，'auto'表示安装了pyarrow时考虑
+
+        Returns:
+            (压缩后的DataFrame, DtypeReport)；report.table 为每列压缩前后的类型与字节数，
+            report.save(path) 保存选出的类型，供 read_table / iter_table 的dtypes参数使用
+
+        Example:
+            df, report = TableUtils.optimize_dtypes(df)
+            print(report.table['saved_bytes'])
+            report.save('orders.dtypes.json')
+        """
+        if isinstance(dtypes, (str, Path)):
+            dtypes = load_dtypes(dtypes)
+        return optimize_dtypes(df, dtypes=dtypes, category_ratio=category_ratio, strings=strings)
+
+    @staticmethod
+    def describe_data(
+            df: Union[pd.DataFrame, Iterable[pd.DataFrame]],
+            sketch: Union[bool, str] = 'auto',
+            n_jobs: Optional[int] = None
+    ) -> Dict[str, Any]:
         """
         生成数据描述统计
 
+        df为数据块迭代器或使用sketch时用 TableProfile 流式概要计算：均值、标准差、最小值、
+        最大值精确，中位数、不同取值个数、出现最多的取值及次数为近似值，结果另含error_bounds给出误差上界。
+        内存中的DataFrame精确统计比流式概要更快，默认只在行数达到SKETCH_MIN_ROWS时才用概要。
+        n_jobs不为None时各列的统计多线程并行，结果与逐列计算相同
+
         Args:
-            df: 输入DataFrame
+            df: 输入DataFrame，或DataFrame数据块迭代器
+            sketch: DataFrame输入是否使用流式概要计算，'auto'表示行数达到SKETCH_MIN_ROWS时使用
+            n_jobs: 按列并行的线程数，None表示逐列计算，-1表示使用全部CPU核
 
         Returns:
             包含统计信息的字典
+
+        Example:
+            TableUtils.describe_data(TableUtils.iter_table('orders.csv', chunksize=1_000_000))
         """
+        if sketch not in (True, False, 'auto'):
+            raise ValueError(f"sketch必须为True、False或'auto'，实际为: {sketch!r}")
+        if sketch == 'auto':
+            sketch = not isinstance(df, pd.DataFrame) or len(df) >= SKETCH_MIN_ROWS
+        if not isinstance(df, pd.DataFrame) or sketch:
+            return TableUtils.profile_data(df, n_jobs=n_jobs).result()
+
         description = {
             'shape': df.shape,
             'columns': df.columns.tolist(),
@@ -252,53 +1339,85 @@ class TableUtils:
 
         # 数值型列统计
         numeric_cols = df.select_dtypes(include=[np.number]).columns
-        if len(numeric_cols) > 0:
-            description['numeric_stats'] = {
-                col: {
-                    'mean': float(df[col].mean()),
-                    'std': float(df[col].std()),
-                    'min': float(df[col].min()),
-                    'max': float(df[col].max()),
-                    'median': float(df[col].median())
-                }
-                for col in numeric_cols
-            }
+        stats = map_columns(_numeric_summary, [df[col] for col in numeric_cols], n_jobs, rows=len(df))
+        description['numeric_stats'] = dict(zip(numeric_cols, stats))
 
         # 分类型列统计
         categorical_cols = df.select_dtypes(include=['object', 'category']).columns
-        if len(categorical_cols) > 0:
-            description['categorical_stats'] = {
-                col: {
-                    'unique_count': int(df[col].nunique()),
-                    'top_value': df[col].mode()[0] if not df[col].mode().empty else None,
-                    'top_count': int(df[col].value_counts().iloc[0]) if not df[col].value_counts().empty else 0
-                }
-                for col in categorical_cols
-            }
+        stats = map_columns(_categorical_summary, [df[col] for col in categorical_cols], n_jobs, rows=len(df))
+        description['categorical_stats'] = dict(zip(categorical_cols, stats))
 
         return description
 
+    @staticmethod
+    def profile_data(
+            df: Union[pd.DataFrame, Iterable[pd.DataFrame]],
+            k: int = 200,
+            precision: int = 14,
+            top_k: int = 64,
+            n_jobs: Optional[int] = None
+    ) -> TableProfile:
+        """
+        逐块生成可合并的数据概要
+
+        不同文件、不同进程的概要可以用 TableProfile.merge 合并，再用 result() 得到
+        与 describe_data 格式相同的统计结果
+
+        Args:
+            df: DataFrame或数据块迭代器
+            k: 中位数KLL概要的精度参数，秩误差约为 2.296 / k^0.9723
+            precision: 不同取值个数HyperLogLog的精度，相对标准误差为 1.04 / sqrt(2^precision)
+            top_k: 出现最多取值的Misra-Gries计数器个数，计数误差不超过 行数 / (top_k + 1)
+            n_jobs: 按列并行更新概要的线程数，None表示逐列计算，-1表示使用全部CPU核
+
+        Returns:
+            TableProfile 概要
+
+        Example:
+            profile = TableUtils.profile_data(TableUtils.iter_table('2025.csv'))
+            profile.merge(TableUtils.profile_data(TableUtils.iter_table('2026.csv')))
+            description = profile.result()
+        """
+        profile = TableProfile(k=k, precision=precision, top_k=top_k)
+        for chunk in [df] if isinstance(df, pd.DataFrame) else df:
+            profile.update(chunk, n_jobs=n_jobs)
+        return profile
+
     @staticmethod
     def pivot_table(
             df: pd.DataFrame,
             index: Union[str, List[str]],
             columns: Union[str, List[str]],
             values: Union[str, List[str]],
-            aggfunc: str = 'mean'
-    ) -> pd.DataFrame:
+            aggfunc: Union[str, List[str]] = 'mean',
+            sparse: bool = False
+    ) -> Union[pd.DataFrame, SparsePivot]:
         """
         创建数据透视表
 
+        aggfunc为列表时只分组一次计算所有聚合函数，结果与pd.pivot_table相同。
+        sparse=True时返回 SparsePivot：只保存出现过的 (行, 列) 组合，适合列索引取值很多
+        （如按SKU、按用户展开）而大部分单元格为空的透视，可用 to_dense() 还原为稠密透视表
+
         Args:
             df: 原始DataFrame
             index: 行索引
             columns: 列索引
             values: 数值列
-            aggfunc: 聚合函数
+            aggfunc: 聚合函数或聚合函数列表
+            sparse: 是否返回稀疏透视表（需要同时指定index、columns与values）
 
         Returns:
-            透视表DataFrame
+            透视表DataFrame；sparse=True时为 SparsePivot
+
+        Example:
+            TableUtils.pivot_table(df, 'category', 'month', 'sales', ['sum', 'mean', 'count'])
+            pivot = TableUtils.pivot_table(df, 'user', 'sku', 'amount', 'sum', sparse=True)
         """
+        if sparse:
+            return pivot_sparse(df, index, columns, values, aggfunc)
+        if isinstance(aggfunc, list) and one_pass_supported(df, index, columns, values):
+            return pivot_dense(df, index, columns, values, aggfunc)
         return pd.pivot_table(
             df,
             index=index,
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""
+@Time : 2026/10/17 11:40
+@Email : Lvan826199@163.com
+@公众号 : 梦无矶测开实录
+@File : test_business_calendar.py
+"""
+__author__ = "梦无矶小仔"
+# tests/test_business_calendar.py
+"""
+工作日日历模块的单元测试
+"""
+import json
+import tempfile
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+from mwj_tools.business_calendar import BusinessCalendar
+
+
+class TestBusinessCalendar:
+    """测试 BusinessCalendar 类"""
+
+    def setup_method(self):
+        """2025年元旦放假，1月26日（周日）调休上班"""
+        self.holidays = ['2025-01-01', '2025-01-28', '2025-01-29', '2025-01-30', '2025-01-31']
+        self.calendar = BusinessCalendar(
+            holidays=self.holidays,
+            workdays=['2025-01-26'],
+            start_year=2020,
+            end_year=2030
+        )
+
+    def test_is_business_day(self):
+        """测试工作日判断 - 节假日、周末与调休"""
+        assert self.calendar.is_business_day('2025-01-02') is True
+        assert self.calendar.is_business_day(date(2025, 1, 1)) is False
+        assert self.calendar.is_business_day('2025-01-04T10:00:00') is False  # 周六
+        assert self.calendar.is_business_day('2025-01-26') is True  # 调休上班的周日
+
+    def test_is_business_day_out_of_range(self):
+        """测试超出日历范围"""
+        with pytest.raises(ValueError):
+            self.calendar.is_business_day('2031-01-01')
+
+    def test_is_business_day_batch(self):
+        """测试批量工作日判断"""
+        result = self.calendar.is_business_day_batch(['2025-01-01', '2025-01-02', '2025-01-26'])
+        assert result.tolist() == [False, True, True]
+
+    def test_add_business_days_matches_numpy(self):
+        """测试批量加减工作日 - 与numpy.busday_offset一致"""
+        calendar = BusinessCalendar(holidays=self.holidays, start_year=2020, end_year=2030)
+        days = np.arange(np.datetime64('2024-12-01'), np.datetime64('2025-03-01'))
+        for n in (-7, -1, 0, 1, 10):
+            for roll in ('forward', 'backward'):
+                expected = np.busday_offset(days, n, roll=roll, holidays=self.holidays)
+                np.testing.assert_array_equal(calendar.add_business_days(days, n, roll=roll), expected)
+
+    def test_add_business_days_with_workday(self):
+        """测试加减工作日 - 跨过节假日与调休"""
+        result = self.calendar.add_business_days(['2024-12-31', '2025-01-24'], [1, 1])
+        assert result.astype(object).tolist() == [date(2025, 1, 2), date(2025, 1, 26)]
+
+    def test_business_days_between(self):
+        """测试区间工作日数量"""
+        result = self.calendar.business_days_between(['2025-01-01', '2025-02-01'], '2025-02-01')
+        # 1月共23个周一至周五，扣除元旦和春节4天，加上1天调休
+        assert result.tolist() == [19, 0]
+        reverse = self.calendar.business_days_between('2025-02-01', ['2025-01-01'])
+        assert reverse.tolist() == [-19]
+
+    def test_batch_with_nat(self):
+        """测试批量接口中的NaT - 判断为False，加减结果为NaT，区间数量为NaN"""
+        dts = np.array(['2025-01-02', 'NaT', '2024-12-31'], dtype='datetime64[us]')
+        assert self.calendar.is_business_day_batch(dts).tolist() == [True, False, True]
+
+        result = self.calendar.add_business_days(dts, [1, 1, 1])
+        assert result.dtype == np.dtype('datetime64[D]') and np.isnat(result).tolist() == [False, True, False]
+        assert result[[0, 2]].astype(object).tolist() == [date(2025, 1, 3), date(2025, 1, 2)]
+
+        between = self.calendar.business_days_between(dts, ['2025-02-01', '2025-02-01', 'NaT'])
+        np.testing.assert_array_equal(between, [19.0, np.nan, np.nan])
+        assert self.calendar.business_days_between(pd.Series([None, '2025-01-01']), '2025-02-01')[1] == 19
+
+    def test_invalid_weekmask(self):
+        """测试非法的weekmask"""
+        with pytest.raises(ValueError):
+            BusinessCalendar(weekmask='11111')
+
+    def test_from_csv(self):
+        """测试从CSV加载节假日与调休"""
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False, encoding='utf-8') as tmp:
+            tmp.write('date,kind\n2025-01-01,holiday\n2025-01-26,调休\n')
+        calendar = BusinessCalendar.from_csv(tmp.name, start_year=2025, end_year=2025)
+        Path(tmp.name).unlink()
+
+        assert calendar.holidays == {date(2025, 1, 1)}
+        assert calendar.workdays == {date(2025, 1, 26)}
+
+    def test_from_csv_without_header(self):
+        """测试从无表头CSV加载"""
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as tmp:
+            tmp.write('2025-01-01\n2025-05-01\n')
+        calendar = BusinessCalendar.from_csv(tmp.name, start_year=2025, end_year=2025)
+        Path(tmp.name).unlink()
+
+        assert calendar.holidays == {date(2025, 1, 1), date(2025, 5, 1)}
+
+    def test_from_json(self):
+        """测试从JSON加载节假日"""
+        with tempfile.NamedTemporaryFile('w', suffix='.json', delete=False) as tmp:
+            json.dump({'holidays': ['2025-01-01'], 'workdays': ['2025-01-26']}, tmp)
+        calendar = BusinessCalendar.from_json(tmp.name, start_year=2025, end_year=2025)
+        Path(tmp.name).unlink()
+
+        assert calendar.is_business_day('2025-01-01') is False
+        assert calendar.is_business_day('2025-01-26') is True
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
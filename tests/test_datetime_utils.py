@@ -14,6 +14,8 @@ __author__ = "梦无矶小仔"
 import pytest
 from datetime import datetime, date, timedelta
 import time
+import numpy as np
+import pandas as pd
 from mwj_tools.datetime_utils import DateTimeUtils
 
 
@@ -155,6 +157,18 @@ class TestDateTimeUtils:
         expected = datetime(2023, 2, 28, 12, 0, 0)
         assert result == expected
 
+    def test_add_time_with_months_leap_year(self):
+        """测试时间加减 - 月份加减落在闰年2月"""
+        base = datetime(2024, 3, 31, 8, 0, 0)
+        result = DateTimeUtils.add_time(base, months=-1, days=1)
+        expected = datetime(2024, 3, 1, 8, 0, 0)
+        assert result == expected
+
+    def test_shift_months_date(self):
+        """测试按自然月加减 - date对象与跨年"""
+        assert DateTimeUtils.shift_months(date(2023, 12, 31), 2) == date(2024, 2, 29)
+        assert DateTimeUtils.shift_months("2023-05-31T10:00:00", -13) == datetime(2022, 4, 30, 10, 0, 0)
+
     def test_add_time_with_string_input(self):
         """测试时间加减 - 字符串输入"""
         base_str = "2023-01-01T12:00:00"
@@ -198,6 +212,14 @@ class TestDateTimeUtils:
         expected = datetime(2023, 1, 1, 8, 0, 0)
         assert result == expected
 
+    def test_timestamp_with_timezone(self):
+        """测试指定时区的时间戳转换"""
+        timestamp = DateTimeUtils.to_timestamp("2023-01-01T00:00:00", tz='UTC')
+        assert timestamp == 1672531200
+        result = DateTimeUtils.from_timestamp(timestamp, tz='Asia/Tokyo')
+        assert result.replace(tzinfo=None) == datetime(2023, 1, 1, 9, 0, 0)
+        assert result.utcoffset() == timedelta(hours=9)
+
     def test_time_difference_seconds(self):
         """测试时间差计算 - 秒单位"""
         time1 = datetime(2023, 1, 1, 12, 0, 0)
@@ -317,6 +339,356 @@ class TestDateTimeUtils:
         assert (end - start).days == 6
 
 
+class TestDateRange:
+    """测试日期序列生成"""
+
+    def test_date_range_days(self):
+        """测试按天生成 - 包含结束日期"""
+        result = DateTimeUtils.date_range("2023-12-30", "2024-01-02")
+        assert result.dtype == np.dtype('datetime64[us]')
+        assert result.astype(object).tolist() == [datetime(2023, 12, 30) + timedelta(days=i) for i in range(4)]
+
+    def test_date_range_hours_formatted(self):
+        """测试按小时生成 - 格式化输出"""
+        result = DateTimeUtils.date_range("2024-01-01", "2024-01-01T05:00:00", step=2, unit='hours', fmt="%H:%M")
+        assert result.tolist() == ['00:00', '02:00', '04:00']
+
+    def test_date_range_months_month_end(self):
+        """测试按月生成 - 月末对齐不漂移"""
+        expected = [datetime(2024, 1, 31), datetime(2024, 2, 29), datetime(2024, 3, 31), datetime(2024, 4, 30)]
+        result = DateTimeUtils.date_range("2024-01-31", "2024-04-30", unit='months')
+        assert result.astype(object).tolist() == expected
+        assert list(DateTimeUtils.date_range("2024-01-31", "2024-04-30", unit='months', lazy=True)) == expected
+
+    def test_date_range_negative_step(self):
+        """测试负步长"""
+        result = DateTimeUtils.date_range("2024-01-03", "2024-01-01", step=-1, fmt="%d")
+        assert result.tolist() == ['03', '02', '01']
+
+    def test_date_range_lazy_unbounded(self):
+        """测试惰性模式 - 无结束时间"""
+        from itertools import islice
+        generator = DateTimeUtils.date_range("2024-01-01", lazy=True, step=30, unit='minutes', fmt="%H:%M")
+        assert list(islice(generator, 3)) == ['00:00', '00:30', '01:00']
+
+    def test_date_range_invalid(self):
+        """测试非法参数"""
+        with pytest.raises(ValueError):
+            DateTimeUtils.date_range("2024-01-01", "2024-02-01", step=0)
+        with pytest.raises(ValueError):
+            DateTimeUtils.date_range("2024-01-01")
+        with pytest.raises(ValueError):
+            DateTimeUtils.date_range("2024-01-01", "2024-02-01", unit='weeks')
+
+
+class TestCompiledFormat:
+    """测试预编译格式化器"""
+
+    def test_compile_format_cached(self):
+        """测试同一格式字符串复用同一格式化器"""
+        formatter = DateTimeUtils.compile_format("%Y-%m-%d")
+        assert formatter is DateTimeUtils.compile_format("%Y-%m-%d")
+        assert formatter.fast
+
+    def test_compile_format_scalar(self):
+        """测试单值格式化与strftime一致"""
+        values = [datetime(2023, 1, 2, 3, 4, 5), date(2024, 2, 29), datetime(999, 12, 31, 23, 59, 59)]
+        for fmt in ["%Y-%m-%d %H:%M:%S", "%Y年%m月%d日", "100%% %d", "%A %Y"]:
+            formatter = DateTimeUtils.compile_format(fmt)
+            assert [formatter(v) for v in values] == [v.strftime(fmt) for v in values]
+
+    def test_compile_format_unsupported_directive(self):
+        """测试不支持的指令回退到strftime"""
+        formatter = DateTimeUtils.compile_format("%b %d, %Y")
+        assert not formatter.fast
+        assert formatter(datetime(2023, 7, 4)) == "Jul 04, 2023"
+
+    def test_format_array(self):
+        """测试批量格式化与strftime逐个格式化一致"""
+        arr = np.array(['0999-12-31T23:59:59', '2023-01-02T03:04:05', '2024-02-29T12:00:00',
+                        '9999-12-31T00:00:01'], dtype='datetime64[us]')
+        for fmt in ["%Y-%m-%d %H:%M:%S", "%Y年%m月%d日 %H点", "%d/%m/%Y %a"]:
+            result = DateTimeUtils.compile_format(fmt).format_array(arr)
+            assert result.tolist() == [dt.strftime(fmt) for dt in arr.astype(object)]
+
+
+class TestCoarseClock:
+    """测试粗粒度缓存时钟"""
+
+    def teardown_method(self):
+        DateTimeUtils.disable_coarse_clock()
+
+    def test_coarse_clock_context(self):
+        """测试上下文管理器 - 分辨率内返回同一缓存值"""
+        with DateTimeUtils.coarse_clock(resolution=60):
+            first = DateTimeUtils.now()
+            assert DateTimeUtils.now() is first
+            assert DateTimeUtils.add_time(days=1) == first + timedelta(days=1)
+            assert DateTimeUtils.now('%Y-%m-%d %H:%M:%S') == first.strftime('%Y-%m-%d %H:%M:%S')
+        # 退出后恢复实时读取
+        assert DateTimeUtils.now() is not DateTimeUtils.now()
+
+    def test_coarse_clock_refresh(self):
+        """测试超过分辨率后刷新"""
+        with DateTimeUtils.coarse_clock(resolution=0.01):
+            first = DateTimeUtils.now()
+            time.sleep(0.03)
+            assert DateTimeUtils.now() > first
+
+    def test_coarse_clock_background(self):
+        """测试全局模式 - 后台线程刷新"""
+        clock = DateTimeUtils.enable_coarse_clock(resolution=0.01, background=True)
+        first = DateTimeUtils.now()
+        time.sleep(0.05)
+        assert DateTimeUtils.now() > first
+        assert abs((datetime.now() - DateTimeUtils.now()).total_seconds()) < 1
+
+        DateTimeUtils.disable_coarse_clock()
+        assert clock._thread is None
+
+    def test_coarse_clock_invalid_resolution(self):
+        """测试非法分辨率"""
+        with pytest.raises(ValueError):
+            DateTimeUtils.coarse_clock(resolution=0)
+
+
+class TestDateTimeUtilsParseCache:
+    """测试共享的字符串解析缓存"""
+
+    def setup_method(self):
+        DateTimeUtils.set_parse_cache_size(128)
+
+    def teardown_method(self):
+        DateTimeUtils.set_parse_cache_size(4096)
+
+    def test_parse_cache_hits(self):
+        """测试重复字符串命中缓存"""
+        for _ in range(3):
+            DateTimeUtils.to_timestamp("2023-01-01T00:00:00")
+        info = DateTimeUtils.parse_cache_info()
+        assert info['misses'] == 1
+        assert info['hits'] == 2
+        assert info['maxsize'] == 128
+
+    def test_parse_cache_bounded(self):
+        """测试缓存大小有上限"""
+        DateTimeUtils.set_parse_cache_size(2)
+        for day in range(1, 6):
+            DateTimeUtils.format_time(f"2023-01-0{day}T00:00:00")
+        assert DateTimeUtils.parse_cache_info()['currsize'] == 2
+
+        DateTimeUtils.clear_parse_cache()
+        assert DateTimeUtils.parse_cache_info()['currsize'] == 0
+
+    def test_parse_many(self):
+        """测试批量解析 - 每个不同字符串只解析一次"""
+        values = ["2023-01-01T08:00:00", "2023-01-02", "2023-01-01T08:00:00", datetime(2023, 5, 1)]
+        result = DateTimeUtils.parse_many(values)
+        assert result == [
+            datetime(2023, 1, 1, 8, 0, 0),
+            datetime(2023, 1, 2),
+            datetime(2023, 1, 1, 8, 0, 0),
+            datetime(2023, 5, 1),
+        ]
+        assert DateTimeUtils.parse_cache_info()['misses'] == 2
+
+
+class TestDateTimeUtilsBatch:
+    """测试 DateTimeUtils 批量接口，结果应与逐个调用标量接口一致"""
+
+    def setup_method(self):
+        self.values = [
+            datetime(2023, 1, 31, 12, 0, 0),
+            "2023-12-30T08:15:00",
+            "2024-02-29 23:59:59",
+            "2023-12-30T08:15:00",
+        ]
+        self.expected = [
+            datetime(2023, 1, 31, 12, 0, 0),
+            datetime(2023, 12, 30, 8, 15, 0),
+            datetime(2024, 2, 29, 23, 59, 59),
+            datetime(2023, 12, 30, 8, 15, 0),
+        ]
+
+    def test_add_time_batch(self):
+        """测试批量时间加减 - 包含月份"""
+        result = DateTimeUtils.add_time_batch(self.values, days=1, hours=2, months=1)
+        expected = [DateTimeUtils.add_time(v, days=1, hours=2, months=1) for v in self.expected]
+        assert result.dtype == np.dtype('datetime64[us]')
+        assert result.astype(object).tolist() == expected
+
+    def test_shift_months_batch_matches_relativedelta(self):
+        """测试批量月份加减 - 与relativedelta逐个计算结果一致"""
+        from dateutil.relativedelta import relativedelta
+
+        days = np.arange(np.datetime64('2023-01-01'), np.datetime64('2025-01-01')).astype('datetime64[us]')
+        days = days + np.timedelta64(3723, 's')
+        for months in (-25, -1, 1, 11, 12, 37):
+            result = DateTimeUtils.shift_months_batch(days, months)
+            expected = [dt + relativedelta(months=months) for dt in days.astype(object)]
+            assert result.astype(object).tolist() == expected
+
+    def test_shift_months_batch_per_row(self):
+        """测试批量月份加减 - 每行不同的月数"""
+        result = DateTimeUtils.shift_months_batch(
+            ['2023-01-31', '2023-01-31', '2024-02-29'], [1, 13, -12]
+        )
+        assert result.astype(object).tolist() == [
+            datetime(2023, 2, 28), datetime(2024, 2, 29), datetime(2023, 2, 28)
+        ]
+
+    def test_shift_months_batch_out_of_range(self):
+        """测试批量月份加减 - 超出年份范围"""
+        with pytest.raises(ValueError):
+            DateTimeUtils.shift_months_batch(['9999-12-01'], 1)
+
+    def test_to_from_timestamp_batch(self):
+        """测试批量时间戳互转"""
+        timestamps = DateTimeUtils.to_timestamp_batch(self.values)
+        assert timestamps.tolist() == [DateTimeUtils.to_timestamp(v) for v in self.expected]
+
+        result = DateTimeUtils.from_timestamp_batch(timestamps)
+        assert result.astype(object).tolist() == self.expected
+
+    def test_timestamp_batch_with_timezone(self):
+        """测试指定时区的批量时间戳互转 - 跨夏令时切换，与zoneinfo逐个计算一致"""
+        from zoneinfo import ZoneInfo
+
+        zone = ZoneInfo('America/New_York')
+        walls = np.arange(np.datetime64('2024-03-10T00:30'), np.datetime64('2024-03-10T04:00'),
+                          np.timedelta64(15, 'm')).astype('datetime64[us]')
+        walls = np.concatenate([walls, walls + np.timedelta64(238, 'D')])  # 11月3日夏令时结束
+        timestamps = DateTimeUtils.to_timestamp_batch(walls, tz='America/New_York')
+        expected = [DateTimeUtils.to_timestamp(dt, tz=zone) for dt in walls.astype(object)]
+        assert timestamps.tolist() == expected
+
+        result = DateTimeUtils.from_timestamp_batch(timestamps, tz='America/New_York')
+        expected = [DateTimeUtils.from_timestamp(ts, tz=zone).replace(tzinfo=None) for ts in timestamps]
+        assert result.astype(object).tolist() == expected
+
+    def test_timestamp_batch_with_nat(self):
+        """测试含NaT/NaN的时间戳互转 - 不参与偏移查表，其余行与逐个计算一致"""
+        from zoneinfo import ZoneInfo
+
+        zone = ZoneInfo('America/New_York')
+        walls = np.array(['2024-03-10T01:30', 'NaT', '2024-11-03T01:30'], dtype='datetime64[us]')
+        for tz in (None, 'America/New_York'):
+            timestamps = DateTimeUtils.to_timestamp_batch(walls, tz=tz)
+            assert np.isnan(timestamps[1])
+            expected = [DateTimeUtils.to_timestamp(dt, tz=zone if tz else None) for dt in walls[[0, 2]].astype(object)]
+            assert timestamps[[0, 2]].tolist() == expected
+
+            result = DateTimeUtils.from_timestamp_batch(timestamps, tz=tz)
+            assert np.isnat(result[1])
+            assert result[[0, 2]].tolist() == walls[[0, 2]].tolist()
+
+    def test_time_difference_batch(self):
+        """测试批量时间差计算 - 标量第二参数"""
+        result = DateTimeUtils.time_difference_batch(self.values, "2024-01-01", unit='days')
+        expected = [DateTimeUtils.time_difference(v, "2024-01-01", unit='days') for v in self.expected]
+        np.testing.assert_allclose(result, expected)
+
+    def test_format_time_batch_series(self):
+        """测试批量格式化 - pandas Series输入"""
+        series = pd.Series(pd.to_datetime(self.expected))
+        result = DateTimeUtils.format_time_batch(series, "%Y年%m月%d日 %H:%M")
+        assert result.tolist() == [DateTimeUtils.format_time(v, "%Y年%m月%d日 %H:%M") for v in self.expected]
+
+    def test_future_date_batch(self):
+        """测试批量未来日期计算"""
+        result = DateTimeUtils.future_date_batch([0, 1, 366], "2024-02-28", "%Y/%m/%d")
+        assert result.tolist() == [DateTimeUtils.future_date(d, "2024-02-28", "%Y/%m/%d") for d in (0, 1, 366)]
+
+    def test_is_weekend_batch(self):
+        """测试批量周末判断 - datetime64数组输入"""
+        arr = np.array(['2023-12-25', '2023-12-30', '2023-12-31'], dtype='datetime64[D]')
+        assert DateTimeUtils.is_weekend_batch(arr).tolist() == [False, True, True]
+
+    def test_time_bucket_batch_week(self):
+        """测试按周分桶 - 与get_week_range的周一一致"""
+        starts = DateTimeUtils.time_bucket_batch(self.values, 'week', output='start')
+        assert starts.astype(object).tolist() == [DateTimeUtils.get_week_range(v)[0] for v in self.expected]
+        keys = DateTimeUtils.time_bucket_batch(self.values, 'week')
+        assert keys[1] == keys[3] and keys[0] < keys[1] < keys[2]
+
+    def test_time_bucket_batch_month_quarter(self):
+        """测试按月、季度分桶"""
+        values = ['1969-12-31T23:59:59', '1970-01-01', '1970-05-20T10:00:00']
+        assert DateTimeUtils.time_bucket_batch(values, 'month').tolist() == [-1, 0, 4]
+        assert DateTimeUtils.time_bucket_batch(values, 'quarter').tolist() == [-1, 0, 1]
+        starts = DateTimeUtils.time_bucket_batch(values, 'quarter', output='start')
+        assert starts.astype(object).tolist() == [date(1969, 10, 1), date(1970, 1, 1), date(1970, 4, 1)]
+
+    def test_time_bucket_batch_hour(self):
+        """测试按小时分桶 - pandas Series输入，可直接用于分组"""
+        series = pd.Series(pd.to_datetime(['2024-01-01 10:15', '2024-01-01 10:45', '2024-01-01 11:05']))
+        starts = DateTimeUtils.time_bucket_batch(series, 'hour', output='start')
+        df = pd.DataFrame({'hour': starts, 'value': [1, 2, 3]})
+        result = df.groupby('hour')['value'].sum()
+        assert result.tolist() == [3, 3]
+
+    def test_time_bucket_batch_with_nat(self):
+        """测试含NaT的分桶 - 起始时间为NaT，编号为NaN，分组时丢弃"""
+        values = ['1969-12-31T23:59:59', None, '1970-05-20T10:00:00']
+        for granularity in ('minute', 'day', 'week', 'month', 'quarter'):
+            starts = DateTimeUtils.time_bucket_batch(values, granularity, output='start')
+            assert np.isnat(starts[1]) and not np.isnat(starts[[0, 2]]).any()
+            keys = DateTimeUtils.time_bucket_batch(values, granularity)
+            assert np.isnan(keys[1])
+        keys = DateTimeUtils.time_bucket_batch(values, 'month')
+        assert keys[[0, 2]].tolist() == [-1, 4]
+        result = pd.DataFrame({'month': keys, 'value': [1, 2, 3]}).groupby('month')['value'].sum()
+        assert result.tolist() == [1, 3]
+
+    def test_time_bucket_batch_invalid(self):
+        """测试非法粒度"""
+        with pytest.raises(ValueError):
+            DateTimeUtils.time_bucket_batch(self.values, 'year')
+
+    def test_get_week_range_batch(self):
+        """测试批量获取周范围"""
+        starts, ends = DateTimeUtils.get_week_range_batch(self.values)
+        expected = [DateTimeUtils.get_week_range(v) for v in self.expected]
+        assert list(zip(starts.astype(object), ends.astype(object))) == expected
+
+    def test_batch_with_nat(self):
+        """测试含NaT的输入 - 其余行结果不变，NaT行得到NaT/NaN/False"""
+        values = self.values + [None]
+        series = pd.Series(pd.to_datetime(self.expected + [pd.NaT]))
+
+        result = DateTimeUtils.add_time_batch(values, days=1, months=1)
+        assert result[:-1].astype(object).tolist() == [DateTimeUtils.add_time(v, days=1, months=1)
+                                                      for v in self.expected]
+        assert np.isnat(result[-1])
+        assert np.isnat(DateTimeUtils.shift_months_batch(series, 1)[-1])
+
+        formatted = DateTimeUtils.format_time_batch(series, "%m-%d")
+        assert formatted.tolist() == [DateTimeUtils.format_time(v, "%m-%d") for v in self.expected] + ['NaT']
+        assert DateTimeUtils.format_time_batch(values, "%j")[-1] == 'NaT'
+
+        timestamps = DateTimeUtils.to_timestamp_batch(values)
+        assert timestamps[:-1].tolist() == [DateTimeUtils.to_timestamp(v) for v in self.expected]
+        assert np.isnan(timestamps[-1])
+        assert np.isnan(DateTimeUtils.to_timestamp_batch(series, tz='America/New_York')[-1])
+        assert np.isnan(DateTimeUtils.time_difference_batch(values, "2024-01-01")[-1])
+
+        assert DateTimeUtils.is_weekend_batch(series).tolist() == [False, True, False, True, False]
+        starts, ends = DateTimeUtils.get_week_range_batch(values)
+        assert starts[:-1].astype(object).tolist() == [DateTimeUtils.get_week_range(v)[0] for v in self.expected]
+        assert np.isnat(starts[-1]) and np.isnat(ends[-1])
+
+    def test_iso_strings_not_parsed_one_by_one(self):
+        """测试ISO字符串与datetime对象整列转换，不经过逐个解析"""
+        DateTimeUtils.clear_parse_cache()
+        result = DateTimeUtils.add_time_batch(self.values)
+        assert result.astype(object).tolist() == self.expected
+        assert DateTimeUtils.parse_cache_info()['misses'] == 0
+        # 带时区的字符串仍换算为本地时间
+        aware = DateTimeUtils.add_time_batch(["2024-01-01T00:00:00+00:00"])
+        expected = datetime.fromisoformat("2024-01-01T00:00:00+00:00").astimezone().replace(tzinfo=None)
+        assert aware[0].astype(object) == expected
+
+
 if __name__ == "__main__":
     '''
     # 在项目根目录下运行
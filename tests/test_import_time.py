@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+@Time : 2026/10/17 10:20
+@Email : Lvan826199@163.com
+@公众号 : 梦无矶测开实录
+@File : test_import_time.py
+"""
+__author__ = "梦无矶小仔"
+# tests/test_import_time.py
+"""
+导入耗时回归测试：只使用DateTimeUtils时不应加载pandas/numpy
+"""
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+import mwj_tools
+
+# import mwj_tools + mwj_tools.datetime_utils 的累计导入耗时上限（微秒）
+IMPORT_TIME_BUDGET_US = 100_000
+
+
+def run_python(code: str, *options: str) -> subprocess.CompletedProcess:
+    """在独立的解释器进程中执行代码，保证模块缓存是干净的"""
+    env = dict(os.environ)
+    src_dir = str(Path(mwj_tools.__file__).resolve().parents[1])
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [src_dir, env.get('PYTHONPATH')]))
+    return subprocess.run(
+        [sys.executable, *options, '-c', code],
+        capture_output=True, text=True, env=env, check=True
+    )
+
+
+def cumulative_import_us(stderr: str, module: str) -> int:
+    """从 -X importtime 的输出中取出指定模块的累计耗时"""
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        parts = [part.strip() for part in line[len('import time:'):].split('|')]
+        if parts[2] == module:
+            return int(parts[1])
+    raise AssertionError(f"未找到模块 {module} 的导入耗时")
+
+
+class TestImportTime:
+    """测试包的导入耗时"""
+
+    def test_datetime_utils_does_not_load_heavy_modules(self):
+        """测试只使用DateTimeUtils时不加载pandas和numpy"""
+        result = run_python(
+            "import sys\n"
+            "from mwj_tools import DateTimeUtils\n"
+            "DateTimeUtils.add_time('2025-01-31T00:00:00', months=1)\n"
+            "print(','.join(m for m in ('pandas', 'numpy') if m in sys.modules))"
+        )
+        assert result.stdout.strip() == ''
+
+    def test_table_utils_loaded_on_access(self):
+        """测试TableUtils在首次访问时加载"""
+        result = run_python(
+            "import sys, mwj_tools\n"
+            "before = 'mwj_tools.table_utils' in sys.modules\n"
+            "mwj_tools.TableUtils\n"
+            "print(before, 'mwj_tools.table_utils' in sys.modules)"
+        )
+        assert result.stdout.split() == ['False', 'True']
+
+    def test_import_time_budget(self):
+        """测试 python -X importtime 下的导入耗时不超过预算"""
+        # 通过import语句导入子模块，importlib.import_module的加载不会出现在importtime输出中
+        result = run_python("import mwj_tools; import mwj_tools.datetime_utils", '-X', 'importtime')
+        elapsed = (cumulative_import_us(result.stderr, 'mwj_tools')
+                   + cumulative_import_us(result.stderr, 'mwj_tools.datetime_utils'))
+        assert elapsed < IMPORT_TIME_BUDGET_US
+
+    def test_unknown_attribute(self):
+        """测试访问不存在的属性"""
+        with pytest.raises(AttributeError):
+            mwj_tools.NotExists
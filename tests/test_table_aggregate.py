@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+"""
+@Time : 2026/10/18 00:40
+@Email : Lvan826199@163.com
+@公众号 : 梦无矶测开实录
+@File : test_table_aggregate.py
+"""
+__author__ = "梦无矶小仔"
+# tests/test_table_aggregate.py
+"""
+流式分组聚合模块的单元测试
+"""
+import numpy as np
+import pandas as pd
+import pytest
+from mwj_tools import table_aggregate
+from mwj_tools.table_aggregate import StreamingAggregator, merge_states, aggregate_chunks, aggregate_parallel
+from mwj_tools.table_utils import TableUtils
+
+
+def _chunks(df, size):
+    return (df.iloc[start:start + size] for start in range(0, len(df), size))
+
+
+class TestStreamingAggregator:
+    """测试 StreamingAggregator 与 aggregate_chunks"""
+
+    def setup_method(self):
+        rng = np.random.default_rng(0)
+        n = 5000
+        self.df = pd.DataFrame({
+            'city': rng.choice(['北京', '上海', '广州', '深圳'], n),
+            'level': rng.integers(0, 3, n),
+            'amount': rng.normal(1e6, 5, n),
+            'qty': rng.integers(1, 10, n).astype(float)
+        })
+        self.df.loc[::7, 'qty'] = np.nan
+
+    def test_matches_aggregate_data(self):
+        """测试分块聚合 - 与整表groupby结果一致"""
+        aggregations = {'amount': ['sum', 'mean', 'std', 'var'], 'qty': ['count', 'min', 'max']}
+        expected = TableUtils.aggregate_data(self.df, ['city', 'level'], aggregations)
+        result = TableUtils.aggregate_data(_chunks(self.df, 777), ['city', 'level'], aggregations)
+        pd.testing.assert_frame_equal(result, expected, check_dtype=False)
+
+    def test_string_aggregations(self):
+        """测试聚合函数为字符串时列名为单层"""
+        expected = TableUtils.aggregate_data(self.df, 'city', {'amount': 'mean', 'qty': 'sum'})
+        result = aggregate_chunks(_chunks(self.df, 1000), 'city', {'amount': 'mean', 'qty': 'sum'})
+        assert list(result.columns) == ['city', 'amount', 'qty']
+        pd.testing.assert_frame_equal(result, expected, check_dtype=False)
+
+    def test_spill_to_disk(self):
+        """测试分组数超过max_groups时溢写到磁盘"""
+        df = pd.DataFrame({'key': np.arange(6000) % 2500, 'x': np.arange(6000, dtype=float)})
+        expected = TableUtils.aggregate_data(df, 'key', {'x': ['sum', 'std']})
+
+        aggregator = StreamingAggregator('key', {'x': ['sum', 'std']}, max_groups=1000)
+        for chunk in _chunks(df, 500):
+            aggregator.update(chunk)
+        assert aggregator.spills > 0
+        result = aggregator.result()
+        pd.testing.assert_frame_equal(result, expected, check_dtype=False)
+        assert aggregator.spills == 0
+
+    def test_merge_states(self):
+        """测试中间状态合并 - 平方差和按并行公式合并"""
+        values = np.array([1.0, 2.0, 4.0, 8.0, 16.0])
+        parts = [values[:2], values[2:]]
+        states = pd.DataFrame(
+            {('x', 'count'): [len(p) for p in parts],
+             ('x', 'sum'): [p.sum() for p in parts],
+             ('x', 'm2'): [((p - p.mean()) ** 2).sum() for p in parts]},
+            index=pd.Index(['a', 'a'], name='k')
+        )
+        merged = merge_states(states, ['k'])
+        assert merged.loc['a', ('x', 'count')] == 5
+        assert merged.loc['a', ('x', 'm2')] == pytest.approx(((values - values.mean()) ** 2).sum())
+
+    def test_unsupported_function(self):
+        """测试不支持的聚合函数"""
+        with pytest.raises(ValueError):
+            StreamingAggregator('city', {'amount': 'median'})
+
+    def test_empty_input(self):
+        """测试空输入"""
+        result = aggregate_chunks(iter([]), 'city', {'amount': 'sum'})
+        assert list(result.columns) == ['city', 'amount']
+        assert result.empty
+
+
+class TestParallelAggregate:
+    """测试 aggregate_parallel 多进程并行聚合"""
+
+    def setup_method(self):
+        rng = np.random.default_rng(1)
+        n = 3000
+        self.df = pd.DataFrame({
+            'city': rng.choice(['北京', '上海', None, '深圳'], n),
+            'level': rng.choice([0.0, -0.0, 1.0, np.nan], n),
+            'amount': rng.normal(1e6, 5, n),
+            'qty': rng.integers(1, 10, n)
+        })
+
+    @pytest.fixture(autouse=True)
+    def _small_input(self, monkeypatch):
+        """测试数据较小，关闭按行数退回单进程的阈值"""
+        monkeypatch.setattr(table_aggregate, 'PARALLEL_MIN_ROWS', 0)
+
+    def test_matches_serial(self):
+        """测试并行结果与单进程逐位一致 - 单/多分组键、列表与字符串聚合函数"""
+        cases = [
+            ('city', {'amount': ['sum', 'mean', 'std'], 'qty': 'max'}),
+            (['city', 'level'], {'amount': ['sum', 'count'], 'qty': ['min', 'mean']}),
+            ('level', {'amount': 'sum', 'qty': 'sum'}),
+        ]
+        for group_by, aggregations in cases:
+            expected = self.df.groupby(group_by).agg(aggregations).reset_index()
+            result = TableUtils.aggregate_data(self.df, group_by, aggregations, n_jobs=3)
+            pd.testing.assert_frame_equal(result, expected, check_exact=True)
+
+    def test_concurrent_callers_with_different_jobs(self):
+        """测试多个线程以不同进程数同时聚合，互不关闭对方的进程池"""
+        from concurrent.futures import ThreadPoolExecutor
+
+        expected = self.df.groupby('city').agg({'amount': 'sum'}).reset_index()
+        with ThreadPoolExecutor(4) as callers:
+            results = list(callers.map(
+                lambda n_jobs: TableUtils.aggregate_data(self.df, 'city', {'amount': 'sum'}, n_jobs=n_jobs),
+                [2, 3, 2, 3]
+            ))
+        for result in results:
+            pd.testing.assert_frame_equal(result, expected)
+        assert table_aggregate._get_executor(2) is table_aggregate._get_executor(2)
+
+    def test_fallback_to_serial(self):
+        """测试不满足并行条件时退回单进程"""
+        # 聚合列不是数值类型
+        expected = self.df.groupby('level').agg({'city': 'count'}).reset_index()
+        result = aggregate_parallel(self.df, 'level', {'city': 'count'}, n_jobs=2)
+        pd.testing.assert_frame_equal(result, expected)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""
+@Time : 2026/10/18 21:00
+@Email : Lvan826199@163.com
+@公众号 : 梦无矶测开实录
+@File : test_table_dtypes.py
+"""
+__author__ = "梦无矶小仔"
+# tests/test_table_dtypes.py
+"""
+列类型压缩模块的单元测试
+"""
+import numpy as np
+import pandas as pd
+import pytest
+from mwj_tools.table_dtypes import infer_dtypes, apply_dtypes, _arrow_nbytes
+from mwj_tools.table_utils import TableUtils
+
+
+class TestOptimizeDtypes:
+    """测试 optimize_dtypes 与 read_table / iter_table 的类型压缩选项"""
+
+    def setup_method(self):
+        rng = np.random.default_rng(0)
+        n = 4000
+        self.df = pd.DataFrame({
+            'id': np.arange(n) + 70_000,
+            'qty': rng.integers(0, 200, n),
+            'delta': rng.integers(-100, 100, n),
+            'price': rng.integers(0, 1000, n) / 4,
+            'ratio': rng.random(n),
+            'city': rng.choice(['北京', '上海', '广州'], n),
+            'order_no': [f'NO{i:010d}' for i in rng.permutation(n)],
+            'mixed': [1, 'a'] * (n // 2),
+            'flag': rng.random(n) > 0.5
+        })
+
+    def test_infer_dtypes(self):
+        """测试各列选出的类型"""
+        dtypes = infer_dtypes(self.df, strings=False)
+        assert dtypes == {'id': 'int32', 'qty': 'int16', 'delta': 'int8', 'price': 'float32', 'city': 'category'}
+        pytest.importorskip('pyarrow')
+        assert infer_dtypes(self.df)['order_no'] == 'string[pyarrow]'
+
+    def test_arrow_size_estimate(self):
+        """测试pyarrow字符串的占用按抽样估算，与实际构造的Arrow数组相差不大"""
+        pa = pytest.importorskip('pyarrow')
+        series = self.df['order_no'].where(self.df['flag'])
+        expected = pa.array(series, type=pa.large_string(), from_pandas=True).nbytes
+        assert _arrow_nbytes(series) == pytest.approx(expected, rel=0.05)
+
+    def test_lossless_and_report(self):
+        """测试压缩后取值不变，报告中的节省字节数与实际占用一致"""
+        result, report = TableUtils.optimize_dtypes(self.df, strings=False)
+        pd.testing.assert_frame_equal(result.astype(self.df.dtypes.to_dict()), self.df)
+        assert report.dtypes == infer_dtypes(self.df, strings=False)
+        saved = self.df.memory_usage(deep=True, index=False) - result.memory_usage(deep=True, index=False)
+        pd.testing.assert_series_equal(report.table['saved_bytes'], saved, check_names=False)
+        assert report.saved_bytes == saved.sum()
+        assert report.ratio > 1.5
+        assert report.table.loc['mixed', 'after_dtype'] == 'object'
+
+    def test_arithmetic_on_optimized_columns(self):
+        """测试压缩后的整数列做减法、乘法不会回绕，只有原本是无符号的列保持无符号"""
+        df = pd.DataFrame({'qty': np.array([0, 199, 5]), 'count': np.array([0, 7, 255], dtype=np.uint64)})
+        result, _ = TableUtils.optimize_dtypes(df)
+        assert result['qty'].dtype.kind == 'i'
+        assert (result['qty'] - 1).tolist() == [-1, 198, 4]
+        assert (result['qty'] * 2).max() == 398
+        assert result['count'].dtype == np.uint8
+        # 旧的类型文件中有符号列对应的无符号类型也不再套用
+        assert apply_dtypes(df, {'qty': 'uint8'})['qty'].dtype == np.int16
+
+    def test_apply_never_truncates(self):
+        """测试套用已保存的类型时，超出范围的整数换用更宽类型，不能无损转换的浮点保持原类型"""
+        df = pd.DataFrame({'qty': [1, 300, -5], 'price': [0.1, 0.5, 1.0], 'id': [1.0, np.nan, 3.0]})
+        result = apply_dtypes(df, {'qty': 'uint8', 'price': 'float32', 'id': 'int32', 'missing': 'int8'})
+        assert result['qty'].dtype == np.int16
+        assert result['qty'].tolist() == [1, 300, -5]
+        assert result['price'].dtype == np.float64
+        assert result['id'].dtype == np.float64
+
+    def test_saved_dtypes_on_read(self, tmp_path):
+        """测试保存的类型可用于后续读取，整表与分块读取结果一致"""
+        path = tmp_path / 'orders.csv'
+        self.df.to_csv(path, index=False)
+        expected, report = TableUtils.optimize_dtypes(TableUtils.read_table(str(path)))
+        report.save(str(tmp_path / 'orders.json'))
+
+        result = TableUtils.read_table(str(path), dtypes=str(tmp_path / 'orders.json'))
+        pd.testing.assert_frame_equal(result, expected)
+        pd.testing.assert_frame_equal(TableUtils.read_table(str(path), optimize=True), expected)
+
+        chunks = list(TableUtils.iter_table(str(path), chunksize=1500, dtypes=report.dtypes))
+        assert all(chunk['qty'].dtype == np.int16 for chunk in chunks)
+        combined = pd.concat(chunks)
+        pd.testing.assert_frame_equal(combined.astype(expected.dtypes.to_dict()), expected)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+"""
+@Time : 2026/10/17 23:40
+@Email : Lvan826199@163.com
+@公众号 : 梦无矶测开实录
+@File : test_table_index.py
+"""
+__author__ = "梦无矶小仔"
+# tests/test_table_index.py
+"""
+列索引模块的单元测试
+"""
+import numpy as np
+import pandas as pd
+import pytest
+from mwj_tools.table_index import HashIndex, SortedIndex
+from mwj_tools.table_utils import TableUtils
+
+
+class TestTableIndex:
+    """测试列索引"""
+
+    def setup_method(self):
+        rng = np.random.default_rng(0)
+        n = 2000
+        self.df = pd.DataFrame({
+            'uid': rng.integers(0, 50, n),
+            'amount': np.where(rng.random(n) < 0.05, np.nan, rng.random(n) * 100),
+            'city': rng.choice(['Beijing', 'Shanghai', None], n),
+            'ts': pd.date_range('2025-01-01', periods=n, freq='h')
+        })
+        self.queries = [
+            {'uid': 7},
+            {'uid': ('in', [1, 2, 99])},
+            {'uid': ('not in', [1, 2])},
+            {'amount': ('>', 98)},
+            {'amount': ('<=', 1.5), 'city': 'Beijing'},
+            {'city': ('in', [None])},
+            {'ts': ('<', '2025-01-02'), 'uid': ('>=', 40)},
+        ]
+
+    def test_create_index_auto(self):
+        """测试auto模式按列类型选择索引"""
+        created = TableUtils.create_index(self.df, ['uid', 'amount', 'city'])
+        assert [(type(i), i.column) for i in created] == [
+            (HashIndex, 'uid'), (SortedIndex, 'uid'), (SortedIndex, 'amount'), (HashIndex, 'city')
+        ]
+        info = TableUtils.index_info(self.df)
+        assert len(info) == 4 and all(item['nbytes'] > 0 for item in info)
+
+    def test_indexed_filter_matches_scan(self):
+        """测试使用索引的筛选结果与全表扫描一致"""
+        expected = [TableUtils.filter_data(self.df, query) for query in self.queries]
+        TableUtils.create_index(self.df, ['uid', 'amount', 'city', 'ts'])
+        for query, result in zip(self.queries, expected):
+            pd.testing.assert_frame_equal(TableUtils.filter_data(self.df, query), result)
+
+    def test_index_lookup(self):
+        """测试索引直接查询"""
+        df = pd.DataFrame({'x': [3, 1, 2, 1, np.nan]})
+        hash_index, sorted_index = HashIndex(df, 'x'), SortedIndex(df, 'x')
+        assert hash_index.lookup('==', 1).tolist() == [1, 3]
+        assert hash_index.count('not in', [1]) == 3
+        assert sorted_index.lookup('>=', 2).tolist() == [0, 2]
+        assert sorted_index.lookup('<', 2).tolist() == [1, 3]
+
+    def test_bool_targets_on_int_column(self):
+        """测试整数列以布尔值查询时结果与扫描、isin一致"""
+        df = pd.DataFrame({'x': [1, 0, 2, 1], 'flag': [True, False, True, False]})
+        queries = [{'x': ('in', [True])}, {'x': True}, {'x': ('not in', [False, 2])}, {'flag': ('in', [1])}]
+        expected = [TableUtils.filter_data(df, query) for query in queries]
+        assert len(expected[0]) == df['x'].isin([True]).sum() == 2
+        TableUtils.create_index(df, ['x', 'flag'], kind='hash')
+        for query, result in zip(queries, expected):
+            pd.testing.assert_frame_equal(TableUtils.filter_data(df, query), result)
+
+    def test_ngram_index(self):
+        """测试n-gram索引 - 子串查询结果与全表扫描一致"""
+        urls = np.array([f'https://site{i % 7}.com/item/{i}?q={i % 3}' for i in range(500)], dtype=object)
+        df = pd.DataFrame({'url': urls[np.random.default_rng(0).integers(0, 500, 3000)]})
+        queries = [('contains_literal', 'item/12'), ('contains_literal', '?q=1'), ('contains', 'site3'),
+                   ('contains', '/'), ('contains', r'item/\d?7'), ('contains_literal', 'missing')]
+        expected = [TableUtils.filter_data(df, {'url': query}) for query in queries]
+
+        index, = TableUtils.create_index(df, 'url', kind='ngram')
+        assert index.count('contains', r'item/\d?7') is None
+        assert index.count('contains_literal', 'item/12') == len(expected[0])
+        for query, result in zip(queries, expected):
+            pd.testing.assert_frame_equal(TableUtils.filter_data(df, {'url': query}), result)
+
+    @pytest.mark.parametrize('dtype', ['object', 'category', 'string'])
+    def test_ngram_index_with_missing(self, dtype):
+        """测试含None与NaN的列，n-gram索引与扫描的结果一致"""
+        values = np.array(['nano', None, 'banana', np.nan, 'None of it', None], dtype=object)
+        df = pd.DataFrame({'text': values[np.random.default_rng(0).integers(0, 6, 300)]}).astype({'text': dtype})
+        queries = [('contains_literal', 'nan'), ('contains_literal', 'None'), ('contains', 'an'),
+                   ('contains_literal', 'na'), ('contains_literal', '<NA>')]
+        expected = [TableUtils.filter_data(df, {'text': query}) for query in queries]
+        index, = TableUtils.create_index(df, 'text', kind='ngram')
+        for query, result in zip(queries, expected):
+            assert index.count(*query) == len(result)
+            pd.testing.assert_frame_equal(TableUtils.filter_data(df, {'text': query}), result)
+
+    def test_invalidated_on_mutation(self):
+        """测试修改DataFrame后索引失效"""
+        TableUtils.create_index(self.df, 'uid', kind='hash')
+        self.df.loc[0, 'uid'] = 12345
+        assert TableUtils.index_info(self.df) == []
+        assert len(TableUtils.filter_data(self.df, {'uid': 12345})) == 1
+
+    @pytest.mark.filterwarnings('ignore::FutureWarning', 'ignore::pandas.errors.SettingWithCopyWarning')
+    def test_rebuild_after_in_place_write(self):
+        """测试原地写入列缓冲区（不经过pandas）后，重新create_index得到正确结果"""
+        TableUtils.create_index(self.df, ['uid', 'amount'])
+        self.df['uid'].to_numpy()[0] = 12345
+        self.df['amount'].to_numpy()[777] = 1000.0
+        TableUtils.create_index(self.df, ['uid', 'amount'])
+        assert len(TableUtils.filter_data(self.df, {'uid': 12345})) == (self.df['uid'] == 12345).sum() == 1
+        assert len(TableUtils.filter_data(self.df, {'amount': ('>', 999)})) == 1
+
+    def test_drop_index(self):
+        """测试删除索引"""
+        TableUtils.create_index(self.df, ['uid', 'city'], kind='hash')
+        TableUtils.drop_index(self.df, 'uid')
+        assert [item['column'] for item in TableUtils.index_info(self.df)] == ['city']
+
+    def test_invalid_kind(self):
+        """测试非法参数"""
+        with pytest.raises(ValueError):
+            TableUtils.create_index(self.df, 'uid', kind='btree')
+        with pytest.raises(ValueError):
+            TableUtils.create_index(self.df, 'city', kind='sorted')
+        with pytest.raises(KeyError):
+            TableUtils.create_index(self.df, 'missing')
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+"""
+@Time : 2026/10/18 11:05
+@Email : Lvan826199@163.com
+@公众号 : 梦无矶测开实录
+@File : test_table_join.py
+"""
+__author__ = "梦无矶小仔"
+# tests/test_table_join.py
+"""
+分区哈希连接模块的单元测试
+"""
+import numpy as np
+import pandas as pd
+import pytest
+from mwj_tools.table_join import grace_hash_join, PreparedJoin
+from mwj_tools.table_utils import TableUtils
+
+
+def _sorted(df):
+    """分区连接的行顺序与pd.merge不同，比较前按所有列排序"""
+    return df.sort_values(list(df.columns)).reset_index(drop=True)
+
+
+class TestGraceHashJoin:
+    """测试 grace_hash_join 与 TableUtils.merge_tables / iter_merge"""
+
+    def setup_method(self):
+        rng = np.random.default_rng(0)
+        n = 4000
+        self.left = pd.DataFrame({
+            'id': rng.integers(0, 600, n),
+            'city': rng.choice(['北京', '上海', None], n),
+            'amount': rng.random(n)
+        })
+        # 右表的连接键为float且含NaN与-0.0，与左表的int键相等时也要能连上
+        self.right = pd.DataFrame({
+            'id': rng.integers(300, 900, n // 2).astype(float),
+            'city': rng.choice(['北京', '上海', '广州'], n // 2),
+            'score': rng.integers(0, 100, n // 2)
+        })
+        self.right.loc[::40, 'id'] = np.nan
+        self.right.loc[::41, 'id'] = -0.0
+        self.left.loc[::43, 'id'] = 0
+
+    @pytest.mark.parametrize('how', ['inner', 'left', 'right', 'outer'])
+    def test_matches_pandas(self, how):
+        """测试四种连接方式 - 与pd.merge结果相同（忽略行顺序）"""
+        for on in ('id', ['id', 'city']):
+            expected = pd.merge(self.left, self.right, on=on, how=how)
+            result = TableUtils.merge_tables(self.left, self.right, on=on, how=how, memory_budget=150_000)
+            assert list(result.columns) == list(expected.columns)
+            pd.testing.assert_frame_equal(_sorted(result), _sorted(expected), check_dtype=False)
+
+    def test_recursive_partition(self):
+        """测试桶超出预算时再分区"""
+        expected = pd.merge(self.left, self.right, on='id', how='outer')
+        parts = list(grace_hash_join(self.left, self.right, 'id', 'outer', memory_budget=50_000, partitions=2))
+        assert len(parts) > 2
+        pd.testing.assert_frame_equal(_sorted(pd.concat(parts, ignore_index=True)), _sorted(expected),
+                                      check_dtype=False)
+
+    def test_chunk_iterators(self):
+        """测试两侧均为数据块迭代器"""
+        left_chunks = (self.left.iloc[start:start + 1000] for start in range(0, len(self.left), 1000))
+        right_chunks = (self.right.iloc[start:start + 700] for start in range(0, len(self.right), 700))
+        expected = pd.merge(self.left, self.right, on='id', how='left')
+        result = pd.concat(TableUtils.iter_merge(left_chunks, right_chunks, on='id', how='left'),
+                           ignore_index=True)
+        pd.testing.assert_frame_equal(_sorted(result), _sorted(expected), check_dtype=False)
+
+    def test_hot_key(self):
+        """测试单个热点键无法再分区时直接连接"""
+        left = pd.DataFrame({'id': [1] * 3000, 'a': range(3000)})
+        right = pd.DataFrame({'id': [1, 1], 'b': [10, 20]})
+        result = TableUtils.merge_tables(left, right, on='id', memory_budget=1000)
+        assert len(result) == 6000
+
+    def test_empty_result(self):
+        """测试没有匹配行时返回列名正确的空表"""
+        result = TableUtils.merge_tables(self.left[self.left['id'] < 0], self.right, on='id', memory_budget=10_000)
+        assert result.empty
+        assert list(result.columns) == list(pd.merge(self.left, self.right, on='id').columns)
+
+    def test_invalid_how(self):
+        """测试不支持的连接方式"""
+        with pytest.raises(ValueError):
+            next(grace_hash_join(self.left, self.right, 'id', how='cross'))
+
+
+class TestPreparedJoin:
+    """测试 PreparedJoin 与 TableUtils.prepare_join"""
+
+    def setup_method(self):
+        rng = np.random.default_rng(1)
+        self.users = pd.DataFrame({
+            'id': np.arange(500).astype(float),
+            'region': rng.choice(['华北', '华东'], 500),
+            'level': rng.integers(0, 5, 500)
+        })
+        self.users.loc[7, 'id'] = np.nan
+        self.tags = pd.DataFrame({
+            'id': rng.integers(0, 300, 800),
+            'region': rng.choice(['华北', '华东'], 800),
+            'tag': rng.choice(['a', 'b', 'c'], 800)
+        })
+        self.orders = pd.DataFrame({
+            'id': rng.integers(-20, 600, 3000).astype(float),
+            'region': rng.choice(['华北', '华东', None], 3000),
+            'amount': rng.random(3000)
+        }, index=np.arange(3000) * 2)
+        self.orders.loc[::50, 'id'] = np.nan
+
+    @pytest.mark.parametrize('how', ['inner', 'left'])
+    def test_matches_pandas(self, how):
+        """测试多对一与多对多、单列与多列连接键 - 与pd.merge完全一致（含行顺序与重名列后缀）"""
+        for right in (self.users, self.tags):
+            for on in ('id', ['id', 'region']):
+                prepared = PreparedJoin(right, on)
+                assert prepared.unique == (right is self.users)
+                for batch in (self.orders, self.orders.iloc[:0], self.orders.iloc[100:400]):
+                    expected = pd.merge(batch, right, on=on, how=how)
+                    pd.testing.assert_frame_equal(prepared.merge(batch, how=how), expected)
+
+    def test_merge_tables(self):
+        """测试merge_tables接受预建索引"""
+        prepared = TableUtils.prepare_join(self.users, 'id')
+        result = TableUtils.merge_tables(self.orders, prepared, on='id', how='left')
+        pd.testing.assert_frame_equal(result, pd.merge(self.orders, self.users, on='id', how='left'))
+        with pytest.raises(ValueError):
+            TableUtils.merge_tables(self.orders, prepared, on='region')
+        with pytest.raises(ValueError):
+            TableUtils.merge_tables(self.orders, prepared, on='id', how='outer')
+
+    def test_incompatible_key_dtypes(self):
+        """测试连接键类型不兼容时与pd.merge一样抛出ValueError，而不是静默地匹配不到任何行"""
+        prepared = TableUtils.prepare_join(self.users, 'id')
+        batch = self.orders.astype({'id': str})
+        with pytest.raises(ValueError) as expected:
+            pd.merge(batch, self.users, on='id')
+        with pytest.raises(ValueError, match='trying to merge on') as actual:
+            TableUtils.merge_tables(batch, prepared, on='id')
+        assert str(actual.value) == str(expected.value)
+        # 兼容的类型（整数与浮点数）照常连接
+        ints = self.orders.dropna(subset=['id']).astype({'id': np.int64})
+        pd.testing.assert_frame_equal(prepared.merge(ints), pd.merge(ints, self.users, on='id'))
+
+    def test_rebuild_after_change(self):
+        """测试右表连接键修改后索引自动重建，非连接键列的修改直接生效"""
+        prepared = PreparedJoin(self.users, 'id')
+        self.users.loc[3, 'id'] = 1000.0
+        self.users.loc[4, 'level'] = 99
+        orders = pd.DataFrame({'id': [3.0, 4.0, 1000.0]})
+        result = prepared.merge(orders, how='left')
+        assert prepared.rebuilds == 1
+        assert result['level'].isna().tolist() == [True, False, False]
+        assert result['level'].iloc[1] == 99
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
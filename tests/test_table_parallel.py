@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""
+@Time : 2026/10/18 17:10
+@Email : Lvan826199@163.com
+@公众号 : 梦无矶测开实录
+@File : test_table_parallel.py
+"""
+__author__ = "梦无矶小仔"
+# tests/test_table_parallel.py
+"""
+按列并行执行模块的单元测试
+"""
+import pickle
+
+import numpy as np
+import pandas as pd
+import pytest
+from mwj_tools import table_parallel
+from mwj_tools.table_parallel import map_columns, resolve_jobs
+from mwj_tools.table_profile import TableProfile
+from mwj_tools.table_utils import TableUtils
+
+
+class TestMapColumns:
+    """测试 map_columns"""
+
+    @pytest.fixture(autouse=True)
+    def _small_input(self, monkeypatch):
+        """测试数据较小，关闭按行数退回逐列计算的阈值"""
+        monkeypatch.setattr(table_parallel, 'PARALLEL_MIN_ROWS', 0)
+
+    def test_keeps_order(self):
+        """测试结果按输入顺序返回"""
+        assert map_columns(lambda x: x * x, range(50), n_jobs=4, rows=100) == [x * x for x in range(50)]
+
+    @pytest.mark.parametrize('no_gil', [False, True])
+    def test_object_columns_under_gil(self, monkeypatch, no_gil):
+        """测试有GIL时object列在调用线程中计算，自由线程时全部交给线程池"""
+        import threading
+
+        monkeypatch.setattr(table_parallel, 'free_threaded', lambda: no_gil)
+        items = [pd.Series(['a', 'b']), (pd.Series([1.0, 2.0]), True), (pd.Series(['c']), False), pd.Series([3])]
+        caller = threading.current_thread().name
+        names = map_columns(lambda item: threading.current_thread().name, items, n_jobs=2)
+        on_caller = [name == caller for name in names]
+        assert on_caller == ([False] * 4 if no_gil else [True, False, True, False])
+
+    def test_concurrent_callers_with_different_jobs(self):
+        """测试多个线程以不同线程数同时调用，互不关闭对方的线程池"""
+        from concurrent.futures import ThreadPoolExecutor
+
+        def call(n_jobs):
+            return map_columns(lambda x: x + 1, range(20), n_jobs=n_jobs)
+
+        with ThreadPoolExecutor(8) as callers:
+            results = list(callers.map(call, [2, 3, 4, 5] * 25))
+        assert all(result == list(range(1, 21)) for result in results)
+        assert table_parallel._get_pool(3) is table_parallel._get_pool(3)
+
+    def test_resolve_jobs(self, monkeypatch):
+        """测试n_jobs换算 - 负数按CPU核数计算，结果至少为1"""
+        monkeypatch.setattr(table_parallel.os, 'cpu_count', lambda: 8)
+        assert [resolve_jobs(n) for n in (3, 0, -1, -2, -20)] == [3, 1, 8, 7, 1]
+
+    def test_raises_column_error(self):
+        """测试某列出错时抛出该列的异常"""
+        def fail(x):
+            if x == 3:
+                raise KeyError(x)
+            return x
+
+        with pytest.raises(KeyError):
+            map_columns(fail, range(6), n_jobs=2)
+
+
+class TestParallelTableUtils:
+    """测试 describe_data / clean_data / compute_fill_values / profile_data 并行结果与逐列计算相同"""
+
+    @pytest.fixture(autouse=True)
+    def _small_input(self, monkeypatch):
+        monkeypatch.setattr(table_parallel, 'PARALLEL_MIN_ROWS', 0)
+
+    def setup_method(self):
+        rng = np.random.default_rng(0)
+        n = 2000
+        data = {}
+        for i in range(12):
+            data[f'x{i}'] = rng.normal(i, 1, n)
+            data[f's{i}'] = rng.choice(['a', 'b', 'c', None], n)
+        data['level'] = pd.Categorical(rng.choice(['A', 'B'], n))
+        self.df = pd.DataFrame(data)
+        self.df.loc[::7, [f'x{i}' for i in range(0, 12, 2)]] = np.nan
+
+    def test_describe_data(self):
+        """测试精确统计与流式概要"""
+        assert TableUtils.describe_data(self.df, n_jobs=4) == TableUtils.describe_data(self.df)
+        # KLL压缩是随机的，固定种子后结果可逐位比较
+        serial = TableProfile(seed=0).update(self.df)
+        parallel = TableProfile(seed=0).update(self.df, n_jobs=4)
+        assert pickle.dumps(parallel.result()) == pickle.dumps(serial.result())
+
+    def test_clean_data(self):
+        """测试缺失值填充与填充值计算"""
+        expected = TableUtils.clean_data(self.df, strategy='fill')
+        pd.testing.assert_frame_equal(TableUtils.clean_data(self.df, strategy='fill', n_jobs=4), expected)
+        chunks = [self.df.iloc[:700], self.df.iloc[700:]]
+        assert TableUtils.compute_fill_values(chunks, n_jobs=-1) == TableUtils.compute_fill_values(chunks)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
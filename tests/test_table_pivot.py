@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""
+@Time : 2026/10/18 19:20
+@Email : Lvan826199@163.com
+@公众号 : 梦无矶测开实录
+@File : test_table_pivot.py
+"""
+__author__ = "梦无矶小仔"
+# tests/test_table_pivot.py
+"""
+透视表模块的单元测试
+"""
+import numpy as np
+import pandas as pd
+import pytest
+from mwj_tools.table_pivot import SparsePivot
+from mwj_tools.table_utils import TableUtils
+
+
+class TestPivotTable:
+    """测试 TableUtils.pivot_table 的多聚合函数与稀疏透视"""
+
+    def setup_method(self):
+        rng = np.random.default_rng(0)
+        n = 3000
+        self.df = pd.DataFrame({
+            'user': rng.choice(['u1', 'u2', 'u3'], n),
+            'sku': rng.integers(0, 5, n),
+            'channel': rng.choice(['app', 'web'], n),
+            'amount': rng.normal(size=n),
+            'qty': rng.integers(0, 100, n)
+        })
+        self.df.loc[::7, 'amount'] = np.nan
+        # u3买sku 3的金额全部缺失，pd.pivot_table会丢弃全为NaN的行和列
+        self.df.loc[(self.df['user'] == 'u3') & (self.df['sku'] == 3), 'amount'] = np.nan
+
+    @pytest.mark.parametrize('aggfunc', [['sum', 'mean'], ['count', 'std', 'max'], ['median']])
+    def test_multiple_aggfuncs(self, aggfunc):
+        """测试多个聚合函数一次分组 - 与pd.pivot_table结果相同"""
+        cases = [
+            ('user', 'sku', 'amount'),
+            ('user', ['sku', 'channel'], ['amount', 'qty']),
+            (['user', 'channel'], 'sku', 'qty'),
+            ('user', None, ['qty', 'amount']),
+        ]
+        for index, columns, values in cases:
+            expected = pd.pivot_table(self.df, index=index, columns=columns, values=values, aggfunc=aggfunc)
+            result = TableUtils.pivot_table(self.df, index, columns, values, aggfunc)
+            pd.testing.assert_frame_equal(result, expected)
+
+    @pytest.mark.parametrize('aggfunc', ['mean', ['sum', 'count']])
+    def test_sparse_to_dense(self, aggfunc):
+        """测试稀疏透视表还原为稠密透视表与pd.pivot_table相同"""
+        for index, columns, values in (('user', 'sku', 'amount'), (['user', 'channel'], 'sku', ['amount', 'qty'])):
+            pivot = TableUtils.pivot_table(self.df, index, columns, values, aggfunc, sparse=True)
+            assert isinstance(pivot, SparsePivot)
+            expected = pd.pivot_table(self.df, index=index, columns=columns, values=values, aggfunc=aggfunc)
+            pd.testing.assert_frame_equal(pivot.to_dense(), expected)
+
+    def test_sparse_layout(self):
+        """测试CSR结构只保存出现过的组合"""
+        df = pd.DataFrame({
+            'user': ['b', 'a', 'b', 'c', 'a', 'b'],
+            'sku': [30, 10, 10, 20, 10, 30],
+            'amount': [1.0, 2.0, 3.0, 4.0, 5.0, 6.0]
+        })
+        pivot = TableUtils.pivot_table(df, 'user', 'sku', 'amount', ['sum', 'count'], sparse=True)
+        assert pivot.shape == (3, 3)
+        assert pivot.nnz == 4
+        assert pivot.index.tolist() == ['a', 'b', 'c']
+        assert pivot.columns.tolist() == [10, 20, 30]
+        assert pivot.indptr.tolist() == [0, 1, 3, 4]
+        assert pivot.indices.tolist() == [0, 0, 2, 1]
+        assert pivot.data[('amount', 'sum')].tolist() == [7.0, 3.0, 7.0, 4.0]
+
+        row = pivot.row('b')
+        assert row.index.tolist() == [10, 30]
+        assert row[('amount', 'count')].tolist() == [1, 2]
+        rows, cols, data = pivot.to_coo()
+        assert rows.tolist() == [0, 1, 1, 2]
+        assert len(data) == pivot.nnz
+
+    def test_sparse_requires_columns(self):
+        """测试稀疏透视表必须指定列索引"""
+        with pytest.raises(ValueError):
+            TableUtils.pivot_table(self.df, 'user', None, 'amount', sparse=True)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+"""
+@Time : 2026/10/18 15:30
+@Email : Lvan826199@163.com
+@公众号 : 梦无矶测开实录
+@File : test_table_profile.py
+"""
+__author__ = "梦无矶小仔"
+# tests/test_table_profile.py
+"""
+流式数据概要模块的单元测试
+"""
+import pickle
+
+import numpy as np
+import pandas as pd
+import pytest
+from mwj_tools.table_profile import KLLSketch, HyperLogLog, MisraGries, TableProfile
+from mwj_tools.table_utils import TableUtils
+
+
+def _chunks(df, size):
+    return (df.iloc[start:start + size] for start in range(0, len(df), size))
+
+
+class TestSketches:
+    """测试各概要结构的误差界与合并"""
+
+    def test_kll_quantile(self):
+        """测试KLL分位数的秩误差不超过误差界，合并两份概要等价于整体概要"""
+        rng = np.random.default_rng(0)
+        values = rng.normal(0, 1, 200_000)
+        left, right = KLLSketch(seed=1), KLLSketch(seed=2)
+        for part in np.array_split(values[:120_000], 7):
+            left.update(part)
+        right.update(values[120_000:])
+        left.merge(pickle.loads(pickle.dumps(right)))
+        assert left.n == len(values)
+        assert sum(len(level) for level in left.levels) < 1000
+        ordered = np.sort(values)
+        for q in (0.1, 0.5, 0.9):
+            rank = np.searchsorted(ordered, left.quantile(q)) / len(values)
+            assert abs(rank - q) <= left.rank_error
+
+    def test_kll_exact_when_small(self):
+        """测试数据量未超出容量时分位数精确"""
+        sketch = KLLSketch()
+        sketch.update(np.array([5.0, 1.0, 3.0, 2.0]))
+        assert sketch.exact and sketch.rank_error == 0
+        assert sketch.quantile(0.5) == 2.5
+
+    def test_hyperloglog(self):
+        """测试HyperLogLog基数估计在3倍标准误差内，合并后重复值不重复计数"""
+        values = pd.Series(np.arange(100_000).astype(str))
+        hashes = pd.util.hash_pandas_object(values, index=False).to_numpy()
+        left, right = HyperLogLog(), HyperLogLog()
+        left.update(hashes[:60_000])
+        right.update(hashes[40_000:])
+        left.merge(right)
+        assert abs(left.estimate() / len(values) - 1) <= 3 * left.relative_error
+        with pytest.raises(ValueError):
+            left.merge(HyperLogLog(12))
+
+    def test_misra_gries(self):
+        """测试Misra-Gries保留频繁项且计数误差不超过error"""
+        rng = np.random.default_rng(0)
+        values = pd.Series(np.concatenate([np.full(3000, 'hot'), rng.integers(0, 5000, 20_000).astype(str)]))
+        values = values.sample(frac=1, random_state=0)
+        truth = values.value_counts()
+        left, right = MisraGries(16), MisraGries(16)
+        left.update(values.iloc[:10_000])
+        right.update(values.iloc[10_000:])
+        left.merge(right)
+        value, count = left.top()
+        assert value == 'hot'
+        assert count <= truth['hot'] <= count + left.error
+        assert left.error <= len(values) / 17
+
+
+class TestTableProfile:
+    """测试 TableProfile 与 TableUtils.describe_data / profile_data"""
+
+    def setup_method(self):
+        rng = np.random.default_rng(0)
+        n = 3000
+        self.df = pd.DataFrame({
+            'amount': rng.normal(100, 10, n),
+            'qty': rng.integers(1, 10, n),
+            'city': rng.choice(['北京', '上海', '广州', None], n),
+            'level': pd.Categorical(rng.choice(['A', 'B'], n), categories=['A', 'B', 'C']),
+            'flag': rng.random(n) > 0.5
+        })
+        self.df.loc[::9, 'amount'] = np.nan
+
+    def test_small_data_is_exact(self):
+        """测试数据量较小时分块概要与精确统计一致，误差界为0"""
+        df = self.df.iloc[:180]
+        expected = TableUtils.describe_data(df)
+        result = TableUtils.describe_data(_chunks(df, 50))
+        for key in ('shape', 'columns', 'dtypes', 'missing_values', 'categorical_stats'):
+            assert result[key] == expected[key]
+        for col, stats in expected['numeric_stats'].items():
+            assert result['numeric_stats'][col] == pytest.approx(stats)
+        assert result['error_bounds']['amount'] == {'median_rank_error': 0.0}
+        assert result['error_bounds']['city'] == {
+            'unique_count_relative_error': 0.0, 'top_count_max_error': 0, 'top_value_reliable': True
+        }
+
+    def test_large_data_within_bounds(self):
+        """测试数据量较大时近似统计在误差界内"""
+        rng = np.random.default_rng(1)
+        df = pd.DataFrame({
+            'x': rng.exponential(5, 100_000),
+            'user': rng.integers(0, 30_000, 100_000).astype(str)
+        })
+        df.loc[:4999, 'user'] = 'vip'
+        result = TableUtils.describe_data(df, sketch=True)
+        bounds = result['error_bounds']
+        stats = result['numeric_stats']['x']
+        assert stats['mean'] == pytest.approx(df['x'].mean())
+        assert stats['std'] == pytest.approx(df['x'].std())
+        rank = (df['x'] < stats['median']).mean()
+        assert abs(rank - 0.5) <= bounds['x']['median_rank_error']
+
+        user = result['categorical_stats']['user']
+        nunique = df['user'].nunique()
+        assert abs(user['unique_count'] / nunique - 1) <= 3 * bounds['user']['unique_count_relative_error']
+        assert user['top_value'] == 'vip' and bounds['user']['top_value_reliable']
+        assert user['top_count'] <= 5000 <= user['top_count'] + bounds['user']['top_count_max_error']
+
+    def test_sketch_auto(self, monkeypatch):
+        """测试sketch='auto'只对行数达到阈值的DataFrame使用流式概要"""
+        from mwj_tools import table_utils
+
+        df = pd.DataFrame({'x': [1.0, 2.0, 3.0], 'city': ['a', 'b', 'a']})
+        assert 'error_bounds' not in TableUtils.describe_data(df)
+        monkeypatch.setattr(table_utils, 'SKETCH_MIN_ROWS', 3)
+        assert 'error_bounds' in TableUtils.describe_data(df)
+        assert 'error_bounds' not in TableUtils.describe_data(df, sketch=False)
+        with pytest.raises(ValueError):
+            TableUtils.describe_data(df, sketch='always')
+
+    def test_unreliable_top_value(self):
+        """测试高基数列的最大计数不超过误差上界时不返回不可信的top_value"""
+        rng = np.random.default_rng(2)
+        df = pd.DataFrame({'user': rng.integers(0, 500_000, 200_000).astype(str)})
+        result = TableUtils.describe_data(df, sketch=True)
+        bounds = result['error_bounds']['user']
+        assert bounds['top_count_max_error'] > 0 and not bounds['top_value_reliable']
+        assert result['categorical_stats']['user']['top_value'] is None
+        assert result['categorical_stats']['user']['top_count'] == 0
+
+    def test_merge_profiles(self):
+        """测试不同来源的概要序列化后合并，与一次性概要结果相同"""
+        first = TableUtils.profile_data(self.df.iloc[:1000])
+        second = pickle.loads(pickle.dumps(TableUtils.profile_data(_chunks(self.df.iloc[1000:], 500))))
+        merged = first.merge(second).result()
+        whole = TableProfile().update(self.df).result()
+        for key in ('shape', 'dtypes', 'missing_values', 'categorical_stats', 'error_bounds'):
+            assert merged[key] == whole[key]
+        for col, stats in merged['numeric_stats'].items():
+            median = stats.pop('median')
+            assert stats == pytest.approx({key: whole['numeric_stats'][col][key] for key in stats})
+            # 有并列值时中位数的秩是一个区间
+            error = merged['error_bounds'][col]['median_rank_error']
+            assert (self.df[col] < median).sum() / self.df[col].count() <= 0.5 + error
+            assert (self.df[col] <= median).sum() / self.df[col].count() >= 0.5 - error
+
+    def test_empty_columns(self):
+        """测试全部缺失的列"""
+        df = pd.DataFrame({'x': [np.nan, np.nan], 'y': pd.Series([None, None], dtype=object)})
+        result = TableUtils.describe_data(_chunks(df, 1))
+        assert np.isnan(result['numeric_stats']['x']['median'])
+        assert result['categorical_stats']['y'] == {'unique_count': 0, 'top_value': None, 'top_count': 0}
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
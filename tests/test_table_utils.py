@@ -16,6 +16,7 @@ import numpy as np
 from pathlib import Path
 import tempfile
 import json
+import operator
 from mwj_tools.table_utils import TableUtils
 
 
@@ -274,6 +275,57 @@ class TestTableUtils:
         result = TableUtils.clean_data(df, 'fill', fill_value=0, columns=['age'])
         assert result.loc[0, 'age'] == 0
 
+    def test_clean_data_does_not_modify_input(self):
+        """测试默认不修改原数据，结果索引重置"""
+        df = self.test_df.copy()
+        df.index = [10, 11, 12, 13, 14]
+        df.loc[10, 'age'] = np.nan
+        df.loc[11, 'department'] = None
+
+        result = TableUtils.clean_data(df, 'fill')
+        assert result.loc[0, 'age'] == 37.5
+        assert result.loc[1, 'department'] == 'HR'  # HR与IT并列时取较小的值，同Series.mode()
+        assert list(result.index) == [0, 1, 2, 3, 4]
+        assert df['age'].isnull().sum() == 1
+        assert df['department'].isnull().sum() == 1
+
+    def test_clean_data_inplace(self):
+        """测试原地清洗"""
+        df = self.test_df.copy()
+        df.loc[0, 'age'] = np.nan
+        df.loc[2, 'score'] = np.nan
+
+        result = TableUtils.clean_data(df, 'fill', inplace=True)
+        assert result is df
+        assert df['age'].isnull().sum() == 0
+        assert df.loc[2, 'score'] == pytest.approx((85.5 + 92.0 + 88.0 + 95.5) / 4)
+
+        df.loc[1, 'name'] = None
+        TableUtils.clean_data(df, 'drop', inplace=True)
+        assert len(df) == 4
+        assert list(df.index) == [0, 1, 2, 3]
+
+    def test_clean_data_reuse_fill_values(self):
+        """测试分批计算的填充值与整表在浮点舍入误差内一致，并可反复用于后续批次"""
+        df = self.test_df.copy()
+        df.loc[[0, 3], 'age'] = np.nan
+        df.loc[4, 'department'] = None
+
+        chunks = (df.iloc[start:start + 2] for start in range(0, len(df), 2))
+        fills = TableUtils.compute_fill_values(chunks, columns=['age', 'department'])
+        whole = TableUtils.compute_fill_values(df, columns=['age', 'department'])
+        assert fills.keys() == whole.keys()
+        assert np.isclose(fills['age'], whole['age'], rtol=1e-15, atol=0)
+        assert fills['department'] == whole['department']
+        assert fills['age'] == pytest.approx((30 + 35 + 45) / 3)
+        assert fills['department'] == 'HR'
+
+        batch = pd.DataFrame({'age': [np.nan, 50.0], 'department': [None, 'IT'], 'score': [np.nan, 1.0]})
+        result = TableUtils.clean_data(batch, 'fill', fill_values=fills)
+        assert result['age'].tolist() == [fills['age'], 50.0]
+        assert result['department'].tolist() == ['HR', 'IT']
+        assert result['score'].isnull().sum() == 1  # 不在fill_values中的列不填充
+
     # 测试 describe_data 方法
     def test_describe_data_basic(self):
         """测试基本描述统计"""
@@ -402,6 +454,262 @@ class TestTableUtils:
             pass
 
 
+
+class TestTableUtilsStreaming:
+    """测试分块读取"""
+
+    def setup_method(self):
+        self.df = pd.DataFrame({'id': np.arange(10), 'name': list('abcdefghij')})
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def teardown_method(self):
+        self.tmpdir.cleanup()
+
+    @pytest.mark.parametrize('suffix', ['.csv', '.tsv', '.jsonl', '.xlsx'])
+    def test_iter_table(self, suffix):
+        """测试分块读取 - 拼接结果与原表一致，行索引连续"""
+        path = str(Path(self.tmpdir.name) / f'data{suffix}')
+        TableUtils.save_table(self.df, path)
+
+        chunks = list(TableUtils.iter_table(path, chunksize=4))
+        assert [len(chunk) for chunk in chunks] == [4, 4, 2]
+        assert chunks[1].index.tolist() == [4, 5, 6, 7]
+        pd.testing.assert_frame_equal(pd.concat(chunks), self.df)
+
+    def test_read_table_chunksize_progress(self):
+        """测试read_table的chunksize模式与进度回调"""
+        path = str(Path(self.tmpdir.name) / 'data.csv')
+        TableUtils.save_table(self.df, path)
+
+        reports = []
+        chunks = TableUtils.read_table(path, chunksize=3, progress=lambda p: reports.append((p.rows, p.bytes_read)))
+        assert sum(len(chunk) for chunk in chunks) == 10
+        assert [rows for rows, _ in reports] == [3, 6, 9, 10]
+        assert reports[-1][1] == Path(path).stat().st_size
+
+    def test_iter_table_json_not_supported(self):
+        """测试普通JSON不支持分块读取 - 调用时即报错，不必等到迭代"""
+        path = str(Path(self.tmpdir.name) / 'data.json')
+        TableUtils.save_table(self.df, path)
+        with pytest.raises(ValueError):
+            TableUtils.iter_table(path)
+
+    def test_iter_table_validates_eagerly(self):
+        """测试参数错误与文件不存在在调用时即报错"""
+        path = str(Path(self.tmpdir.name) / 'data.csv')
+        TableUtils.save_table(self.df, path)
+        with pytest.raises(ValueError):
+            TableUtils.iter_table(path, chunksize=0)
+        with pytest.raises(ValueError):
+            TableUtils.iter_table(str(Path(self.tmpdir.name) / 'data.txt'))
+        with pytest.raises(FileNotFoundError):
+            TableUtils.iter_table(str(Path(self.tmpdir.name) / 'missing.csv'), optimize=True)
+
+    def test_iter_table_xls_fallback(self, monkeypatch):
+        """测试openpyxl打不开的.xls（传入文件对象时报BadZipFile）退化为整表读取后切块"""
+        path = Path(self.tmpdir.name) / 'legacy.xls'
+        path.write_bytes(b'\xd0\xcf\x11\xe0 not a zip archive')
+        monkeypatch.setattr(pd, 'read_excel', lambda file, sheet_name=0, **kwargs: self.df)
+        chunks = list(TableUtils.iter_table(str(path), chunksize=4))
+        assert [len(chunk) for chunk in chunks] == [4, 4, 2]
+        pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), self.df)
+
+    def test_tsv_uses_tab_separator(self):
+        """测试.tsv文件按制表符读写（此前按逗号处理），含逗号的取值不会被拆开"""
+        df = pd.DataFrame({'id': [1, 2], 'name': ['a,b', 'c']})
+        path = Path(self.tmpdir.name) / 'data.tsv'
+        TableUtils.save_table(df, str(path))
+        assert path.read_text(encoding='utf-8').splitlines() == ['id\tname', '1\ta,b', '2\tc']
+        pd.testing.assert_frame_equal(TableUtils.read_table(str(path)), df)
+        pd.testing.assert_frame_equal(pd.concat(TableUtils.iter_table(str(path), chunksize=1)), df)
+
+
+
+class TestTableUtilsColumnar:
+    """测试parquet/feather/arrow读写"""
+
+    def setup_method(self):
+        pytest.importorskip('pyarrow')
+        self.df = pd.DataFrame({
+            'id': np.arange(10),
+            'name': list('abcdefghij'),
+            'score': np.linspace(0, 1, 10)
+        })
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def teardown_method(self):
+        self.tmpdir.cleanup()
+
+    @pytest.mark.parametrize('suffix', ['.parquet', '.feather', '.arrow'])
+    @pytest.mark.parametrize('compression', [None, 'zstd', 'uncompressed'])
+    def test_round_trip(self, suffix, compression):
+        """测试保存与读取 - 各压缩方式"""
+        path = str(Path(self.tmpdir.name) / f'data{suffix}')
+        TableUtils.save_table(self.df, path, compression=compression)
+        pd.testing.assert_frame_equal(TableUtils.read_table(path), self.df)
+
+    @pytest.mark.parametrize('suffix', ['.parquet', '.arrow', '.csv'])
+    def test_read_table_columns(self, suffix):
+        """测试列投影 - 按指定顺序返回指定列"""
+        path = str(Path(self.tmpdir.name) / f'data{suffix}')
+        TableUtils.save_table(self.df, path)
+        result = TableUtils.read_table(path, columns=['score', 'id'])
+        pd.testing.assert_frame_equal(result, self.df[['score', 'id']])
+
+    @pytest.mark.parametrize('suffix', ['.parquet', '.arrow'])
+    def test_iter_table_columnar(self, suffix):
+        """测试列式文件分块读取"""
+        path = str(Path(self.tmpdir.name) / f'data{suffix}')
+        TableUtils.save_table(self.df, path)
+
+        reports = []
+        chunks = list(TableUtils.iter_table(path, chunksize=4, columns=['id'], progress=reports.append))
+        assert [len(chunk) for chunk in chunks] == [4, 4, 2]
+        pd.testing.assert_frame_equal(pd.concat(chunks), self.df[['id']])
+        assert reports[-1].bytes_read == Path(path).stat().st_size
+
+
+
+class TestFilterPlan:
+    """测试预编译筛选计划"""
+
+    def setup_method(self):
+        self.df = pd.DataFrame({
+            'age': [25, 30, 35, 40, 45],
+            'name': ['Alice', 'Bob', 'Charlie', 'David', 'Eve'],
+            'department': ['HR', 'IT', 'IT', 'HR', 'IT'],
+            'join_date': pd.to_datetime(['2021-01-01', '2021-02-01', '2021-03-01', '2021-01-15', '2021-04-01'])
+        }, index=[10, 20, 30, 40, 50])
+
+    def test_filter_data_non_default_index(self):
+        """测试非默认索引 - 按行位置筛选，不受索引对齐影响"""
+        result = TableUtils.filter_data(self.df, {'department': 'IT', 'age': ('>', 30)})
+        assert result['name'].tolist() == ['Charlie', 'Eve']
+        assert result.index.tolist() == [0, 1]
+
+    def test_plan_reuse(self):
+        """测试同一计划用于多个DataFrame"""
+        plan = TableUtils.compile_filter({'age': ('>=', 35), 'join_date': ('<', '2021-03-15')})
+        assert plan(self.df)['name'].tolist() == ['Charlie', 'David']
+        assert plan.mask(self.df.iloc[::-1]).tolist() == [False, True, True, False, False]
+        assert len(plan(self.df.iloc[:2])) == 0
+
+    def test_nullable_and_contains(self):
+        """测试可空类型的缺失值视为不满足，contains按正则匹配"""
+        df = pd.DataFrame({'value': pd.array([1, None, 3], dtype='Int64'), 'text': ['a1', 'b2', None]})
+        assert TableUtils.filter_data(df, {'value': ('>', 0)})['value'].tolist() == [1, 3]
+        assert TableUtils.filter_data(df, {'text': ('contains', r'[a-b]\d')})['text'].tolist() == ['a1', 'b2']
+
+    @pytest.mark.parametrize('dtype', ['object', 'string', 'category'])
+    def test_compare_strings_with_missing(self, dtype):
+        """测试字符串列含None/NaN时大小比较与Series比较一致，缺失值行不满足"""
+        df = pd.DataFrame({'name': pd.Series(['b', None, 'a', np.nan, 'c'], dtype=object)})
+        if dtype != 'object':
+            df = df.astype({'name': pd.CategoricalDtype(ordered=True) if dtype == 'category' else dtype})
+        for op, compare in [('>', operator.gt), ('<=', operator.le), ('>=', operator.ge), ('<', operator.lt)]:
+            expected = df[compare(df['name'], 'a').fillna(False).astype(bool)].reset_index(drop=True)
+            pd.testing.assert_frame_equal(TableUtils.filter_data(df, {'name': (op, 'a')}), expected)
+        assert TableUtils.filter_data(df, {'name': ('>', 'a')})['name'].tolist() == ['b', 'c']
+
+    def test_matches_sequential_evaluation(self):
+        """测试条件重排后的结果与逐个条件筛选一致"""
+        rng = np.random.default_rng(0)
+        df = pd.DataFrame({
+            'x': rng.integers(0, 100, 5000),
+            'y': rng.random(5000),
+            'tag': rng.choice(['a', 'b', 'c'], 5000)
+        })
+        conditions = {'y': ('<', 0.9), 'tag': ('not in', ['c']), 'x': ('>=', 95)}
+        expected = df[(df['y'] < 0.9) & ~df['tag'].isin(['c']) & (df['x'] >= 95)].reset_index(drop=True)
+        pd.testing.assert_frame_equal(TableUtils.filter_data(df, conditions), expected)
+
+    def test_contains_literal(self):
+        """测试普通子串匹配 - 正则元字符按字面匹配"""
+        df = pd.DataFrame({'url': ['a.com/x', 'abcom/y', 'b.com/x?id=1']})
+        assert TableUtils.filter_data(df, {'url': ('contains', 'a.com')})['url'].tolist() == ['a.com/x', 'abcom/y']
+        assert TableUtils.filter_data(df, {'url': ('contains_literal', 'a.com')})['url'].tolist() == ['a.com/x']
+        assert TableUtils.filter_data(df, {'url': ('contains_literal', '?id=')})['url'].tolist() == ['b.com/x?id=1']
+
+    @pytest.mark.parametrize('dtype', ['category', 'object'])
+    def test_contains_distinct_values(self, dtype):
+        """测试分类列与低基数列在不同取值上查找，结果与astype(str).str.contains一致"""
+        rng = np.random.default_rng(0)
+        values = np.array(['/api/v1', '/api/v2', '/static/app.js', None], dtype=object)
+        df = pd.DataFrame({'path': values[rng.integers(0, 4, 70000)]}).astype({'path': dtype})
+        for pattern in ['api', r'v\d', 'None', 'nan']:
+            expected = df[df['path'].astype(str).str.contains(pattern)].reset_index(drop=True)
+            pd.testing.assert_frame_equal(TableUtils.filter_data(df, {'path': ('contains', pattern)}), expected)
+
+    def test_unknown_operator(self):
+        """测试不支持的操作符"""
+        with pytest.raises(ValueError):
+            TableUtils.compile_filter({'age': ('~', 1)})
+        with pytest.raises(ValueError, match='不支持的操作符'):
+            TableUtils.filter_data(self.df, {'age': ('between', (30, 40))})
+
+
+
+class TestReadFiltered:
+    """测试边读取边筛选"""
+
+    def setup_method(self):
+        rng = np.random.default_rng(0)
+        self.df = pd.DataFrame({
+            'id': np.arange(1000),
+            'amount': rng.random(1000) * 100,
+            'tag': rng.choice(['a', 'b', 'c'], 1000)
+        })
+        self.conditions = {'amount': ('>', 90), 'tag': ('in', ['a', 'b'])}
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def teardown_method(self):
+        self.tmpdir.cleanup()
+
+    @pytest.mark.parametrize('suffix', ['.csv', '.jsonl', '.json', '.parquet'])
+    def test_read_filtered(self, suffix):
+        """测试结果与先读取再筛选一致，只返回指定列"""
+        if suffix == '.parquet':
+            pytest.importorskip('pyarrow')
+        path = str(Path(self.tmpdir.name) / f'data{suffix}')
+        TableUtils.save_table(self.df, path)
+
+        result = TableUtils.read_filtered(path, self.conditions, columns=['id', 'tag'], chunksize=100)
+        expected = TableUtils.filter_data(self.df, self.conditions)[['id', 'tag']]
+        pd.testing.assert_frame_equal(result, expected)
+
+    def test_read_filtered_missing_condition_column(self):
+        """测试条件列不存在时忽略该条件"""
+        path = str(Path(self.tmpdir.name) / 'data.csv')
+        TableUtils.save_table(self.df, path)
+        result = TableUtils.read_filtered(path, {'id': ('<', 5), 'missing': 1})
+        assert result['id'].tolist() == [0, 1, 2, 3, 4]
+
+    @pytest.mark.parametrize('suffix', ['.csv', '.jsonl'])
+    def test_read_filtered_no_match_keeps_dtypes(self, suffix):
+        """测试没有满足条件的行时，空结果的列类型与文件中相同"""
+        path = str(Path(self.tmpdir.name) / f'data{suffix}')
+        TableUtils.save_table(self.df, path)
+        result = TableUtils.read_filtered(path, {'amount': ('>', 1000)}, chunksize=100)
+        assert len(result) == 0
+        pd.testing.assert_series_equal(result.dtypes, self.df.dtypes)
+
+    @pytest.mark.parametrize('suffix', ['.csv', '.jsonl', '.json'])
+    def test_read_filtered_reader_kwargs(self, suffix):
+        """测试读取参数传给底层读取函数，普通JSON也可以使用"""
+        path = str(Path(self.tmpdir.name) / f'data{suffix}')
+        TableUtils.save_table(self.df, path)
+        result = TableUtils.read_filtered(path, {'id': ('<', 5)}, chunksize=100, dtype={'id': 'int32'})
+        assert result['id'].tolist() == [0, 1, 2, 3, 4]
+        assert result['id'].dtype == np.int32
+
+    def test_read_filtered_empty_file(self):
+        """测试只有表头的文件"""
+        path = str(Path(self.tmpdir.name) / 'data.csv')
+        TableUtils.save_table(self.df.iloc[:0], path)
+        result = TableUtils.read_filtered(path, self.conditions, columns=['id'])
+        assert result.columns.tolist() == ['id'] and len(result) == 0
+
+
 if __name__ == "__main__":
     '''
     # 如果使用 uv